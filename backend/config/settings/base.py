@@ -102,6 +102,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # pages with image renditions are negotiated by `Accept`
+    'utils.middleware.AcceptVaryMiddleware',
 ]
 
 # ----------------------------------------------------
@@ -231,6 +233,18 @@ public_root = root.path('public/')
 
 MEDIA_ROOT = public_root('media')
 MEDIA_URL = env.str('MEDIA_URL', default='/media/')
+# hand media transfers off to the front proxy: "X-Accel-Redirect" (nginx) or "X-Sendfile" (Apache, lighttpd),
+# empty to send them from Django. nginx needs an internal location mapping the redirect location to `MEDIA_ROOT`:
+#   location /protected-media/ { internal; alias /app/public/media/; }
+MEDIA_SENDFILE_HEADER = env.str('MEDIA_SENDFILE_HEADER', default='')
+MEDIA_ACCEL_REDIRECT_LOCATION = '/protected-media/'
+# uploads are validated (size and magic bytes) and hashed while they are received
+FILE_UPLOAD_HANDLERS = [
+    "utils.upload_handlers.UploadValidationHandler",
+    "portfolios.uploads.StorageQuotaUploadHandler",
+    "utils.upload_handlers.HashingMemoryFileUploadHandler",
+    "utils.upload_handlers.HashingTemporaryFileUploadHandler",
+]
 
 STATIC_ROOT = public_root('static')
 STATIC_URL = env.str('STATIC_URL', default='/static/')
@@ -259,6 +273,60 @@ STATICFILES_FINDERS = [
 ALLOWED_IMAGE_TYPES = ['.jpg', '.jpeg', '.png', '.svg']
 ALLOWED_DOCUMENT_TYPES = ['.doc', '.docx', '.pdf']
 MAX_UPLOAD_SIZE = 2621440  # in bytes (2.62144 MB / 2.5 MB)
+# images with larger dimensions are rejected (decoding them would take too much memory)
+MAX_IMAGE_DIMENSION = 10000  # in pixels (longest side)
+MAX_IMAGE_PIXELS = 50000000
+
+# name new uploads by their sha256 (`blobs/<2 hex digits>/<sha256><ext>`), identical uploads share one
+# reference counted file. Opt-in: the storage behaves like the file system storage for other names, but every
+# delete of a shared name goes through the reference counts
+CONTENT_ADDRESSED_MEDIA = env.bool('CONTENT_ADDRESSED_MEDIA', default=False)
+if CONTENT_ADDRESSED_MEDIA:
+    DEFAULT_FILE_STORAGE = "utils.storages.ContentAddressedStorage"
+# bytes of media every user may store (`User.storage_quota` overrides it per user), None for no limit
+MEDIA_STORAGE_QUOTA = 1073741824  # in bytes (1 GB)
+# resumable media uploads are sent in chunks of at most this size (below `DATA_UPLOAD_MAX_MEMORY_SIZE`)
+MEDIA_UPLOAD_CHUNK_SIZE = 524288  # in bytes (512 KB)
+
+# uploaded raster images are optimised before they are stored: metadata is stripped, the EXIF orientation applied,
+# larger images are scaled down and JPEG quality is lowered step by step (down to the minimum) to meet the target size
+IMAGE_INGEST_MAX_DIMENSION = 2560  # in pixels (longest side)
+IMAGE_INGEST_QUALITY = 85
+IMAGE_INGEST_MIN_QUALITY = 70
+IMAGE_INGEST_TARGET_BITS_PER_PIXEL = 1.5
+
+# uploaded raster images get one downscaled rendition per width (served with `srcset`)
+IMAGE_VARIANT_WIDTHS = (64, 128, 256, 512)  # in pixels
+IMAGE_VARIANT_QUALITY = 85  # JPEG, WebP and AVIF quality of the renditions
+# renditions are also transcoded to these formats (in order of preference) when Pillow has their codec
+IMAGE_VARIANT_FORMATS = ("avif", "webp")
+# renditions are rendered in the background, pages serve the original image until they are recorded
+IMAGE_VARIANTS_IN_BACKGROUND = True
+# uploaded pdf documents get a preview image of their first page (rendered in the background with `pdftoppm`)
+DOCUMENT_PREVIEW_WIDTH = 256  # in pixels
+DOCUMENT_PREVIEWS_IN_BACKGROUND = True
+
+# the files of multi file submissions are written concurrently by this many threads
+FILE_WRITE_WORKERS = 8
+
+# files of bulk deleted rows are removed after commit, in batches, by a background thread
+FILE_CLEANUP_BATCH_SIZE = 100
+FILE_CLEANUP_IN_BACKGROUND = True
+# `gc_media` keeps unreferenced files modified within this many hours (their rows may not be committed yet)
+MEDIA_GC_GRACE_HOURS = 24
+# resumable uploads never attached to a form are purged by `gc_media --delete` after this many hours
+MEDIA_UPLOAD_EXPIRY_HOURS = 24
+
+# soft deleted users are hard deleted by `purge_deleted_users` after this many days
+USER_PURGE_RETENTION_DAYS = 30
+
+# Dashboard Configurations
+# ----------------------------------------------------
+
+# cached portfolio statistics are invalidated on every write, the timeout is only a safety net
+PORTFOLIO_STATISTICS_CACHE_TIMEOUT = 60 * 60  # in seconds (1 hour)
+# certifications expiring within this window are highlighted on the dashboard
+CERTIFICATION_EXPIRY_WARNING_DAYS = 90
 
 # ----------------------------------------------------
 # *** SECURITY ***
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from django.urls import path, include
+import re
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
 # from django.views import defaults as default_views
@@ -9,7 +10,7 @@ from django.conf.urls.i18n import i18n_patterns
 from config.urls_third_party import urlpatterns as THIRD_PARTY_URL_PATTERNS
 
 # Views
-from config.views import HomeView, DashboardView
+from config.views import HomeView, DashboardView, MediaView
 
 ADMIN_PANEL_URL_PATTERNS = i18n_patterns(
     path('dashboard/', DashboardView.as_view(), name='dashboard'),
@@ -29,12 +30,16 @@ urlpatterns = i18n_patterns(
     prefix_default_language=False
 ) + THIRD_PARTY_URL_PATTERNS + APP_URL_PATTERNS
 
+if settings.MEDIA_URL.startswith("/"):
+    # Media URL (in production too, ideally handed off to the front proxy, see `MEDIA_SENDFILE_HEADER`)
+    urlpatterns = urlpatterns + [
+        re_path(rf"^{re.escape(settings.MEDIA_URL.lstrip('/'))}(?P<path>.+)$", MediaView.as_view(), name="media"),
+    ]
+
 if settings.DEBUG:
-    # Static and Media URL
+    # Static URL
     urlpatterns = urlpatterns + \
         static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    urlpatterns = urlpatterns + \
-        static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
     # This allows the error pages to be debugged during development
 
@@ -1,5 +1,11 @@
 from django.views.generic import View
 from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.utils.decorators import method_decorator
+from portfolios.statistics import PORTFOLIO_SECTIONS, get_portfolio_statistics
+from utils.media_serving import serve_media
+
+dashboard_decorators = [login_required]
 
 
 class HomeView(View):
@@ -21,6 +27,7 @@ class HomeView(View):
         return context
 
 
+@method_decorator(dashboard_decorators, name='dispatch')
 class DashboardView(View):
     def get(self, request, *args, **kwargs):
         context = self.get_context_data(**kwargs)
@@ -37,4 +44,27 @@ class DashboardView(View):
         context["meta_author"] = "Numan Ibn Mazid"
         # page contexts
         context["head_title"] = "Dashboard"
+        # portfolio statistics (cached)
+        statistics = get_portfolio_statistics(self.request.user)
+        section_names = {section: model._meta.verbose_name_plural for section, model, _ in PORTFOLIO_SECTIONS}
+        context["statistics"] = statistics
+        context["section_statistics"] = [
+            dict(name=section_names[section], url_name=f"portfolios:{section}", **section_statistics)
+            for section, section_statistics in statistics["sections"].items()
+        ]
+        context["recent_activity"] = [
+            dict(activity, name=section_names[activity["section"]], url_name=f"portfolios:{activity['section']}")
+            for activity in statistics["recent_activity"]
+        ]
         return context
+
+
+class MediaView(View):
+    """
+    Serves the user media below `MEDIA_URL` with range, conditional and cache headers (see `utils.media_serving`),
+    optionally through the front proxy.
+    """
+    http_method_names = ['get', 'head']
+
+    def get(self, request, path, *args, **kwargs):
+        return serve_media(request, path)
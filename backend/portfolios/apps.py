@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PortfoliosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'portfolios'
+
+    def ready(self):
+        # connect signal receivers
+        from portfolios import signals  # NOQA
@@ -1,5 +1,5 @@
 import factory
-from portfolios.models import Certification
+from portfolios.models import Certification, CertificationMedia
 from users.factories.user_factory import UserFactory
 from factory.django import DjangoModelFactory
 from utils.helpers import create_factory_data
@@ -13,17 +13,26 @@ class CertificationFactory(DjangoModelFactory):
     name = factory.Faker('word')
     organization = factory.Faker('word')
     address = factory.Faker('word')
-    issue_date = factory.Faker('date_time_between', issue_date='-1y', expiration_date='now')
-    expiration_date = factory.Faker('date_time_between', issue_date='-1y', expiration_date='now')
+    issue_date = factory.Faker('date_between', start_date='-1y', end_date='today')
+    expiration_date = factory.Faker('date_between', start_date='today', end_date='+1y')
     does_not_expire = True if expiration_date is None else False
-    credential_id = factory.Faker('number')
+    credential_id = factory.Faker('bothify', text='??-########')
     credential_url = factory.Faker('url')
     description = factory.Faker('text')
 
 
+class CertificationMediaFactory(DjangoModelFactory):
+    class Meta:
+        model = CertificationMedia
+
+    certification = factory.SubFactory(CertificationFactory)
+    file = factory.django.FileField(filename='media.pdf', data=factory.Faker('binary', length=1024))
+    description = factory.Faker('text')
+
+
 def create_certifications_with_factory(
     num_of_data=7, display_name="certification",
-    display_name_plural="certifications", delete_old_data=False
+    display_name_plural="certifications", delete_old_data=False, **kwargs
 ):
 
     return create_factory_data(
@@ -32,5 +41,6 @@ def create_certifications_with_factory(
         display_name=display_name,
         display_name_plural=display_name_plural,
         delete_old_data=delete_old_data,
-        model=Certification
+        model=Certification,
+        **kwargs
     )
@@ -1,5 +1,5 @@
 import factory
-from portfolios.models import Education
+from portfolios.models import Education, EducationMedia
 from users.factories.user_factory import UserFactory
 from factory.django import DjangoModelFactory
 from utils.helpers import create_factory_data
@@ -22,9 +22,18 @@ class EducationFactory(DjangoModelFactory):
     description = factory.Faker('text')
 
 
+class EducationMediaFactory(DjangoModelFactory):
+    class Meta:
+        model = EducationMedia
+
+    education = factory.SubFactory(EducationFactory)
+    file = factory.django.FileField(filename='media.pdf', data=factory.Faker('binary', length=1024))
+    description = factory.Faker('text')
+
+
 def create_educations_with_factory(
     num_of_data=7, display_name="education",
-    display_name_plural="educations", delete_old_data=False
+    display_name_plural="educations", delete_old_data=False, **kwargs
 ):
 
     return create_factory_data(
@@ -33,5 +42,6 @@ def create_educations_with_factory(
         display_name=display_name,
         display_name_plural=display_name_plural,
         delete_old_data=delete_old_data,
-        model=Education
+        model=Education,
+        **kwargs
     )
@@ -12,12 +12,11 @@ class InterestFactory(DjangoModelFactory):
     user = factory.SubFactory(UserFactory)
     title = factory.Faker('word')
     icon = factory.django.ImageField(color='blue')
-    description = factory.Faker('text')
 
 
 def create_interests_with_factory(
     num_of_data=7, display_name="interest",
-    display_name_plural="interests", delete_old_data=False
+    display_name_plural="interests", delete_old_data=False, **kwargs
 ):
 
     return create_factory_data(
@@ -26,5 +25,6 @@ def create_interests_with_factory(
         display_name=display_name,
         display_name_plural=display_name_plural,
         delete_old_data=delete_old_data,
-        model=Interest
+        model=Interest,
+        **kwargs
     )
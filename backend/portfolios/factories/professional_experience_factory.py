@@ -1,6 +1,6 @@
 import factory
 from factory.fuzzy import FuzzyChoice
-from portfolios.models import ProfessionalExperience
+from portfolios.models import ProfessionalExperience, ProfessionalExperienceMedia
 from users.factories.user_factory import UserFactory
 from factory.django import DjangoModelFactory
 from utils.helpers import create_factory_data
@@ -25,9 +25,18 @@ class ProfessionalExperienceFactory(DjangoModelFactory):
     description = factory.Faker('text')
 
 
+class ProfessionalExperienceMediaFactory(DjangoModelFactory):
+    class Meta:
+        model = ProfessionalExperienceMedia
+
+    professional_experience = factory.SubFactory(ProfessionalExperienceFactory)
+    file = factory.django.FileField(filename='media.pdf', data=factory.Faker('binary', length=1024))
+    description = factory.Faker('text')
+
+
 def create_professional_experiences_with_factory(
     num_of_data=7, display_name="professional-experience",
-    display_name_plural="professional-experiences", delete_old_data=False
+    display_name_plural="professional-experiences", delete_old_data=False, **kwargs
 ):
 
     return create_factory_data(
@@ -36,5 +45,6 @@ def create_professional_experiences_with_factory(
         display_name=display_name,
         display_name_plural=display_name_plural,
         delete_old_data=delete_old_data,
-        model=ProfessionalExperience
+        model=ProfessionalExperience,
+        **kwargs
     )
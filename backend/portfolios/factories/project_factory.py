@@ -1,5 +1,5 @@
 import factory
-from portfolios.models import Project
+from portfolios.models import Project, ProjectMedia
 from users.factories.user_factory import UserFactory
 from factory.django import DjangoModelFactory
 from utils.helpers import create_factory_data
@@ -20,9 +20,18 @@ class ProjectFactory(DjangoModelFactory):
     description = factory.Faker('text')
 
 
+class ProjectMediaFactory(DjangoModelFactory):
+    class Meta:
+        model = ProjectMedia
+
+    project = factory.SubFactory(ProjectFactory)
+    file = factory.django.FileField(filename='media.pdf', data=factory.Faker('binary', length=1024))
+    description = factory.Faker('text')
+
+
 def create_projects_with_factory(
     num_of_data=7, display_name="project",
-    display_name_plural="projects", delete_old_data=False
+    display_name_plural="projects", delete_old_data=False, **kwargs
 ):
 
     return create_factory_data(
@@ -31,5 +40,6 @@ def create_projects_with_factory(
         display_name=display_name,
         display_name_plural=display_name_plural,
         delete_old_data=delete_old_data,
-        model=Project
+        model=Project,
+        **kwargs
     )
@@ -15,7 +15,7 @@ class SkillFactory(DjangoModelFactory):
 
 
 def create_skills_with_factory(
-    num_of_data=7, display_name="skill", display_name_plural="skills", delete_old_data=False
+    num_of_data=7, display_name="skill", display_name_plural="skills", delete_old_data=False, **kwargs
 ):
 
     return create_factory_data(
@@ -24,5 +24,6 @@ def create_skills_with_factory(
         display_name=display_name,
         display_name_plural=display_name_plural,
         delete_old_data=delete_old_data,
-        model=Skill
+        model=Skill,
+        **kwargs
     )
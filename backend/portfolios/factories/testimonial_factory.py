@@ -18,7 +18,7 @@ class TestimonialFactory(DjangoModelFactory):
 
 def create_testimonials_with_factory(
     num_of_data=7, display_name="testimonial",
-    display_name_plural="testimonials", delete_old_data=False
+    display_name_plural="testimonials", delete_old_data=False, **kwargs
 ):
 
     return create_factory_data(
@@ -27,5 +27,6 @@ def create_testimonials_with_factory(
         display_name=display_name,
         display_name_plural=display_name_plural,
         delete_old_data=delete_old_data,
-        model=Testimonial
+        model=Testimonial,
+        **kwargs
     )
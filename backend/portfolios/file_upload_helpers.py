@@ -1,6 +1,8 @@
 import os
 import time
+from django.utils.text import slugify
 from utils.helpers import get_user_media_path
+from utils.storages import content_addressed
 
 
 def get_filename_ext(filepath):
@@ -9,6 +11,7 @@ def get_filename_ext(filepath):
     return name, ext
 
 
+@content_addressed("image")
 def skill_icon_path(instance, filename):
     new_filename = "{datetime}".format(datetime=time.strftime("%Y%m%d-%H%M%S"))
     name, ext = get_filename_ext(filename)
@@ -18,6 +21,7 @@ def skill_icon_path(instance, filename):
     return f"{get_user_media_path(instance.user)}/skills/{instance.slug[:23]}/{final_filename}"
 
 
+@content_addressed("company_image")
 def professional_experience_company_image_path(instance, filename):
     new_filename = "{datetime}".format(datetime=time.strftime("%Y%m%d-%H%M%S"))
     name, ext = get_filename_ext(filename)
@@ -27,6 +31,7 @@ def professional_experience_company_image_path(instance, filename):
     return f"{get_user_media_path(instance.user)}/professional-experiences/{instance.slug[:23]}/{final_filename}"
 
 
+@content_addressed("file")
 def professional_experience_media_path(instance, filename):
     new_filename = "{datetime}".format(datetime=time.strftime("%Y%m%d-%H%M%S"))
     name, ext = get_filename_ext(filename)
@@ -39,6 +44,7 @@ def professional_experience_media_path(instance, filename):
     )
 
 
+@content_addressed("file")
 def education_media_path(instance, filename):
     new_filename = "{datetime}".format(datetime=time.strftime("%Y%m%d-%H%M%S"))
     name, ext = get_filename_ext(filename)
@@ -51,6 +57,7 @@ def education_media_path(instance, filename):
     )
 
 
+@content_addressed("file")
 def certification_media_path(instance, filename):
     new_filename = "{datetime}".format(datetime=time.strftime("%Y%m%d-%H%M%S"))
     name, ext = get_filename_ext(filename)
@@ -63,6 +70,7 @@ def certification_media_path(instance, filename):
     )
 
 
+@content_addressed("file")
 def project_media_path(instance, filename):
     new_filename = "{datetime}".format(datetime=time.strftime("%Y%m%d-%H%M%S"))
     name, ext = get_filename_ext(filename)
@@ -72,6 +80,7 @@ def project_media_path(instance, filename):
     return f"{get_user_media_path(instance.project.user)}/projects/{instance.project.slug[:23]}/media/{final_filename}"
 
 
+@content_addressed("icon")
 def interest_icon_path(instance, filename):
     new_filename = "{datetime}".format(datetime=time.strftime("%Y%m%d-%H%M%S"))
     name, ext = get_filename_ext(filename)
@@ -81,6 +90,7 @@ def interest_icon_path(instance, filename):
     return f"{get_user_media_path(instance.user)}/interests/{instance.slug[:23]}/{final_filename}"
 
 
+@content_addressed("image")
 def testimonial_image_path(instance, filename):
     new_filename = "{datetime}".format(datetime=time.strftime("%Y%m%d-%H%M%S"))
     name, ext = get_filename_ext(filename)
@@ -88,3 +98,9 @@ def testimonial_image_path(instance, filename):
         new_filename=new_filename, ext=ext
     )
     return f"{get_user_media_path(instance.user)}/testimonials/{instance.slug[:23]}/{final_filename}"
+
+
+@content_addressed("file")
+def media_upload_path(instance, filename):
+    name, ext = get_filename_ext(filename)
+    return f"{get_user_media_path(instance.user)}/uploads/{instance.id}/{slugify(name)[:50]}{ext}"
@@ -0,0 +1,301 @@
+from django import forms
+from django.contrib.auth import get_user_model
+from django.core.exceptions import SuspiciousFileOperation, ValidationError
+from django.core.files.utils import validate_file_name
+from django.db import models, transaction
+from django.utils.translation import gettext_lazy as _
+from portfolios.forms import (
+    SkillForm, ProfessionalExperienceForm, EducationForm, CertificationForm, ProjectForm, InterestForm, TestimonialForm
+)
+from portfolios.statistics import PORTFOLIO_MEDIA_SECTIONS, invalidate_portfolio_statistics
+from portfolios.validation import invalidate_unique_values
+from utils.helpers import get_user_media_path, now
+from utils.storages import add_content_references
+
+
+# (section key, form validating an entry, natural key fields), the natural keys are the fields the views keep
+# unique per user (case insensitive)
+PORTFOLIO_IMPORT_SECTIONS = (
+    ("skills", SkillForm, ("title",)),
+    ("professional_experiences", ProfessionalExperienceForm, ("company",)),
+    ("educations", EducationForm, ("school",)),
+    ("certifications", CertificationForm, ("name",)),
+    ("projects", ProjectForm, ("title",)),
+    ("interests", InterestForm, ("title",)),
+    ("testimonials", TestimonialForm, ("name",)),
+)
+
+# media entries are identified by their file (a reference to an already stored file)
+PORTFOLIO_IMPORT_MEDIA_FIELDS = ("file", "description")
+PORTFOLIO_IMPORT_BATCH_SIZE = 500
+
+
+def _key_value(value):
+    return value.casefold().strip() if isinstance(value, str) else value
+
+
+def _field_value(instance, name):
+    value = getattr(instance, name)
+    if isinstance(value, models.fields.files.FieldFile):
+        return value.name or ""
+    return value
+
+
+class PortfolioImporter(object):
+    """
+    Applies a whole portfolio document (`{section key: [entries]}`) to the portfolio of a user in one transaction.
+    Entries are matched with the existing rows by natural key and only the difference is written with bulk
+    INSERT, UPDATE and DELETE statements, unchanged rows (and their `updated_at`) are left untouched.
+    Sections missing from the document and entries without a `media` key keep their existing rows.
+    actions: run(dry_run)
+    """
+
+    def __init__(self, user, document):
+        self.user = user
+        self.document = document
+        self.errors = {}
+        self.summary = {}
+        self.media_sections = {
+            section: (model, parent_field) for section, model, parent_field in PORTFOLIO_MEDIA_SECTIONS
+        }
+        self.existing_media = {}
+        self.referenced_files = None
+
+    def add_error(self, path, messages):
+        self.errors.setdefault(path, []).extend(messages if isinstance(messages, list) else [messages])
+
+    def run(self, dry_run=False):
+        """[Validates the document and applies the difference]
+
+        Args:
+            dry_run (bool, optional): [True, if the changes should be rolled back]. Defaults to False.
+
+        Raises:
+            ValidationError: [keyed by the path of the invalid value, e.g. `projects[2].start_date`]
+
+        Returns:
+            [dict]: [created, updated, deleted and unchanged counts per section (and `<section>_media`)]
+        """
+        if not isinstance(self.document, dict):
+            raise ValidationError(_("A portfolio document must be an object of sections."))
+        sections = {section for section, form_class, key_fields in PORTFOLIO_IMPORT_SECTIONS}
+        for section in set(self.document) - sections:
+            self.add_error(section, _("Unknown section."))
+
+        with transaction.atomic():
+            # imports of the same portfolio are serialized by locking its owner
+            list(get_user_model()._base_manager.select_for_update().filter(pk=self.user.pk).values_list("pk"))
+            plans = [
+                self._plan_section(section, form_class, key_fields)
+                for section, form_class, key_fields in PORTFOLIO_IMPORT_SECTIONS
+                if section in self.document
+            ]
+            if self.errors:
+                raise ValidationError(self.errors)
+            for plan in plans:
+                self._apply_section(plan)
+            if any(counts["created"] or counts["updated"] or counts["deleted"] for counts in self.summary.values()):
+                # bulk updates do not send signals
+                invalidate_portfolio_statistics(self.user.pk)
+                invalidate_unique_values(self.user.pk)
+            if dry_run:
+                transaction.set_rollback(True)
+        return self.summary
+
+    # ----------------------------------------------------
+    # *** Plan ***
+    # ----------------------------------------------------
+
+    def _plan_section(self, section, form_class, key_fields):
+        model = form_class._meta.model
+        # files are imported as references to stored files, not as uploads
+        file_fields = [
+            name for name in form_class._meta.fields if isinstance(model._meta.get_field(name), models.FileField)
+        ]
+        form_class = forms.modelform_factory(
+            model, form=form_class, fields=[name for name in form_class._meta.fields if name not in file_fields]
+        )
+        fields = list(form_class.base_fields) + file_fields
+        existing = {
+            tuple(_key_value(getattr(obj, name)) for name in key_fields): obj
+            for obj in model.objects.filter(user=self.user)
+        }
+        plan = {"section": section, "model": model, "inserts": [], "updates": [], "unchanged": []}
+
+        items = self.document[section]
+        if not isinstance(items, list):
+            self.add_error(section, _("A section must be a list of entries."))
+            items = []
+        seen = set()
+        for index, item in enumerate(items):
+            path = f"{section}[{index}]"
+            instance = self._clean_entry(form_class, file_fields, item, path)
+            if instance is None:
+                continue
+            key = tuple(_key_value(getattr(instance, name)) for name in key_fields)
+            if key in seen:
+                self.add_error(path, _("Duplicate entry for %s.") % ", ".join(key_fields))
+                continue
+            seen.add(key)
+            obj = existing.pop(key, None)
+            media = self._plan_media(section, obj, item["media"], f"{path}.media") if "media" in item else None
+            if obj is None:
+                plan["inserts"].append((instance, media))
+                continue
+            changed = [name for name in fields if _field_value(obj, name) != _field_value(instance, name)]
+            for name in changed:
+                setattr(obj, name, getattr(instance, name))
+            plan["updates" if changed else "unchanged"].append((obj, changed, media))
+        plan["deletes"] = list(existing.values())
+        return plan
+
+    def _clean_entry(self, form_class, file_fields, item, path):
+        """ Validates an entry with the section form and returns an unsaved instance with the cleaned values """
+        if not isinstance(item, dict):
+            self.add_error(path, _("An entry must be an object."))
+            return None
+        for name in set(item) - set(form_class.base_fields) - set(file_fields) - {"media"}:
+            self.add_error(f"{path}.{name}", _("Unknown field."))
+
+        model = form_class._meta.model
+        form = form_class(data=item, instance=model(user=self.user))
+        if not form.is_valid():
+            for name, messages in form.errors.items():
+                self.add_error(f"{path}.{name}", list(messages))
+        for name in file_fields:
+            if not self._check_file_reference(model, name, item.get(name), f"{path}.{name}"):
+                continue
+            setattr(form.instance, name, item.get(name) or None)
+        return form.instance if form.is_valid() else None
+
+    def _check_file_reference(self, model, name, value, path, required=False):
+        if not value:
+            if required:
+                self.add_error(path, _("This field is required."))
+                return False
+            return True
+        try:
+            # files of other users are reported as missing, their names are not disclosed
+            exists = isinstance(value, str) and self._is_user_file(validate_file_name(value, allow_relative_path=True))
+            exists = exists and model._meta.get_field(name).storage.exists(value)
+        except SuspiciousFileOperation:
+            self.add_error(path, _("File `%s` is not a valid file name.") % value)
+            return False
+        if not exists:
+            self.add_error(path, _("File `%s` does not exist.") % value)
+            return False
+        return True
+
+    def _is_user_file(self, name):
+        """ Only files stored for the user (under their media path, or referenced by their rows) can be imported """
+        if name.startswith(f"{get_user_media_path(self.user)}/"):
+            return True
+        if self.referenced_files is None:
+            # e.g. content addressed files, they are not stored under the user's media path
+            self.referenced_files = set()
+            owner_fields = [
+                (form_class._meta.model, "user") for section, form_class, key_fields in PORTFOLIO_IMPORT_SECTIONS
+            ] + [(model, f"{parent_field}__user") for model, parent_field in self.media_sections.values()]
+            for model, owner_field in owner_fields:
+                for field in model._meta.concrete_fields:
+                    if isinstance(field, models.FileField):
+                        self.referenced_files.update(
+                            model._base_manager.filter(**{owner_field: self.user}).exclude(**{field.name: ""})
+                            .order_by().values_list(field.name, flat=True)
+                        )
+        return name in self.referenced_files
+
+    def _get_existing_media(self, section, parent):
+        if section not in self.existing_media:
+            model, parent_field = self.media_sections[section]
+            self.existing_media[section] = {}
+            for media in model.objects.filter(**{f"{parent_field}__user": self.user}):
+                self.existing_media[section].setdefault(getattr(media, f"{parent_field}_id"), []).append(media)
+        return self.existing_media[section].get(parent.pk, []) if parent is not None else []
+
+    def _plan_media(self, section, parent, items, path):
+        if section not in self.media_sections:
+            self.add_error(path, _("This section has no media."))
+            return None
+        if not isinstance(items, list):
+            self.add_error(path, _("Media must be a list of entries."))
+            return None
+        model, parent_field = self.media_sections[section]
+        existing = {media.file.name: media for media in self._get_existing_media(section, parent)}
+        plan = {"inserts": [], "updates": [], "unchanged": []}
+        for index, item in enumerate(items):
+            item_path = f"{path}[{index}]"
+            if not isinstance(item, dict):
+                self.add_error(item_path, _("A media entry must be an object."))
+                continue
+            for name in set(item) - set(PORTFOLIO_IMPORT_MEDIA_FIELDS):
+                self.add_error(f"{item_path}.{name}", _("Unknown field."))
+            name = item.get("file")
+            media = existing.pop(name, None) if isinstance(name, str) else None
+            if media is None:
+                if self._check_file_reference(model, "file", name, f"{item_path}.file", required=True):
+                    plan["inserts"].append(model(file=name, description=item.get("description")))
+            elif media.description != item.get("description"):
+                media.description = item.get("description")
+                plan["updates"].append(media)
+            else:
+                plan["unchanged"].append(media)
+        plan["deletes"] = list(existing.values())
+        return plan
+
+    # ----------------------------------------------------
+    # *** Apply ***
+    # ----------------------------------------------------
+
+    def _write(self, model, inserts, updates, update_fields, deletes):
+        # files are assigned by name, the new references to content addressed files are counted
+        file_fields = [field.name for field in model._meta.concrete_fields if isinstance(field, models.FileField)]
+        add_content_references([_field_value(obj, name) for obj in inserts for name in file_fields] + [
+            _field_value(obj, name) for obj in updates for name in file_fields if name in update_fields
+        ])
+        model.objects.bulk_insert(inserts, batch_size=PORTFOLIO_IMPORT_BATCH_SIZE)
+        if updates:
+            updated_at = now()
+            for obj in updates:
+                obj.updated_at = updated_at
+            model.objects.bulk_update(
+                updates, sorted(update_fields) + ["updated_at"], batch_size=PORTFOLIO_IMPORT_BATCH_SIZE
+            )
+        if deletes:
+            model.objects.filter(pk__in=[obj.pk for obj in deletes]).delete()
+
+    def _apply_section(self, plan):
+        model = plan["model"]
+        updates = [obj for obj, changed, media in plan["updates"]]
+        update_fields = {name for obj, changed, media in plan["updates"] for name in changed}
+        self._write(model, [instance for instance, media in plan["inserts"]], updates, update_fields, plan["deletes"])
+        self.summary[plan["section"]] = {
+            "created": len(plan["inserts"]), "updated": len(updates),
+            "deleted": len(plan["deletes"]), "unchanged": len(plan["unchanged"]),
+        }
+
+        entries = plan["inserts"] + [(obj, media) for obj, changed, media in plan["updates"] + plan["unchanged"]]
+        media_plans = [(entry, media) for entry, media in entries if media is not None]
+        if media_plans:
+            self._apply_media(plan["section"], media_plans)
+
+    def _apply_media(self, section, media_plans):
+        model, parent_field = self.media_sections[section]
+        inserts, updates, deletes, unchanged = [], [], [], 0
+        for entry, plan in media_plans:
+            for media in plan["inserts"]:
+                # new entries only have a primary key once they are inserted
+                setattr(media, parent_field, entry)
+                inserts.append(media)
+            updates.extend(plan["updates"])
+            deletes.extend(plan["deletes"])
+            unchanged += len(plan["unchanged"])
+        self._write(model, inserts, updates, {"description"}, deletes)
+        self.summary[f"{section}_media"] = {
+            "created": len(inserts), "updated": len(updates), "deleted": len(deletes), "unchanged": unchanged,
+        }
+
+
+def import_portfolio(user, document, dry_run=False):
+    """ Applies a whole portfolio document to the portfolio of `user`, see `PortfolioImporter` """
+    return PortfolioImporter(user, document).run(dry_run=dry_run)
@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.http import Http404
 from django.urls import reverse
@@ -5,17 +6,18 @@ from django.contrib.auth import get_user_model
 from utils.snippets import autoslugFromUUID, autoslugWithFieldAndUUID
 from django.utils.translation import gettext_lazy as _
 from django.utils import dateformat
-from utils.helpers import CustomModelManager
+from utils.helpers import BulkInsertManagerMixin, CustomModelManager
 from portfolios.file_upload_helpers import (
     skill_icon_path, professional_experience_company_image_path, professional_experience_media_path,
-    education_media_path, certification_media_path, project_media_path, interest_icon_path, testimonial_image_path
+    education_media_path, certification_media_path, project_media_path, interest_icon_path, testimonial_image_path,
+    media_upload_path
 )
 
 
 """ *************** Skill *************** """
 
 
-class SkillManager(models.Manager):
+class SkillManager(BulkInsertManagerMixin, models.Manager):
 
     def all(self):
         return self.get_queryset()
@@ -54,6 +56,8 @@ class Skill(models.Model):
     slug = models.SlugField(max_length=255, unique=True)
     title = models.CharField(max_length=150)
     image = models.ImageField(upload_to=skill_icon_path, blank=True, null=True)
+    # size, mime type, dimensions and dominant color (see `utils.file_metadata`)
+    image_metadata = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -106,6 +110,8 @@ class ProfessionalExperience(models.Model):
     slug = models.SlugField(max_length=255, unique=True)
     company = models.CharField(max_length=150)
     company_image = models.ImageField(upload_to=professional_experience_company_image_path, blank=True, null=True)
+    # size, mime type, dimensions and dominant color (see `utils.file_metadata`)
+    company_image_metadata = models.JSONField(default=dict, blank=True, editable=False)
     address = models.CharField(max_length=254, blank=True, null=True)
     designation = models.CharField(max_length=150)
     job_type = models.CharField(max_length=20, choices=JobType.choices, default=JobType.FULL_TIME)
@@ -148,6 +154,8 @@ class ProfessionalExperienceMedia(models.Model):
     )
     slug = models.SlugField(max_length=255, unique=True)
     file = models.FileField(upload_to=professional_experience_media_path, blank=True, null=True)
+    file_size = models.PositiveBigIntegerField(default=0, editable=False)
+    file_metadata = models.JSONField(default=dict, blank=True, editable=False)
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -215,6 +223,8 @@ class EducationMedia(models.Model):
     education = models.ForeignKey(Education, on_delete=models.CASCADE, related_name="education_media")
     slug = models.SlugField(max_length=255, unique=True)
     file = models.FileField(upload_to=education_media_path)
+    file_size = models.PositiveBigIntegerField(default=0, editable=False)
+    file_metadata = models.JSONField(default=dict, blank=True, editable=False)
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -281,6 +291,8 @@ class CertificationMedia(models.Model):
     certification = models.ForeignKey(Certification, on_delete=models.CASCADE, related_name="certification_media")
     slug = models.SlugField(max_length=255, unique=True)
     file = models.FileField(upload_to=certification_media_path)
+    file_size = models.PositiveBigIntegerField(default=0, editable=False)
+    file_metadata = models.JSONField(default=dict, blank=True, editable=False)
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -343,6 +355,8 @@ class ProjectMedia(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="project_media")
     slug = models.SlugField(max_length=255, unique=True)
     file = models.FileField(upload_to=project_media_path)
+    file_size = models.PositiveBigIntegerField(default=0, editable=False)
+    file_metadata = models.JSONField(default=dict, blank=True, editable=False)
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -370,6 +384,8 @@ class Interest(models.Model):
     slug = models.SlugField(max_length=255, unique=True)
     title = models.CharField(max_length=200)
     icon = models.ImageField(upload_to=interest_icon_path, blank=True, null=True)
+    # size, mime type, dimensions and dominant color (see `utils.file_metadata`)
+    icon_metadata = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -397,6 +413,8 @@ class Testimonial(models.Model):
     name = models.CharField(max_length=150)
     designation = models.CharField(max_length=150)
     image = models.ImageField(upload_to=testimonial_image_path, blank=True, null=True)
+    # size, mime type, dimensions and dominant color (see `utils.file_metadata`)
+    image_metadata = models.JSONField(default=dict, blank=True, editable=False)
     description = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -413,3 +431,104 @@ class Testimonial(models.Model):
 
     def __str__(self):
         return self.name
+
+
+""" *************** Portfolio Snapshot *************** """
+
+
+class PortfolioSnapshot(models.Model):
+    """
+    Published portfolio snapshot (read model).
+    Details: The whole portfolio of a user serialized (gzip compressed JSON) in one row per language by
+    `portfolios.snapshots.publish_portfolio()`. A publish replaces the row only when the content hash changes.
+    """
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name="user_portfolio_snapshots")
+    language = models.CharField(max_length=10)
+    content = models.BinaryField()
+    content_hash = models.CharField(max_length=64)
+    entries = models.PositiveIntegerField(default=0)
+    published_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'portfolio_snapshot'
+        verbose_name = _('Portfolio Snapshot')
+        verbose_name_plural = _('Portfolio Snapshots')
+        get_latest_by = "published_at"
+        unique_together = (('user', 'language'),)
+
+    def __str__(self):
+        return f"{self.user} ({self.language})"
+
+
+""" *************** Media Upload *************** """
+
+
+class MediaUpload(models.Model):
+    """
+    Resumable media upload (see `portfolios.uploads`).
+    Details: Chunks are received in any order (also in parallel) and assembled into `file` once all `size` bytes
+    arrived. Section forms reference completed uploads by `id` instead of posting the files.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name="user_media_uploads")
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    file = models.FileField(upload_to=media_upload_path, blank=True, null=True)
+    # sha256 hex digest of the assembled file
+    checksum = models.CharField(max_length=64, blank=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'media_upload'
+        verbose_name = _('Media Upload')
+        verbose_name_plural = _('Media Uploads')
+        get_latest_by = "created_at"
+
+    def __str__(self):
+        return f"{self.filename} ({self.user})"
+
+
+class MediaUploadChunk(models.Model):
+    upload = models.ForeignKey(MediaUpload, on_delete=models.CASCADE, related_name="chunks")
+    offset = models.PositiveBigIntegerField()
+    size = models.PositiveIntegerField()
+    # sha256 hex digest of the chunk
+    checksum = models.CharField(max_length=64)
+
+    class Meta:
+        db_table = 'media_upload_chunk'
+        verbose_name = _('Media Upload Chunk')
+        verbose_name_plural = _('Media Upload Chunks')
+        unique_together = (('upload', 'offset'),)
+
+    def __str__(self):
+        return f"{self.upload} [{self.offset}:{self.offset + self.size}]"
+
+
+""" *************** Storage Usage *************** """
+
+
+class StorageUsage(models.Model):
+    """
+    Media a user stores per section and media model (see `portfolios.storage_usage`).
+    Details: The counters are updated in the transaction of every media insert and delete, quotas are checked
+    against them. `reconcile_storage_usage` recomputes them from the storage.
+    """
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name="user_storage_usage")
+    section = models.CharField(max_length=50)
+    # label of the media model, e.g. `portfolios.projectmedia`
+    model = models.CharField(max_length=100)
+    files = models.BigIntegerField(default=0)
+    bytes = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'storage_usage'
+        verbose_name = _('Storage Usage')
+        verbose_name_plural = _('Storage Usage')
+        unique_together = (('user', 'section', 'model'),)
+
+    def __str__(self):
+        return f"{self.user} ({self.model})"
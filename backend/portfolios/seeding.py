@@ -0,0 +1,309 @@
+import base64
+import gzip
+import hashlib
+import io
+import json
+import random
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+from factory.random import reseed_random
+from portfolios.factories.skill_factory import SkillFactory
+from portfolios.factories.professional_experience_factory import (
+    ProfessionalExperienceFactory, ProfessionalExperienceMediaFactory
+)
+from portfolios.factories.education_factory import EducationFactory, EducationMediaFactory
+from portfolios.factories.certification_factory import CertificationFactory, CertificationMediaFactory
+from portfolios.factories.project_factory import ProjectFactory, ProjectMediaFactory
+from portfolios.factories.interest_factory import InterestFactory
+from portfolios.factories.testimonial_factory import TestimonialFactory
+from portfolios.storage_usage import rebuild_storage_usage
+from users.factories.user_factory import UserFactory
+from utils.storages import add_content_references, is_content_addressed
+
+
+# fixed scale profiles: number of users, entries per section and user, media files per entry
+SEED_PROFILES = {
+    "S": {"seed": 1001, "users": 10, "entries": 5, "media": 2},
+    "M": {"seed": 1002, "users": 100, "entries": 10, "media": 2},
+    "L": {"seed": 1003, "users": 1000, "entries": 10, "media": 2},
+    "XL": {"seed": 1004, "users": 10000, "entries": 10, "media": 2},
+}
+
+# (section factory, media factory, media parent field) in insert order
+SEED_SECTION_FACTORIES = (
+    (SkillFactory, None, None),
+    (ProfessionalExperienceFactory, ProfessionalExperienceMediaFactory, "professional_experience"),
+    (EducationFactory, EducationMediaFactory, "education"),
+    (CertificationFactory, CertificationMediaFactory, "certification"),
+    (ProjectFactory, ProjectMediaFactory, "project"),
+    (InterestFactory, None, None),
+    (TestimonialFactory, None, None),
+)
+
+# media files share a small pool of payloads, so dumps store every distinct content once
+SEED_MEDIA_PAYLOAD_SIZES = (1024, 2 * 1024, 4 * 1024, 8 * 1024)
+SEED_USER_CHUNK_SIZE = 100
+SEED_LOAD_BATCH_SIZE = 5000
+
+
+def get_seed_models():
+    """ Seeded models in insert (foreign key) order """
+    seed_models = [get_user_model()]
+    for section_factory, media_factory, parent_field in SEED_SECTION_FACTORIES:
+        seed_models.append(section_factory._meta.model)
+        if media_factory is not None:
+            seed_models.append(media_factory._meta.model)
+    return seed_models
+
+
+def check_seed_tables_empty():
+    """ Raises ValueError when a seeded table already has rows (seeds are generated and loaded into empty tables) """
+    tables = [model._meta.db_table for model in get_seed_models() if model._base_manager.exists()]
+    if tables:
+        raise ValueError(f"Seeded tables are not empty: {', '.join(tables)}")
+
+
+# ----------------------------------------------------
+# *** Generate ***
+# ----------------------------------------------------
+
+def _make_unique_per_user(model, entries):
+    """ Suffixes repeated fake values of fields that are unique together with the user (e.g. skill titles) """
+    for unique_fields in model._meta.unique_together:
+        if "user" not in unique_fields or len(unique_fields) != 2:
+            continue
+        field = [name for name in unique_fields if name != "user"][0]
+        seen = set()
+        for entry in entries:
+            value = getattr(entry, field)
+            suffix = 1
+            while (entry.user_id, value) in seen:
+                suffix += 1
+                value = f"{getattr(entry, field)} {suffix}"
+            setattr(entry, field, value)
+            seen.add((entry.user_id, value))
+    return entries
+
+
+def generate_portfolios(users, entries, media, payloads):
+    """[Bulk inserts full portfolios for saved users with the portfolio factories]
+
+    Args:
+        users ([list]): [portfolio owners]
+        entries ([int]): [entries per section and user]
+        media ([int]): [media files per entry]
+        payloads ([list]): [media file contents to pick from]
+    """
+    for section_factory, media_factory, parent_field in SEED_SECTION_FACTORIES:
+        model = section_factory._meta.model
+        section_entries = model.objects.bulk_insert(_make_unique_per_user(model, [
+            section_factory.build(user=user) for user in users for _ in range(entries)
+        ]))
+        if media_factory is not None:
+            media_factory._meta.model.objects.bulk_insert(
+                media_factory.build(**{parent_field: entry, "file__data": random.choice(payloads)})
+                for entry in section_entries for _ in range(media)
+            )
+
+
+def generate_seed_profile(name, log=print):
+    """[Generates a scale profile with the portfolio factories and fixed random seeds]
+
+    Args:
+        name ([str]): [profile name, one of `SEED_PROFILES`]
+        log (optional): [progress output function]. Defaults to print.
+
+    Returns:
+        [int]: [number of generated users]
+    """
+    profile = SEED_PROFILES[name]
+    check_seed_tables_empty()
+    reseed_random(profile["seed"])
+    random.seed(profile["seed"])
+    payloads = [random.getrandbits(size * 8).to_bytes(size, "big") for size in SEED_MEDIA_PAYLOAD_SIZES]
+
+    user_model = get_user_model()
+    for start in range(0, profile["users"], SEED_USER_CHUNK_SIZE):
+        users = user_model.objects.bulk_insert(
+            UserFactory.build(email=f"seed-{name.lower()}-{index}@example.com")
+            for index in range(start, min(start + SEED_USER_CHUNK_SIZE, profile["users"]))
+        )
+        generate_portfolios(users, profile["entries"], profile["media"], payloads)
+        log(f"Generated {start + len(users)}/{profile['users']} users with their portfolios...")
+    return profile["users"]
+
+
+# ----------------------------------------------------
+# *** Dump ***
+# ----------------------------------------------------
+
+def _write_record(stream, record):
+    stream.write(json.dumps(record, default=str, separators=(",", ":")) + "\n")
+
+
+def _dump_files(stream, model, file_fields, row, blobs):
+    for index, field in file_fields:
+        name = row[index]
+        if not name or not field.storage.exists(name):
+            continue
+        with field.storage.open(name) as file:
+            content = file.read()
+        digest = hashlib.sha256(content).hexdigest()
+        if digest not in blobs:
+            blobs.add(digest)
+            _write_record(stream, {"blob": digest, "data": base64.b64encode(content).decode()})
+        _write_record(stream, {"file": name, "blob": digest, "field": f"{model._meta.label}.{field.name}"})
+
+
+def dump_seed(path, profile=None, log=print):
+    """[Writes all seeded tables and their files to a gzipped NDJSON dump]
+
+    The dump has a `{"table", "columns"}` header per table followed by one JSON array per row,
+    media file contents are stored once per distinct content (`blob`) and referenced by name (`file`).
+
+    Args:
+        path ([str]): [dump file path]
+        profile ([str], optional): [profile name recorded in the dump]. Defaults to None.
+        log (optional): [progress output function]. Defaults to print.
+    """
+    blobs = set()
+    with gzip.open(path, "wt", encoding="utf-8") as stream:
+        _write_record(stream, {"profile": profile})
+        for model in get_seed_models():
+            fields = model._meta.concrete_fields
+            file_fields = [(index, field) for index, field in enumerate(fields) if isinstance(field, models.FileField)]
+            _write_record(stream, {"table": model._meta.db_table, "columns": [field.column for field in fields]})
+            count = 0
+            for row in model._base_manager.order_by("pk").values_list(
+                *[field.attname for field in fields]
+            ).iterator(chunk_size=SEED_LOAD_BATCH_SIZE):
+                _write_record(stream, row)
+                _dump_files(stream, model, file_fields, row, blobs)
+                count += 1
+            log(f"Dumped {count} rows of {model._meta.db_table}...")
+
+
+# ----------------------------------------------------
+# *** Load ***
+# ----------------------------------------------------
+
+def _copy_text_value(value):
+    """ Formats a value for PostgreSQL `COPY ... FROM STDIN` (text format) """
+    if value is None:
+        return "\\N"
+    return (
+        str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+def _insert_rows(cursor, table, columns, rows):
+    quote_name = connection.ops.quote_name
+    if connection.vendor == "postgresql":
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(_copy_text_value(value) for value in row) + "\n")
+        buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY {quote_name(table)} ({', '.join(quote_name(column) for column in columns)}) FROM STDIN", buffer
+        )
+    else:
+        cursor.executemany(
+            f"INSERT INTO {quote_name(table)} ({', '.join(quote_name(column) for column in columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})",
+            rows
+        )
+
+
+class SeedTableLoader(object):
+    """
+    Buffers the rows of one dumped table and inserts them with raw COPY (PostgreSQL) or INSERT statements.
+    Values are only converted to their database representation, no model instances or signals are involved.
+    """
+
+    def __init__(self, cursor, table, columns, models_by_table, batch_size):
+        model = models_by_table[table]
+        fields_by_column = {field.column: field for field in model._meta.concrete_fields}
+        self.cursor = cursor
+        self.table = table
+        self.columns = columns
+        self.fields = [fields_by_column[column] for column in columns]
+        self.batch_size = batch_size
+        self.rows = []
+        self.count = 0
+
+    def add(self, row):
+        self.rows.append([
+            None if value is None else field.get_db_prep_save(field.to_python(value), connection)
+            for field, value in zip(self.fields, row)
+        ])
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            _insert_rows(self.cursor, self.table, self.columns, self.rows)
+            self.count += len(self.rows)
+            self.rows = []
+
+
+def _restore_file(record, blobs):
+    app_label, model_name, field_name = record["field"].split(".")
+    storage = apps.get_model(app_label, model_name)._meta.get_field(field_name).storage
+    name = record["file"]
+    if is_content_addressed(name):
+        # named by its content: an existing file is kept, the loaded row is counted as a reference
+        add_content_references([name])
+        if storage.exists(name):
+            return
+    elif storage.exists(name):
+        storage.delete(name)
+    storage.save(name, ContentFile(blobs[record["blob"]]))
+
+
+def load_seed(path, batch_size=SEED_LOAD_BATCH_SIZE, log=print):
+    """[Loads a dump written by `dump_seed()` into empty seeded tables without running the factories]
+
+    Args:
+        path ([str]): [dump file path]
+        batch_size (int, optional): [rows per COPY/INSERT]. Defaults to `SEED_LOAD_BATCH_SIZE`.
+        log (optional): [progress output function]. Defaults to print.
+
+    Returns:
+        [dict]: [table name => number of loaded rows]
+    """
+    seed_models = get_seed_models()
+    models_by_table = {model._meta.db_table: model for model in seed_models}
+    check_seed_tables_empty()
+
+    counts = {}
+    blobs = {}
+    loader = None
+    with transaction.atomic(), connection.cursor() as cursor, gzip.open(path, "rt", encoding="utf-8") as stream:
+        for line in stream:
+            record = json.loads(line)
+            if isinstance(record, list):
+                loader.add(record)
+            elif "table" in record:
+                if loader is not None:
+                    loader.flush()
+                    counts[loader.table] = loader.count
+                    log(f"Loaded {loader.count} rows of {loader.table}...")
+                loader = SeedTableLoader(cursor, record["table"], record["columns"], models_by_table, batch_size)
+            elif "file" in record:
+                _restore_file(record, blobs)
+            elif "blob" in record:
+                blobs[record["blob"]] = base64.b64decode(record["data"])
+        if loader is not None:
+            loader.flush()
+            counts[loader.table] = loader.count
+            log(f"Loaded {loader.count} rows of {loader.table}...")
+
+        # rows were inserted with their primary keys, move the sequences past them
+        for sql in connection.ops.sequence_reset_sql(no_style(), seed_models):
+            cursor.execute(sql)
+        # no signals counted the loaded media
+        rebuild_storage_usage()
+    return counts
@@ -0,0 +1,107 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from utils.signals import post_bulk_delete, post_bulk_insert
+from portfolios.statistics import (
+    PORTFOLIO_SECTIONS, PORTFOLIO_MEDIA_SECTIONS, get_portfolio_owner_id, get_portfolio_owner_ids,
+    invalidate_portfolio_statistics
+)
+from portfolios.storage_usage import (
+    count_media_on_bulk_delete, count_media_on_bulk_insert, count_media_on_delete, count_media_on_save,
+    remember_stored_file
+)
+from portfolios.validation import invalidate_unique_values
+from utils.document_previews import connect_document_previews
+from utils.file_metadata import connect_file_metadata
+from utils.image_optimization import connect_image_optimization
+from utils.image_variants import connect_image_variants
+
+
+UNIQUE_VALUE_SECTIONS = {model: section for section, model, display_field in PORTFOLIO_SECTIONS}
+
+
+def update_media_file_size(sender, instance, raw=False, **kwargs):
+    """ Stores the byte size of a newly assigned media file so that statistics never touch the storage """
+    if raw or not instance.file:
+        return
+    if not instance.file._committed or not instance.file_size:
+        try:
+            instance.file_size = instance.file.size
+        except (OSError, ValueError):
+            instance.file_size = 0
+
+
+def invalidate_statistics_on_write(sender, instance, raw=False, **kwargs):
+    """ Invalidates the cached portfolio statistics of the owner on every insert, update and delete """
+    if not raw:
+        invalidate_portfolio_statistics(get_portfolio_owner_id(instance))
+
+
+def invalidate_statistics_on_bulk_write(sender, instances, **kwargs):
+    """ Invalidates the cached portfolio statistics of every owner of a bulk inserted or deleted batch """
+    for owner_id in get_portfolio_owner_ids(instances):
+        invalidate_portfolio_statistics(owner_id)
+
+
+def invalidate_unique_values_on_write(sender, instance, raw=False, **kwargs):
+    """ Invalidates the cached unique values of the section of a saved or deleted entry """
+    if not raw:
+        invalidate_unique_values(instance.user_id, [UNIQUE_VALUE_SECTIONS[sender]])
+
+
+def invalidate_unique_values_on_bulk_write(sender, instances, **kwargs):
+    """ Invalidates the cached unique values of the section of every owner of a bulk inserted or deleted batch """
+    for owner_id in {instance.user_id for instance in instances}:
+        invalidate_unique_values(owner_id, [UNIQUE_VALUE_SECTIONS[sender]])
+
+
+for section, model, display_field in PORTFOLIO_SECTIONS:
+    # optimised first, the other receivers read the optimised images
+    connect_image_optimization(model)
+    connect_image_variants(model)
+    connect_file_metadata(model)
+    post_save.connect(invalidate_statistics_on_write, sender=model, dispatch_uid=f"{model.__name__}_statistics_save")
+    post_delete.connect(
+        invalidate_statistics_on_write, sender=model, dispatch_uid=f"{model.__name__}_statistics_delete"
+    )
+    post_bulk_insert.connect(
+        invalidate_statistics_on_bulk_write, sender=model, dispatch_uid=f"{model.__name__}_statistics_bulk_insert"
+    )
+    post_bulk_delete.connect(
+        invalidate_statistics_on_bulk_write, sender=model, dispatch_uid=f"{model.__name__}_statistics_bulk_delete"
+    )
+    post_save.connect(
+        invalidate_unique_values_on_write, sender=model, dispatch_uid=f"{model.__name__}_unique_values_save"
+    )
+    post_delete.connect(
+        invalidate_unique_values_on_write, sender=model, dispatch_uid=f"{model.__name__}_unique_values_delete"
+    )
+    post_bulk_insert.connect(
+        invalidate_unique_values_on_bulk_write, sender=model, dispatch_uid=f"{model.__name__}_unique_values_bulk_insert"
+    )
+    post_bulk_delete.connect(
+        invalidate_unique_values_on_bulk_write, sender=model, dispatch_uid=f"{model.__name__}_unique_values_bulk_delete"
+    )
+
+for section, model, parent_field in PORTFOLIO_MEDIA_SECTIONS:
+    pre_save.connect(update_media_file_size, sender=model, dispatch_uid=f"{model.__name__}_file_size")
+    # storage accounting (after `file_size` is set)
+    pre_save.connect(remember_stored_file, sender=model, dispatch_uid=f"{model.__name__}_storage_usage_pre_save")
+    post_save.connect(count_media_on_save, sender=model, dispatch_uid=f"{model.__name__}_storage_usage_save")
+    post_delete.connect(count_media_on_delete, sender=model, dispatch_uid=f"{model.__name__}_storage_usage_delete")
+    post_bulk_insert.connect(
+        count_media_on_bulk_insert, sender=model, dispatch_uid=f"{model.__name__}_storage_usage_bulk_insert"
+    )
+    post_bulk_delete.connect(
+        count_media_on_bulk_delete, sender=model, dispatch_uid=f"{model.__name__}_storage_usage_bulk_delete"
+    )
+    connect_file_metadata(model)
+    connect_document_previews(model)
+    post_save.connect(invalidate_statistics_on_write, sender=model, dispatch_uid=f"{model.__name__}_statistics_save")
+    post_delete.connect(
+        invalidate_statistics_on_write, sender=model, dispatch_uid=f"{model.__name__}_statistics_delete"
+    )
+    post_bulk_insert.connect(
+        invalidate_statistics_on_bulk_write, sender=model, dispatch_uid=f"{model.__name__}_statistics_bulk_insert"
+    )
+    post_bulk_delete.connect(
+        invalidate_statistics_on_bulk_write, sender=model, dispatch_uid=f"{model.__name__}_statistics_bulk_delete"
+    )
@@ -0,0 +1,143 @@
+import gzip
+import hashlib
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.utils import translation
+from portfolios.importer import PORTFOLIO_IMPORT_SECTIONS, PORTFOLIO_IMPORT_MEDIA_FIELDS
+from portfolios.models import PortfolioSnapshot
+from portfolios.statistics import PORTFOLIO_MEDIA_SECTIONS
+from utils.file_metadata import get_metadata_fields
+from utils.helpers import now
+
+
+# user fields shown on a public portfolio
+PORTFOLIO_SNAPSHOT_PROFILE_FIELDS = (
+    "username", "name", "nick_name", "gender", "image", "about", "website", "contact", "contact_email", "address"
+)
+
+
+def get_snapshot_languages():
+    return [code for code, name in settings.LANGUAGES]
+
+
+def _pop_file_metadata(model, row, files):
+    """ Moves the file metadata of a row (see `utils.file_metadata`) to `files` (file name => metadata) """
+    for field, metadata_field in get_metadata_fields(model):
+        metadata = row.pop(metadata_field)
+        if row.get(field.name):
+            files[row[field.name]] = metadata
+
+
+def _serialize_sections(user, files):
+    """ `{section: [entries]}` in the import document format (one query per section and media table) """
+    media_sections = {section: (model, parent_field) for section, model, parent_field in PORTFOLIO_MEDIA_SECTIONS}
+    sections = {}
+    for section, form_class, key_fields in PORTFOLIO_IMPORT_SECTIONS:
+        model = form_class._meta.model
+        fields = list(form_class._meta.fields)
+        metadata_fields = [
+            metadata_field for field, metadata_field in get_metadata_fields(model) if field.name in fields
+        ]
+        rows = model.objects.filter(user=user).values("pk", *fields, *metadata_fields)
+        entries = {}
+        for row in rows:
+            _pop_file_metadata(model, row, files)
+            entries[row.pop("pk")] = row
+        if section in media_sections:
+            model, parent_field = media_sections[section]
+            for entry in entries.values():
+                entry["media"] = []
+            for row in model.objects.filter(**{f"{parent_field}__user": user}).values(
+                f"{parent_field}_id", *PORTFOLIO_IMPORT_MEDIA_FIELDS, "file_metadata"
+            ):
+                _pop_file_metadata(model, row, files)
+                entries[row.pop(f"{parent_field}_id")]["media"].append(row)
+        sections[section] = list(entries.values())
+    return sections
+
+
+def _serialize_labels():
+    """ Section and choice labels in the active language """
+    labels = {"sections": {}, "choices": {}}
+    for section, form_class, key_fields in PORTFOLIO_IMPORT_SECTIONS:
+        model = form_class._meta.model
+        labels["sections"][section] = str(model._meta.verbose_name_plural)
+        for field in model._meta.concrete_fields:
+            if field.choices:
+                labels["choices"][f"{section}.{field.name}"] = {
+                    str(value): str(label) for value, label in field.flatchoices
+                }
+    return labels
+
+
+def encode_snapshot(data):
+    """[Encodes snapshot data]
+
+    Returns:
+        [tuple]: [gzip compressed canonical JSON, sha256 hash of the JSON]
+    """
+    content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, separators=(",", ":")).encode()
+    # no timestamp in the gzip header, equal data gives equal bytes
+    return gzip.compress(content, mtime=0), hashlib.sha256(content).hexdigest()
+
+
+def decode_snapshot(snapshot):
+    return json.loads(gzip.decompress(bytes(snapshot.content)))
+
+
+def publish_portfolio(user, languages=None):
+    """[Serializes the current portfolio of a user into one snapshot row per language]
+
+    The snapshot holds the public profile, the sections in the import document format (so `sections` of a
+    snapshot can be imported again), the stored metadata of their files and the section and choice labels of its
+    language.
+
+    Args:
+        user ([User]): [portfolio owner]
+        languages ([list], optional): [language codes]. Defaults to all `LANGUAGES`.
+
+    Returns:
+        [dict]: [language => (snapshot, True if the snapshot changed)]
+    """
+    languages = languages or get_snapshot_languages()
+    profile = {}
+    # metadata of the files (dimensions etc., see `utils.file_metadata`) by file name
+    files = {}
+    for name in PORTFOLIO_SNAPSHOT_PROFILE_FIELDS:
+        value = getattr(user, name)
+        profile[name] = (value.name or None) if isinstance(value, models.fields.files.FieldFile) else value
+    if user.image:
+        files[user.image.name] = user.image_metadata
+    sections = _serialize_sections(user, files)
+    entries = sum(len(section_entries) for section_entries in sections.values())
+
+    published = {}
+    with transaction.atomic():
+        existing = {
+            snapshot.language: snapshot for snapshot in PortfolioSnapshot.objects.filter(user=user).defer("content")
+        }
+        published_at = now()
+        for language in languages:
+            with translation.override(language):
+                labels = _serialize_labels()
+            content, content_hash = encode_snapshot({
+                "language": language, "profile": profile, "sections": sections, "files": files, "labels": labels
+            })
+            snapshot = existing.get(language)
+            if snapshot is not None and snapshot.content_hash == content_hash:
+                published[language] = (snapshot, False)
+                continue
+            snapshot, created = PortfolioSnapshot.objects.update_or_create(user=user, language=language, defaults={
+                "content": content, "content_hash": content_hash, "entries": entries, "published_at": published_at
+            })
+            published[language] = (snapshot, True)
+    return published
+
+
+def get_portfolio_snapshot(username, language):
+    """ The published snapshot of a live user in a language (one indexed row), None if not published """
+    return PortfolioSnapshot.objects.filter(
+        user__username=username, user__deleted__isnull=True, language=language
+    ).first()
@@ -0,0 +1,198 @@
+import datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from portfolios.models import (
+    Skill,
+    ProfessionalExperience, ProfessionalExperienceMedia,
+    Education, EducationMedia,
+    Certification, CertificationMedia,
+    Project, ProjectMedia,
+    Interest,
+    Testimonial
+)
+from utils.helpers import now
+
+
+# (section key, model, display field). The section key is also the url name of the section's list view.
+PORTFOLIO_SECTIONS = (
+    ("skills", Skill, "title"),
+    ("professional_experiences", ProfessionalExperience, "company"),
+    ("educations", Education, "school"),
+    ("certifications", Certification, "name"),
+    ("projects", Project, "title"),
+    ("interests", Interest, "title"),
+    ("testimonials", Testimonial, "name"),
+)
+
+# (section key, media model, parent field)
+PORTFOLIO_MEDIA_SECTIONS = (
+    ("professional_experiences", ProfessionalExperienceMedia, "professional_experience"),
+    ("educations", EducationMedia, "education"),
+    ("certifications", CertificationMedia, "certification"),
+    ("projects", ProjectMedia, "project"),
+)
+
+STATISTICS_CACHE_KEY = "portfolio-statistics-{user_id}"
+STATISTICS_CACHE_TIMEOUT = getattr(settings, "PORTFOLIO_STATISTICS_CACHE_TIMEOUT", 60 * 60)
+CERTIFICATION_EXPIRY_WARNING_DAYS = getattr(settings, "CERTIFICATION_EXPIRY_WARNING_DAYS", 90)
+RECENT_ACTIVITY_SIZE = 10
+
+
+def get_statistics_cache_key(user_id):
+    return STATISTICS_CACHE_KEY.format(user_id=user_id)
+
+
+def _aggregate_queryset(model, user_field, user, section, size=None, expiring=None):
+    """ Returns a single-row `(section, total, size, latest, expiring)` aggregate of `model` for `user` """
+    return (
+        model.objects.filter(**{user_field: user})
+        .order_by()
+        .values(user_field)
+        .annotate(
+            section=Value(section, output_field=models.CharField()),
+            total=Count("id"),
+            size=Coalesce(Sum(size), Value(0), output_field=models.BigIntegerField())
+            if size else Value(0, output_field=models.BigIntegerField()),
+            latest=Max("updated_at"),
+            expiring=Count("id", filter=expiring) if expiring else Value(0, output_field=models.IntegerField()),
+        )
+        .values_list("section", "total", "size", "latest", "expiring")
+    )
+
+
+def _statistics_queryset(user):
+    """ UNION ALL of one aggregate row per section and media table (a single database round trip) """
+    today = now().date()
+    expiring = Q(
+        does_not_expire=False, expiration_date__gte=today,
+        expiration_date__lte=today + datetime.timedelta(days=CERTIFICATION_EXPIRY_WARNING_DAYS)
+    )
+    querysets = [
+        _aggregate_queryset(
+            model, "user", user, section, expiring=expiring if model is Certification else None
+        )
+        for section, model, display_field in PORTFOLIO_SECTIONS
+    ] + [
+        _aggregate_queryset(model, f"{parent_field}__user", user, f"{section}__media", size="file_size")
+        for section, model, parent_field in PORTFOLIO_MEDIA_SECTIONS
+    ]
+    return querysets[0].union(*querysets[1:], all=True)
+
+
+def _recent_activity_queryset(user):
+    """ UNION ALL of the latest updated entries across all sections """
+    querysets = [
+        model.objects.filter(user=user)
+        .order_by()
+        .annotate(
+            section=Value(section, output_field=models.CharField()),
+            label=models.F(display_field),
+        )
+        .values_list("section", "label", "updated_at")
+        for section, model, display_field in PORTFOLIO_SECTIONS
+    ]
+    return querysets[0].union(*querysets[1:], all=True).order_by("-updated_at")[:RECENT_ACTIVITY_SIZE]
+
+
+def compute_portfolio_statistics(user):
+    """[Computes dashboard statistics of a user's portfolio directly from the database]
+
+    Args:
+        user ([User]): [portfolio owner]
+
+    Returns:
+        [dict]: [per section counts, media counts and bytes, latest update and expiring certifications]
+    """
+    sections = {
+        section: {"total": 0, "media": 0, "media_size": 0, "latest": None}
+        for section, model, display_field in PORTFOLIO_SECTIONS
+    }
+    expiring_certifications = 0
+
+    for section, total, size, latest, expiring in _statistics_queryset(user):
+        if section.endswith("__media"):
+            section = sections[section[:-len("__media")]]
+            section["media"] = total
+            section["media_size"] = size
+        else:
+            sections[section]["total"] = total
+            sections[section]["latest"] = latest
+            expiring_certifications += expiring
+
+    latest_updates = [section["latest"] for section in sections.values() if section["latest"]]
+
+    return {
+        "sections": sections,
+        "total_entries": sum(section["total"] for section in sections.values()),
+        "total_media": sum(section["media"] for section in sections.values()),
+        "total_media_size": sum(section["media_size"] for section in sections.values()),
+        "latest_update": max(latest_updates) if latest_updates else None,
+        "expiring_certifications": expiring_certifications,
+        "recent_activity": [
+            {"section": section, "label": label, "updated_at": updated_at}
+            for section, label, updated_at in _recent_activity_queryset(user)
+        ],
+    }
+
+
+def get_portfolio_statistics(user):
+    """ Returns the cached portfolio statistics of `user`, computing them on a cache miss """
+    cache_key = get_statistics_cache_key(user.id)
+    statistics = cache.get(cache_key)
+    if statistics is None:
+        statistics = compute_portfolio_statistics(user)
+        cache.set(cache_key, statistics, STATISTICS_CACHE_TIMEOUT)
+    return statistics
+
+
+def invalidate_portfolio_statistics(user_id):
+    """ Drops the cached statistics of a user once the current transaction commits """
+    if user_id is not None:
+        transaction.on_commit(lambda: cache.delete(get_statistics_cache_key(user_id)))
+
+
+def get_portfolio_owner_id(instance):
+    """[Returns the owner (user) id of a portfolio section or media instance]
+
+    Media instances resolve the owner through their parent section; the parent is only fetched
+    (as a single `user_id` value) when it is not already cached on the instance.
+    """
+    if hasattr(instance, "user_id"):
+        return instance.user_id
+    for section, model, parent_field in PORTFOLIO_MEDIA_SECTIONS:
+        if isinstance(instance, model):
+            field = model._meta.get_field(parent_field)
+            if field.is_cached(instance):
+                return getattr(instance, parent_field).user_id
+            return field.related_model.objects.filter(
+                pk=getattr(instance, field.attname)
+            ).values_list("user_id", flat=True).first()
+    return None
+
+
+def get_portfolio_owner_ids(instances):
+    """[Returns the owner (user) ids of many portfolio section or media instances]
+
+    Like `get_portfolio_owner_id()`, but the parents of media instances without a cached parent
+    are fetched with one query per parent model instead of one per instance.
+    """
+    owner_ids = set()
+    unresolved = {}
+    for instance in instances:
+        if hasattr(instance, "user_id"):
+            owner_ids.add(instance.user_id)
+            continue
+        for section, model, parent_field in PORTFOLIO_MEDIA_SECTIONS:
+            if isinstance(instance, model):
+                field = model._meta.get_field(parent_field)
+                if field.is_cached(instance):
+                    owner_ids.add(getattr(instance, parent_field).user_id)
+                else:
+                    unresolved.setdefault(field.related_model, set()).add(getattr(instance, field.attname))
+    for parent_model, parent_ids in unresolved.items():
+        owner_ids.update(parent_model.objects.filter(pk__in=parent_ids).values_list("user_id", flat=True))
+    owner_ids.discard(None)
+    return owner_ids
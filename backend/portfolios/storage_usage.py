@@ -0,0 +1,253 @@
+from django import forms
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
+from django.template.defaultfilters import filesizeformat
+from django.utils.translation import gettext_lazy as _
+from portfolios.models import MediaUpload, StorageUsage
+from portfolios.statistics import PORTFOLIO_MEDIA_SECTIONS, get_portfolio_owner_id
+from utils.helpers import now
+
+
+MEDIA_STORAGE_QUOTA = getattr(settings, "MEDIA_STORAGE_QUOTA", None)
+
+# media model => (section key, parent field)
+MEDIA_SECTIONS = {model: (section, parent_field) for section, model, parent_field in PORTFOLIO_MEDIA_SECTIONS}
+
+
+class StorageQuotaExceeded(forms.ValidationError):
+    pass
+
+
+def add_storage_usage(user_id, model, files, size):
+    """[Adds to the counters of a user's media model, in the current transaction]
+
+    The counters are updated with `F()` expressions, concurrent writers never lose an update. Missing counters
+    are only created for additions: a removal from a missing counter (e.g. while the user is being deleted) is a
+    no-op, `reconcile_storage_usage` sets it right.
+
+    Args:
+        user_id ([int]): [owner id]
+        model ([Model]): [media model]
+        files ([int]): [number of files to add (negative to remove)]
+        size ([int]): [bytes to add (negative to remove)]
+    """
+    if user_id is None or not (files or size):
+        return
+    section, parent_field = MEDIA_SECTIONS[model]
+    queryset = StorageUsage.objects.filter(user_id=user_id, section=section, model=model._meta.label_lower)
+    values = {"files": F("files") + files, "bytes": F("bytes") + size, "updated_at": now()}
+    if queryset.update(**values) or files < 0 or size < 0:
+        return
+    try:
+        with transaction.atomic():
+            StorageUsage.objects.create(
+                user_id=user_id, section=section, model=model._meta.label_lower, files=files, bytes=size
+            )
+    except IntegrityError:
+        # created by a concurrent transaction
+        queryset.update(**values)
+
+
+def get_storage_usage(user):
+    """[Returns the stored media of a user from the counters (no storage is touched)]
+
+    Returns:
+        [dict]: [`files` and `bytes` in total, per section (`sections`) and per media model label (`models`)]
+    """
+    usage = {"files": 0, "bytes": 0, "sections": {}, "models": {}}
+    for section, model, files, size in StorageUsage.objects.filter(user=user).values_list(
+        "section", "model", "files", "bytes"
+    ):
+        usage["files"] += files
+        usage["bytes"] += size
+        for key, name in (("sections", section), ("models", model)):
+            counters = usage[key].setdefault(name, {"files": 0, "bytes": 0})
+            counters["files"] += files
+            counters["bytes"] += size
+    return usage
+
+
+def get_storage_quota(user):
+    """ Bytes of media `user` may store, None for no limit """
+    return user.storage_quota if user.storage_quota is not None else MEDIA_STORAGE_QUOTA
+
+
+def get_remaining_storage(user):
+    """[Bytes `user` may still store: the quota minus the counters and the pending resumable uploads]
+
+    Returns:
+        [int]: [remaining bytes (never negative), None for no limit]
+    """
+    quota = get_storage_quota(user)
+    if quota is None:
+        return None
+    stored = StorageUsage.objects.filter(user=user).aggregate(
+        size=Coalesce(Sum("bytes"), 0, output_field=models.BigIntegerField())
+    )["size"]
+    pending = MediaUpload.objects.filter(user=user).aggregate(
+        size=Coalesce(Sum("size"), 0, output_field=models.BigIntegerField())
+    )["size"]
+    return max(quota - stored - pending, 0)
+
+
+def validate_storage_quota(user, size, name=None, remaining=None):
+    """[Checks that `size` more bytes fit into the storage quota of `user`]
+
+    Args:
+        user ([User]): [uploader]
+        size ([int]): [bytes to store]
+        name ([str], optional): [file name used in the message]. Defaults to None.
+        remaining ([int], optional): [remaining bytes if already read]. Defaults to None.
+
+    Raises:
+        StorageQuotaExceeded: [if they do not]
+    """
+    if remaining is None:
+        remaining = get_remaining_storage(user)
+    if remaining is not None and size > remaining:
+        raise StorageQuotaExceeded(
+            _("Your media storage quota (%(quota)s) is exhausted, %(remaining)s are left. Current file (%(name)s) is "
+              "%(size)s.") % {
+                "quota": filesizeformat(get_storage_quota(user)), "remaining": filesizeformat(remaining),
+                "name": name or _("upload"), "size": filesizeformat(size)
+            }
+        )
+
+
+def _get_media_files(instance):
+    """ (files, bytes) a media row stores """
+    return (1, instance.file_size) if instance.file else (0, 0)
+
+
+def _get_owner_ids(model, instances):
+    """ Owner (user) ids of media instances, with one query for the parents that are not cached """
+    field = model._meta.get_field(MEDIA_SECTIONS[model][1])
+    parent_ids = {getattr(instance, field.attname) for instance in instances if not field.is_cached(instance)}
+    owners = {}
+    if parent_ids:
+        owners = dict(field.related_model.objects.filter(pk__in=parent_ids).values_list("pk", "user_id"))
+    return [
+        getattr(instance, field.name).user_id if field.is_cached(instance)
+        else owners.get(getattr(instance, field.attname))
+        for instance in instances
+    ]
+
+
+def reconcile_storage_usage(user_id, storage=default_storage):
+    """[Recomputes the counters of a user from the stored files]
+
+    The sizes are read from the storage, `file_size` columns that do not match are corrected. The user's counters
+    are locked while they are recomputed, so concurrent media writes are counted exactly once.
+
+    Args:
+        user_id ([int]): [owner id]
+        storage ([Storage], optional): [media storage]. Defaults to default_storage.
+
+    Returns:
+        [tuple]: [usage per media model label ({label: (files, bytes)}), number of corrected `file_size` columns]
+    """
+    usage = {}
+    corrected = 0
+    with transaction.atomic():
+        list(StorageUsage.objects.select_for_update().filter(user_id=user_id).values_list("pk"))
+        for section, model, parent_field in PORTFOLIO_MEDIA_SECTIONS:
+            files = size = 0
+            rows = model._base_manager.filter(**{f"{parent_field}__user_id": user_id}).exclude(file="").exclude(
+                file__isnull=True
+            ).order_by().values_list("pk", "file", "file_size")
+            # not streamed, rows are updated while they are read
+            for pk, name, file_size in list(rows):
+                try:
+                    stored_size = storage.size(name)
+                except OSError:
+                    # the row still references the file, it is counted without bytes
+                    stored_size = 0
+                if stored_size != file_size:
+                    model._base_manager.filter(pk=pk).update(file_size=stored_size)
+                    corrected += 1
+                files += 1
+                size += stored_size
+            StorageUsage.objects.update_or_create(
+                user_id=user_id, section=section, model=model._meta.label_lower,
+                defaults={"files": files, "bytes": size}
+            )
+            usage[model._meta.label_lower] = (files, size)
+        StorageUsage.objects.filter(user_id=user_id).exclude(model__in=list(usage)).delete()
+    return usage, corrected
+
+
+def rebuild_storage_usage():
+    """[Recomputes the counters of every user from the `file_size` columns, in the current transaction]
+
+    For media rows written without signals (e.g. by `load_seed`), no storage is touched.
+
+    Returns:
+        [int]: [number of counters]
+    """
+    counters = []
+    for section, model, parent_field in PORTFOLIO_MEDIA_SECTIONS:
+        rows = model._base_manager.exclude(file="").exclude(file__isnull=True).order_by().values(
+            f"{parent_field}__user_id"
+        ).annotate(files=Count("pk"), size=Coalesce(Sum("file_size"), 0, output_field=models.BigIntegerField()))
+        counters.extend(
+            StorageUsage(
+                user_id=row[f"{parent_field}__user_id"], section=section, model=model._meta.label_lower,
+                files=row["files"], bytes=row["size"]
+            )
+            for row in rows
+        )
+    StorageUsage.objects.all().delete()
+    StorageUsage.objects.bulk_create(counters, batch_size=1000)
+    return len(counters)
+
+
+# ----------------------------------------------------
+# *** Signal Receivers ***
+# ----------------------------------------------------
+
+def remember_stored_file(sender, instance, raw=False, **kwargs):
+    """ Remembers (files, bytes) of a row as stored before its file is replaced or cleared """
+    if raw or instance._state.adding or (instance.file and instance.file._committed):
+        return
+    stored = sender._base_manager.filter(pk=instance.pk).values_list("file", "file_size").first()
+    if stored is not None:
+        instance._stored_file = (1, stored[1]) if stored[0] else (0, 0)
+
+
+def count_media_on_save(sender, instance, created, **kwargs):
+    """ Counts an inserted media row, or the difference of a replaced or cleared file """
+    if created:
+        files, size = _get_media_files(instance)
+    else:
+        stored = instance.__dict__.pop("_stored_file", None)
+        if stored is None:
+            return
+        files, size = [new - old for new, old in zip(_get_media_files(instance), stored)]
+    add_storage_usage(get_portfolio_owner_id(instance), sender, files, size)
+
+
+def count_media_on_delete(sender, instance, **kwargs):
+    files, size = _get_media_files(instance)
+    add_storage_usage(get_portfolio_owner_id(instance), sender, -files, -size)
+
+
+def count_media_on_bulk_write(sender, instances, sign=1):
+    totals = {}
+    for owner_id, instance in zip(_get_owner_ids(sender, instances), instances):
+        files, size = _get_media_files(instance)
+        total = totals.setdefault(owner_id, [0, 0])
+        total[0] += files
+        total[1] += size
+    for owner_id, (files, size) in totals.items():
+        add_storage_usage(owner_id, sender, sign * files, sign * size)
+
+
+def count_media_on_bulk_insert(sender, instances, **kwargs):
+    count_media_on_bulk_write(sender, instances)
+
+
+def count_media_on_bulk_delete(sender, instances, **kwargs):
+    count_media_on_bulk_write(sender, instances, sign=-1)
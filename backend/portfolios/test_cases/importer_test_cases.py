@@ -0,0 +1,110 @@
+import json
+import shutil
+import tempfile
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from portfolios.importer import import_portfolio
+from portfolios.models import Skill, Certification, CertificationMedia, Project
+from users.factories.user_factory import UserFactory
+from utils.helpers import get_user_media_path
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PortfolioImportTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.file = default_storage.save(
+            f"{get_user_media_path(cls.user)}/imports/certificate.pdf", ContentFile(b"certificate")
+        )
+
+    def _document(self):
+        return {
+            "skills": [{"title": "Python"}, {"title": "Django"}],
+            "certifications": [{
+                "name": "Cloud Architect", "organization": "Cloud", "issue_date": "2021-01-01",
+                "does_not_expire": True,
+                "media": [{"file": self.file, "description": "Certificate"}],
+            }],
+            "projects": [{
+                "title": "Portfolio", "short_description": "Website", "start_date": "2020-01-01",
+                "currently_working": True,
+            }],
+        }
+
+    def test_import_creates_and_reimport_leaves_rows_untouched(self):
+        summary = import_portfolio(self.user, self._document())
+        self.assertEqual(summary["skills"], {"created": 2, "updated": 0, "deleted": 0, "unchanged": 0})
+        self.assertEqual(summary["certifications_media"]["created"], 1)
+        media = CertificationMedia.objects.get(certification__user=self.user)
+        self.assertEqual((media.file.name, media.file_size), (self.file, len(b"certificate")))
+
+        updated_at = dict(Skill.objects.filter(user=self.user).values_list("title", "updated_at"))
+        with self.assertNumQueries(7):
+            # savepoint, lock, one select per section and media section and no writes
+            summary = import_portfolio(self.user, self._document())
+        self.assertEqual(summary["skills"], {"created": 0, "updated": 0, "deleted": 0, "unchanged": 2})
+        self.assertEqual(summary["certifications_media"]["unchanged"], 1)
+        self.assertEqual(dict(Skill.objects.filter(user=self.user).values_list("title", "updated_at")), updated_at)
+
+    def test_import_applies_only_the_difference(self):
+        import_portfolio(self.user, self._document())
+        document = self._document()
+        document["skills"] = [{"title": "python"}, {"title": "Go"}]
+        document["projects"][0]["short_description"] = "Personal website"
+        document["certifications"][0]["media"] = []
+
+        summary = import_portfolio(self.user, document)
+        self.assertEqual(summary["skills"], {"created": 1, "updated": 1, "deleted": 1, "unchanged": 0})
+        self.assertEqual(summary["projects"]["updated"], 1)
+        self.assertEqual(summary["certifications"]["unchanged"], 1)
+        self.assertEqual(summary["certifications_media"]["deleted"], 1)
+        self.assertEqual(sorted(Skill.objects.filter(user=self.user).values_list("title", flat=True)), ["Go", "python"])
+        self.assertEqual(Project.objects.get(user=self.user).short_description, "Personal website")
+
+    def test_invalid_document_is_not_applied(self):
+        document = self._document()
+        document["projects"][0]["end_date"] = "2019-01-01"
+        document["certifications"][0]["media"][0]["file"] = "imports/missing.pdf"
+        with self.assertRaises(ValidationError) as context:
+            import_portfolio(self.user, document)
+        self.assertIn("projects[0].end_date", context.exception.message_dict)
+        self.assertIn("certifications[0].media[0].file", context.exception.message_dict)
+        self.assertFalse(Skill.objects.filter(user=self.user).exists())
+
+    def test_import_rejects_files_of_other_users_and_path_traversal(self):
+        other_file = default_storage.save(
+            f"{get_user_media_path(UserFactory())}/imports/certificate.pdf", ContentFile(b"certificate")
+        )
+        document = self._document()
+        document["certifications"][0]["media"] = [
+            {"file": other_file}, {"file": f"{get_user_media_path(self.user)}/../{other_file}"}
+        ]
+        with self.assertRaises(ValidationError) as context:
+            import_portfolio(self.user, document)
+        errors = context.exception.message_dict
+        self.assertEqual(errors["certifications[0].media[0].file"], [f"File `{other_file}` does not exist."])
+        self.assertIn("is not a valid file name", errors["certifications[0].media[1].file"][0])
+        self.assertFalse(CertificationMedia.objects.exists())
+
+    def test_import_view_dry_run(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("portfolios:portfolio_import") + "?dry_run=1", json.dumps(self._document()),
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["summary"]["skills"]["created"], 2)
+        self.assertFalse(Certification.objects.filter(user=self.user).exists())
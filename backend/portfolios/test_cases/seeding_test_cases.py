@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.test import TestCase, override_settings
+from portfolios.models import StorageUsage
+from portfolios.seeding import SEED_PROFILES, dump_seed, generate_seed_profile, get_seed_models, load_seed
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+@mock.patch.dict(SEED_PROFILES, {"T": {"seed": 1, "users": 2, "entries": 2, "media": 1}})
+class SeedingTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def _snapshot(self):
+        return [list(model._base_manager.order_by("pk").values_list()) for model in get_seed_models()]
+
+    def _usage(self):
+        return sorted(StorageUsage.objects.values_list("user_id", "model", "files", "bytes"))
+
+    def test_dump_reloads_identical_rows(self):
+        generate_seed_profile("T", log=lambda *args: None)
+        snapshot = self._snapshot()
+        usage = self._usage()
+        self.assertTrue(usage)
+        self.assertEqual([len(rows) for rows in snapshot], [2, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "seed.jsonl.gz")
+            dump_seed(path, profile="T", log=lambda *args: None)
+            with self.assertRaises(ValueError):
+                load_seed(path, log=lambda *args: None)
+
+            for model in reversed(get_seed_models()):
+                model._base_manager.all()._raw_delete(model._base_manager.db)
+            counts = load_seed(path, batch_size=3, log=lambda *args: None)
+
+        self.assertEqual(sum(counts.values()), 46)
+        self.assertEqual(self._snapshot(), snapshot)
+        # the loaded media is counted like the generated media
+        self.assertEqual(self._usage(), usage)
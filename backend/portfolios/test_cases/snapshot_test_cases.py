@@ -0,0 +1,67 @@
+import datetime
+import gzip
+import json
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from portfolios.importer import import_portfolio
+from portfolios.models import PortfolioSnapshot, Project, Skill
+from portfolios.snapshots import decode_snapshot, publish_portfolio
+from users.factories.user_factory import UserFactory
+
+
+class PortfolioSnapshotTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        Skill.objects.create(user=cls.user, title="Python")
+        Project.objects.create(
+            user=cls.user, title="Portfolio", short_description="Website", start_date=datetime.date(2020, 1, 1),
+            currently_working=True
+        )
+
+    def test_publish_writes_only_changed_snapshots(self):
+        published = publish_portfolio(self.user)
+        self.assertEqual(set(published), {"en", "bn"})
+        self.assertTrue(all(changed for snapshot, changed in published.values()))
+        self.assertEqual(PortfolioSnapshot.objects.filter(user=self.user).count(), 2)
+
+        self.assertFalse(any(changed for snapshot, changed in publish_portfolio(self.user).values()))
+        Skill.objects.create(user=self.user, title="Django")
+        snapshot, changed = publish_portfolio(self.user, languages=["en"])["en"]
+        self.assertTrue(changed)
+        self.assertEqual(snapshot.entries, 3)
+        self.assertEqual(
+            sorted(entry["title"] for entry in decode_snapshot(snapshot)["sections"]["skills"]), ["Django", "Python"]
+        )
+
+    def test_snapshot_sections_can_be_imported(self):
+        snapshot, changed = publish_portfolio(self.user, languages=["en"])["en"]
+        other_user = UserFactory()
+        summary = import_portfolio(other_user, decode_snapshot(snapshot)["sections"])
+        self.assertEqual(summary["projects"]["created"], 1)
+        self.assertEqual(list(Skill.objects.filter(user=other_user).values_list("title", flat=True)), ["Python"])
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_published_view_serves_the_row(self):
+        snapshot, changed = publish_portfolio(self.user, languages=["en"])["en"]
+        url = reverse("portfolios:published_portfolio", kwargs={"username": self.user.username})
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["ETag"], f'"{snapshot.content_hash}-gzip"')
+        self.assertEqual(json.loads(gzip.decompress(response.content))["profile"]["username"], self.user.username)
+        identity = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip;q=0, deflate")
+        self.assertFalse(identity.has_header("Content-Encoding"))
+        self.assertEqual(identity["ETag"], f'"{snapshot.content_hash}"')
+        self.assertEqual(json.loads(identity.content)["language"], "en")
+
+        # validators only match their own representation, compared as a list of entity tags
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=f'"x", {response["ETag"]}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=f'"x{snapshot.content_hash}"').status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=identity["ETag"]).status_code, 304)
+
+        self.user.delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,74 @@
+import datetime
+import shutil
+import tempfile
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from portfolios.models import Skill, Certification, CertificationMedia
+from portfolios.factories.skill_factory import SkillFactory
+from portfolios.statistics import compute_portfolio_statistics, get_portfolio_statistics
+from users.factories.user_factory import UserFactory
+from utils.helpers import now
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage', MEDIA_ROOT=MEDIA_ROOT
+)
+class PortfolioStatisticsTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        SkillFactory.create_batch(3, user=cls.user)
+        today = now().date()
+        cls.certification = Certification.objects.create(
+            user=cls.user, name="Certification", organization="Organization",
+            issue_date=today - datetime.timedelta(days=30),
+            expiration_date=today + datetime.timedelta(days=10), does_not_expire=False
+        )
+        CertificationMedia.objects.create(
+            certification=cls.certification, file=ContentFile(b"%PDF-1.4 dummy", name="certificate.pdf")
+        )
+        # another user's data must not be counted
+        SkillFactory()
+
+    def test_statistics_are_computed_with_union_queries(self):
+        # one aggregate UNION query and one recent activity UNION query
+        with self.assertNumQueries(2):
+            statistics = compute_portfolio_statistics(self.user)
+        self.assertEqual(statistics["sections"]["skills"]["total"], 3)
+        self.assertEqual(statistics["sections"]["certifications"]["total"], 1)
+        self.assertEqual(statistics["sections"]["certifications"]["media"], 1)
+        self.assertEqual(statistics["total_media_size"], len(b"%PDF-1.4 dummy"))
+        self.assertEqual(statistics["total_entries"], 4)
+        self.assertEqual(statistics["expiring_certifications"], 1)
+        self.assertEqual(len(statistics["recent_activity"]), 4)
+
+    def test_statistics_are_cached_and_invalidated_on_write(self):
+        get_portfolio_statistics(self.user)
+        with self.assertNumQueries(0):
+            get_portfolio_statistics(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.filter(user=self.user).first().delete()
+        self.assertEqual(get_portfolio_statistics(self.user)["sections"]["skills"]["total"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Certification.objects.filter(user=self.user).update(does_not_expire=True)
+            self.certification.refresh_from_db()
+            self.certification.save()
+        self.assertEqual(get_portfolio_statistics(self.user)["expiring_certifications"], 0)
+
+    def test_dashboard_renders_statistics(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/dashboard/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["statistics"]["total_entries"], 4)
@@ -0,0 +1,140 @@
+import datetime
+import io
+import shutil
+import tempfile
+from io import StringIO
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from portfolios.models import Education, EducationMedia, Project, ProjectMedia, Skill, StorageUsage
+from portfolios.storage_usage import get_remaining_storage, get_storage_usage
+from users.factories.user_factory import UserFactory
+from utils.helpers import bulk_delete
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+CONTENT = b"%PDF-1.4 " + bytes(range(256)) * 4
+
+
+def _get_png_content():
+    buffer = io.BytesIO()
+    Image.effect_noise((32, 32), 60).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+PNG_CONTENT = _get_png_content()
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    FILE_CLEANUP_IN_BACKGROUND=False,
+    DOCUMENT_PREVIEWS_IN_BACKGROUND=False, MEDIA_ROOT=MEDIA_ROOT
+)
+class StorageUsageTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.project = Project.objects.create(
+            user=self.user, title="Project", short_description="Project", start_date=datetime.date(2020, 1, 1)
+        )
+
+    def get_media(self, size=len(CONTENT)):
+        return ProjectMedia(project=self.project, file=ContentFile(CONTENT[:size], name="media.pdf"))
+
+    def assertUsage(self, files, size):
+        usage = get_storage_usage(self.user)
+        self.assertEqual((usage["files"], usage["bytes"]), (files, size))
+        self.assertEqual(usage["sections"].get("projects", {"files": 0, "bytes": 0}), {"files": files, "bytes": size})
+        self.assertEqual(
+            usage["models"].get("portfolios.projectmedia", {"files": 0, "bytes": 0}), {"files": files, "bytes": size}
+        )
+
+    def test_counters_follow_inserts_replacements_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            media = self.get_media()
+            media.save()
+            self.assertUsage(1, len(CONTENT))
+            ProjectMedia.objects.bulk_insert([self.get_media(100), self.get_media(200)])
+            self.assertUsage(3, len(CONTENT) + 300)
+
+            media.file = ContentFile(CONTENT[:50], name="replaced.pdf")
+            media.save()
+            self.assertUsage(3, 350)
+            # saves that keep the file change nothing
+            media.description = "Description"
+            media.save()
+            self.assertUsage(3, 350)
+
+            media.delete()
+            self.assertUsage(2, 300)
+            bulk_delete(Project.objects.filter(pk=self.project.pk))
+            self.assertUsage(0, 0)
+
+    def test_reconcile_recomputes_the_counters_from_the_storage(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            media = ProjectMedia.objects.bulk_insert([self.get_media(100), self.get_media(200)])
+        # drifted counters and a wrong size column
+        StorageUsage.objects.filter(user=self.user).update(files=7, bytes=7)
+        ProjectMedia.objects.filter(pk=media[0].pk).update(file_size=1)
+        StorageUsage.objects.create(user=self.user, section="projects", model="portfolios.removedmedia", files=1)
+
+        output = StringIO()
+        call_command("reconcile_storage_usage", "--user", str(self.user.pk), "--workers", "1", stdout=output)
+        self.assertIn("1 file sizes corrected", output.getvalue())
+        self.assertUsage(2, 300)
+        self.assertEqual(ProjectMedia.objects.get(pk=media[0].pk).file_size, 100)
+        self.assertEqual(
+            set(StorageUsage.objects.filter(user=self.user).values_list("model", flat=True)),
+            {"portfolios.professionalexperiencemedia", "portfolios.educationmedia", "portfolios.certificationmedia",
+             "portfolios.projectmedia"}
+        )
+
+    def test_quota_is_enforced_before_uploads_are_stored(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.get_media(600).save()
+        self.user.storage_quota = 1000
+        self.user.save()
+        self.assertEqual(get_remaining_storage(self.user), 400)
+        self.client.force_login(self.user)
+
+        # resumable uploads announce their size
+        response = self.client.post(
+            reverse("portfolios:media_upload"), HTTP_UPLOAD_LENGTH="500", HTTP_UPLOAD_FILENAME="transcript.pdf"
+        )
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("storage quota", response.json()["errors"][0])
+        self.assertEqual(self.client.post(
+            reverse("portfolios:media_upload"), HTTP_UPLOAD_LENGTH="300", HTTP_UPLOAD_FILENAME="transcript.pdf"
+        ).status_code, 201)
+        # the pending upload is reserved
+        self.assertEqual(get_remaining_storage(self.user), 100)
+
+        # form uploads are stopped while they are received
+        response = self.client.post(reverse("portfolios:education_create"), {
+            "school": "School", "degree": "Degree", "field_of_study": "Science", "start_date": "2020-01-01",
+            "currently_studying": True, "file": SimpleUploadedFile("transcript.pdf", CONTENT[:200])
+        })
+        self.assertContains(response, "storage quota")
+        self.assertFalse(Education.objects.exists())
+        self.assertFalse(EducationMedia.objects.exists())
+
+    def test_quota_only_counts_media_uploads(self):
+        self.user.storage_quota = 100
+        self.user.save()
+        self.client.force_login(self.user)
+        # skill icons are not media, the quota does not stop them
+        image = SimpleUploadedFile("logo.png", PNG_CONTENT, content_type="image/png")
+        self.assertGreater(len(PNG_CONTENT), 100)
+        self.client.post(reverse("portfolios:skill_create"), {"title": "Python", "image": image})
+        self.assertTrue(Skill.objects.filter(user=self.user, title="Python").exists())
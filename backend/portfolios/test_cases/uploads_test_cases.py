@@ -0,0 +1,108 @@
+import base64
+import hashlib
+import shutil
+import tempfile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from portfolios.models import Education, EducationMedia, MediaUpload
+from users.factories.user_factory import UserFactory
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = b"%PDF-1.4 " + bytes(range(256)) * 40
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    MEDIA_ROOT=MEDIA_ROOT
+)
+class MediaUploadTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.client.force_login(self.user)
+
+    def create_upload(self, filename="transcript.pdf", size=len(CONTENT)):
+        response = self.client.post(
+            reverse("portfolios:media_upload"), HTTP_UPLOAD_LENGTH=str(size), HTTP_UPLOAD_FILENAME=filename
+        )
+        self.assertEqual(response.status_code, 201)
+        return response["Location"]
+
+    def send_chunk(self, url, offset, data, checksum=None):
+        headers = {"HTTP_UPLOAD_OFFSET": str(offset)}
+        if checksum is not None:
+            headers["HTTP_UPLOAD_CHECKSUM"] = f"sha256 {base64.b64encode(checksum).decode()}"
+        return self.client.generic("PATCH", url, data, content_type="application/offset+octet-stream", **headers)
+
+    def test_chunks_are_received_out_of_order_and_assembled(self):
+        url = self.create_upload()
+        chunks = [(offset, CONTENT[offset:offset + 4096]) for offset in range(0, len(CONTENT), 4096)]
+        for offset, data in reversed(chunks[1:]):
+            self.assertEqual(self.send_chunk(url, offset, data, hashlib.sha256(data).digest()).status_code, 204)
+
+        # nothing without a gap from the start yet, but every other range is known
+        response = self.client.get(url)
+        self.assertEqual(response["Upload-Offset"], "0")
+        self.assertEqual(response.json()["received"], [[4096, len(CONTENT)]])
+
+        # a retried chunk is accepted once more, an overlapping one conflicts
+        self.assertEqual(self.send_chunk(url, chunks[1][0], chunks[1][1]).status_code, 204)
+        self.assertEqual(self.send_chunk(url, 4000, CONTENT[4000:4200]).status_code, 409)
+        # corrupted in transit
+        self.assertEqual(self.send_chunk(url, 0, chunks[0][1], hashlib.sha256(b"other").digest()).status_code, 460)
+
+        self.assertEqual(self.send_chunk(url, 0, chunks[0][1]).status_code, 204)
+        upload = MediaUpload.objects.get(user=self.user)
+        self.assertIsNotNone(upload.completed_at)
+        self.assertEqual(upload.checksum, hashlib.sha256(CONTENT).hexdigest())
+        with upload.file.open("rb") as file:
+            self.assertEqual(file.read(), CONTENT)
+        self.assertEqual(self.client.head(url)["Upload-Offset"], str(len(CONTENT)))
+
+    def test_uploads_are_validated(self):
+        response = self.client.post(
+            reverse("portfolios:media_upload"), HTTP_UPLOAD_LENGTH="10", HTTP_UPLOAD_FILENAME="setup.exe"
+        )
+        self.assertEqual(response.status_code, 400)
+
+        url = self.create_upload(filename="photo.png")
+        response = self.send_chunk(url, 0, CONTENT[:4096])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("is not a .png file", response.json()["errors"][0])
+        self.assertFalse(MediaUpload.objects.exists())
+
+        # uploads of other users are not found
+        url = self.create_upload()
+        self.client.force_login(UserFactory())
+        self.assertEqual(self.send_chunk(url, 0, CONTENT).status_code, 404)
+
+    def test_forms_attach_referenced_uploads(self):
+        url = self.create_upload()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.send_chunk(url, 0, CONTENT)
+        upload = MediaUpload.objects.get()
+        data = {
+            "school": "School", "degree": "Degree", "field_of_study": "Science", "start_date": "2020-01-01",
+            "currently_studying": True
+        }
+
+        response = self.client.post(reverse("portfolios:education_create"), dict(data, upload=["unknown"]))
+        self.assertContains(response, "Uploaded file not found")
+        self.assertFalse(Education.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("portfolios:education_create"), dict(data, upload=[str(upload.pk)]))
+        media = EducationMedia.objects.get(education__user=self.user)
+        self.assertEqual(media.file_size, len(CONTENT))
+        with media.file.open("rb") as file:
+            self.assertEqual(file.read(), CONTENT)
+        self.assertFalse(MediaUpload.objects.exists())
+        self.assertFalse(default_storage.exists(upload.file.name))
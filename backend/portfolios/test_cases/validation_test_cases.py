@@ -0,0 +1,100 @@
+import re
+import shutil
+import tempfile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from portfolios.models import Skill
+from portfolios.factories.skill_factory import SkillFactory
+from portfolios.validation import validate_portfolio_field
+from users.factories.user_factory import UserFactory
+from utils.validators import MAX_UPLOAD_SIZE
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage', MEDIA_ROOT=MEDIA_ROOT
+)
+class PortfolioValidationTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.skill = SkillFactory(user=cls.user, title="Python")
+        # another user's values are no duplicates
+        SkillFactory(title="Django")
+
+    def test_unique_values_are_cached_and_invalidated_on_write(self):
+        self.assertEqual(validate_portfolio_field(self.user, "skills", "title", value=" python "), [
+            "This skill already exists!"
+        ])
+        with self.assertNumQueries(0):
+            self.assertEqual(validate_portfolio_field(self.user, "skills", "title", value="Django"), [])
+            # the entry being updated keeps its own value
+            self.assertEqual(
+                validate_portfolio_field(self.user, "skills", "title", value="Python", slug=self.skill.slug), []
+            )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(user=self.user, title="Django")
+        self.assertEqual(len(validate_portfolio_field(self.user, "skills", "title", value="django")), 1)
+
+    def test_file_metadata_is_checked_with_the_form_rules(self):
+        self.assertEqual(validate_portfolio_field(self.user, "skills", "image", files=[("logo.png", 1024)]), [])
+        errors = validate_portfolio_field(
+            self.user, "projects", "file", files=[("report.pdf", 1024), ("script.exe", 1024)]
+        )
+        self.assertEqual(len(errors), 1)
+        self.assertIn("Current file format is .exe", errors[0])
+        # documents are no images
+        self.assertEqual(len(validate_portfolio_field(self.user, "skills", "image", files=[("cv.pdf", 1)])), 1)
+        errors = validate_portfolio_field(self.user, "skills", "image", files=[("logo.png", MAX_UPLOAD_SIZE + 1)])
+        self.assertIn("Please keep file size under", errors[0])
+
+    def test_validation_view_renders_errors(self):
+        url = reverse("portfolios:portfolio_validate")
+        self.client.force_login(self.user)
+        response = self.client.post(url, {"section": "skills", "field": "title", "value": "PYTHON"})
+        self.assertContains(response, "This skill already exists!")
+        response = self.client.post(url, {"section": "skills", "field": "title", "value": "Rust"})
+        self.assertNotContains(response, "live-validation-error")
+        # htmx sends the input under its own name
+        response = self.client.post(url, {"section": "skills", "field": "title", "title": "PYTHON"})
+        self.assertContains(response, "This skill already exists!")
+        response = self.client.post(
+            url, {"section": "skills", "field": "image", "name": ["big.png"], "size": [MAX_UPLOAD_SIZE + 1]}
+        )
+        self.assertContains(response, "Please keep file size under")
+        self.assertEqual(self.client.post(url, {"section": "unknown", "field": "title"}).status_code, 400)
+        self.assertEqual(
+            self.client.post(url, {"section": "skills", "field": "image", "size": ["big"]}).status_code, 400
+        )
+
+    def test_form_fields_validate_with_htmx(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("portfolios:skill_create"))
+        self.assertContains(response, f'hx-post="{reverse("portfolios:portfolio_validate")}"', count=2)
+        self.assertContains(response, 'hx-params="csrfmiddlewaretoken,section,slug,field,title"')
+        # files are never posted, only their names and sizes
+        self.assertContains(response, 'getSelectedFiles("id_image", "size")')
+        self.assertContains(response, 'hx-params="csrfmiddlewaretoken,section,slug,field,name,size"')
+
+    def test_live_validation_passes_csrf_checks(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.get(reverse("portfolios:skill_create"))
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode()).group(1)
+        params = re.search(r'hx-params="([^"]+title)"', response.content.decode()).group(1).split(",")
+        # htmx only posts the listed parameters of the form
+        data = {"csrfmiddlewaretoken": token, "section": "skills", "slug": "", "field": "title", "title": "PYTHON"}
+        response = client.post(
+            reverse("portfolios:portfolio_validate"), {key: value for key, value in data.items() if key in params}
+        )
+        self.assertContains(response, "This skill already exists!")
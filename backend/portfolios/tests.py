@@ -2,3 +2,10 @@
 from portfolios.test_cases.skill_test_cases import SkillTestCase  # NOQA
 from portfolios.test_cases.professional_experience_test_cases import ProfessionalExperienceTestCase  # NOQA
 from portfolios.test_cases.education_test_cases import EducationTestCase  # NOQA
+from portfolios.test_cases.statistics_test_cases import PortfolioStatisticsTestCase  # NOQA
+from portfolios.test_cases.seeding_test_cases import SeedingTestCase  # NOQA
+from portfolios.test_cases.importer_test_cases import PortfolioImportTestCase  # NOQA
+from portfolios.test_cases.snapshot_test_cases import PortfolioSnapshotTestCase  # NOQA
+from portfolios.test_cases.validation_test_cases import PortfolioValidationTestCase  # NOQA
+from portfolios.test_cases.uploads_test_cases import MediaUploadTestCase  # NOQA
+from portfolios.test_cases.storage_usage_test_cases import StorageUsageTestCase  # NOQA
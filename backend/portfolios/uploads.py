@@ -0,0 +1,323 @@
+import base64
+import binascii
+import hashlib
+import tempfile
+from django import forms
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from portfolios.models import MediaUpload, MediaUploadChunk
+from portfolios.storage_usage import get_remaining_storage, validate_storage_quota
+from utils.helpers import get_user_media_path, now
+from utils.upload_handlers import add_upload_error
+from utils.validators import ALLOWED_FILE_TYPES, validate_file_metadata, validate_file_signature
+
+
+# clients split files into chunks of at most this size (the last chunk may be smaller)
+MEDIA_UPLOAD_CHUNK_SIZE = getattr(settings, "MEDIA_UPLOAD_CHUNK_SIZE", 512 * 1024)
+# section forms uploading media (the `file` field of the `*WithMediaForm` forms), the storage quota counts these
+MEDIA_UPLOAD_FIELD = "file"
+MEDIA_UPLOAD_VIEW_NAMES = {
+    f"portfolios:{section}_{action}"
+    for section in ("professional_experience", "education", "certification", "project")
+    for action in ("create", "update")
+}
+
+
+class UploadConflict(Exception):
+    """ A chunk does not fit the upload (out of bounds, overlapping a received chunk or the upload is complete) """
+
+
+class ChecksumMismatch(Exception):
+    """ The received bytes of a chunk do not match the checksum sent along """
+
+
+def get_chunk_name(upload, offset, checksum):
+    """ Stored name of a received chunk, unique per content so retried chunks are written only once """
+    return f"{get_user_media_path(upload.user)}/uploads/{upload.id}/{offset}-{checksum[:16]}.part"
+
+
+def parse_checksum(header):
+    """[Parses an `Upload-Checksum` header (`sha256 <base64 digest>`, as in the tus checksum extension)]
+
+    Args:
+        header ([str]): [header value]
+
+    Raises:
+        forms.ValidationError: [if the header is malformed or uses another algorithm]
+
+    Returns:
+        [str]: [sha256 hex digest, None without a header]
+    """
+    if not header:
+        return None
+    algorithm, _separator, digest = header.strip().partition(" ")
+    if algorithm.lower() != "sha256":
+        raise forms.ValidationError(_("Unsupported checksum algorithm."))
+    try:
+        digest = base64.b64decode(digest.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        digest = b""
+    if len(digest) != hashlib.sha256().digest_size:
+        raise forms.ValidationError(_("Invalid checksum."))
+    return digest.hex()
+
+
+def create_upload(user, filename, size):
+    """[Starts a resumable upload of a media file, after checking its name and size with the form rules]
+
+    Args:
+        user ([User]): [uploader]
+        filename ([str]): [original file name]
+        size ([int]): [total size in bytes]
+
+    Raises:
+        forms.ValidationError: [if the file would be rejected by the section forms]
+        StorageQuotaExceeded: [if the file does not fit into the user's storage quota]
+
+    Returns:
+        [MediaUpload]: [the created upload]
+    """
+    if not filename or size <= 0:
+        raise forms.ValidationError(_("Empty file."))
+    validate_file_metadata(filename, size, ALLOWED_FILE_TYPES)
+    validate_storage_quota(user, size, name=filename)
+    return MediaUpload.objects.create(user=user, filename=filename[:255], size=size)
+
+
+def get_received_ranges(upload):
+    """ Received byte ranges of an upload as merged `[start, end)` pairs """
+    ranges = []
+    for offset, size in upload.chunks.order_by("offset").values_list("offset", "size"):
+        if ranges and ranges[-1][1] == offset:
+            ranges[-1][1] = offset + size
+        else:
+            ranges.append([offset, offset + size])
+    return ranges
+
+
+def get_upload_offset(upload):
+    """ Number of bytes received without a gap from the start (the `Upload-Offset` a client resumes from) """
+    ranges = get_received_ranges(upload)
+    return ranges[0][1] if ranges and ranges[0][0] == 0 else 0
+
+
+def store_chunk(name, data):
+    if default_storage.exists(name):
+        return
+    stored_name = default_storage.save(name, ContentFile(data))
+    if stored_name != name:
+        # a parallel retry of the same chunk stored it first
+        default_storage.delete(stored_name)
+
+
+def receive_chunk(upload, offset, data, checksum=None):
+    """[Stores one chunk of an upload, chunks may arrive in any order and in parallel]
+
+    The chunk is written to the storage first and recorded afterwards under a lock of the upload row, so parallel
+    requests only serialize on the bookkeeping. The request that completes the upload assembles the file.
+    Retrying a received chunk with the same content is a no-op.
+
+    Args:
+        upload ([MediaUpload]): [upload of the requesting user]
+        offset ([int]): [position of the chunk in the file]
+        data ([bytes]): [chunk content]
+        checksum ([str], optional): [expected sha256 hex digest of the chunk]. Defaults to None.
+
+    Raises:
+        UploadConflict: [if the chunk does not fit the upload]
+        ChecksumMismatch: [if the content does not match `checksum`]
+        forms.ValidationError: [if the first chunk is not of the type of the file name]
+
+    Returns:
+        [MediaUpload]: [the upload, its `file` is set once complete]
+    """
+    if upload.completed_at is not None or offset < 0 or not 0 < len(data) <= MEDIA_UPLOAD_CHUNK_SIZE \
+            or offset + len(data) > upload.size:
+        raise UploadConflict
+    digest = hashlib.sha256(data).hexdigest()
+    if checksum is not None and checksum != digest:
+        raise ChecksumMismatch
+    if offset == 0:
+        validate_file_signature(upload.filename, data)
+    store_chunk(get_chunk_name(upload, offset, digest), data)
+
+    with transaction.atomic():
+        upload = MediaUpload.objects.select_for_update().get(pk=upload.pk)
+        overlapping = [
+            chunk for chunk in upload.chunks.filter(offset__lt=offset + len(data)).values_list(
+                "offset", "size", "checksum"
+            ) if chunk[0] + chunk[1] > offset
+        ]
+        if overlapping == [(offset, len(data), digest)]:
+            return upload
+        if upload.completed_at is not None or overlapping:
+            raise UploadConflict
+        MediaUploadChunk.objects.create(upload=upload, offset=offset, size=len(data), checksum=digest)
+        if get_received_ranges(upload) == [[0, upload.size]]:
+            assemble_upload(upload)
+    return upload
+
+
+def assemble_upload(upload):
+    """[Concatenates the chunks of a complete upload into its `file` and deletes them once committed]
+
+    Args:
+        upload ([MediaUpload]): [upload locked by the caller, with every byte received]
+    """
+    chunk_names = [
+        get_chunk_name(upload, offset, checksum)
+        for offset, checksum in upload.chunks.order_by("offset").values_list("offset", "checksum")
+    ]
+    hasher = hashlib.sha256()
+    with tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE) as assembled:
+        for name in chunk_names:
+            with default_storage.open(name) as chunk:
+                for data in chunk.chunks():
+                    hasher.update(data)
+                    assembled.write(data)
+        assembled.seek(0)
+        upload.file = File(assembled, name=upload.filename)
+        # content addressed names (see `utils.storages`) do not read the file again
+        upload.file.file.content_hash = upload.checksum = hasher.hexdigest()
+        upload.completed_at = now()
+        upload.save(update_fields=["file", "checksum", "completed_at", "updated_at"])
+    transaction.on_commit(lambda: delete_upload_chunks(chunk_names))
+
+
+def delete_upload_chunks(chunk_names):
+    for name in chunk_names:
+        default_storage.delete(name)
+
+
+def abort_upload(upload):
+    """ Deletes an upload with its received chunks (the assembled file goes with the row) """
+    chunk_names = [
+        get_chunk_name(upload, offset, checksum) for offset, checksum in upload.chunks.values_list("offset", "checksum")
+    ]
+    upload.delete()
+    transaction.on_commit(lambda: delete_upload_chunks(chunk_names))
+
+
+def get_completed_uploads(user, upload_ids):
+    """[Resolves the uploads referenced by a section form]
+
+    Args:
+        user ([User]): [form submitter]
+        upload_ids ([list]): [ids of completed uploads of the user]
+
+    Raises:
+        forms.ValidationError: [if an id is unknown, of another user or not completely uploaded]
+
+    Returns:
+        [list]: [the uploads in the order of `upload_ids`]
+    """
+    upload_ids = list(dict.fromkeys(upload_ids))
+    try:
+        uploads = MediaUpload.objects.in_bulk(upload_ids) if upload_ids else {}
+    except forms.ValidationError:
+        # malformed uuid
+        uploads = {}
+    uploads = {str(pk): upload for pk, upload in uploads.items() if upload.user_id == user.pk and upload.completed_at}
+    if len(uploads) != len(upload_ids):
+        raise forms.ValidationError(_("Uploaded file not found, please upload it again."))
+    return [uploads[str(upload_id)] for upload_id in upload_ids]
+
+
+def create_media_from_uploads(media_model, parent_field, parent, uploads):
+    """[Attaches completed uploads as media of a section entry and discards the uploads]
+
+    The media files are saved through their own file field (so its upload path applies). Content addressed
+    media keep the assembled file, which is shared with the deleted upload.
+
+    Args:
+        media_model ([Model]): [media model of the section]
+        parent_field ([str]): [name of the foreign key to the entry]
+        parent ([Model]): [section entry]
+        uploads ([list]): [completed uploads (see `get_completed_uploads()`)]
+
+    Returns:
+        [list]: [inserted media]
+    """
+    if not uploads:
+        return []
+    files = []
+    for upload in uploads:
+        upload.file.open("rb")
+        file = File(upload.file.file, name=upload.filename)
+        file.content_hash = upload.checksum
+        files.append(file)
+    try:
+        media = media_model.objects.bulk_insert(
+            media_model(**{parent_field: parent, "file": file}) for file in files
+        )
+    finally:
+        for file in files:
+            file.close()
+    MediaUpload.objects.filter(pk__in=[upload.pk for upload in uploads]).delete()
+    return media
+
+
+def get_upload_chunk_names():
+    """ Stored names of the received chunks of every upload (streamed, for the media garbage collection) """
+    chunks = MediaUploadChunk.objects.select_related("upload__user").only(
+        "offset", "checksum", "upload__id", "upload__user__username"
+    ).order_by().iterator(chunk_size=2000)
+    for chunk in chunks:
+        yield get_chunk_name(chunk.upload, chunk.offset, chunk.checksum)
+
+
+def purge_stale_uploads(before):
+    """[Aborts the uploads started before a point in time, a form never referenced them]
+
+    Args:
+        before ([datetime]): [uploads created earlier are deleted]
+
+    Returns:
+        [int]: [number of purged uploads]
+    """
+    purged = 0
+    for upload in MediaUpload.objects.filter(created_at__lt=before).select_related("user").iterator():
+        with transaction.atomic():
+            abort_upload(upload)
+        purged += 1
+    return purged
+
+
+class StorageQuotaUploadHandler(FileUploadHandler):
+    """
+    Enforces the storage quota of the requesting user (see `portfolios.storage_usage`) while the media files of a
+    section form arrive: the remaining bytes are read from the counters once per request, the upload stops as soon
+    as the received media bytes exceed them, before any other handler stores them. The error is kept in
+    `request.upload_errors` like the errors of `utils.upload_handlers.UploadValidationHandler`.
+    Only the media field of the `MEDIA_UPLOAD_VIEW_NAMES` views is counted, like the counters do (images such as
+    avatars or skill icons are not).
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        user = getattr(self.request, "user", None)
+        match = getattr(self.request, "resolver_match", None)
+        counted = match is not None and match.view_name in MEDIA_UPLOAD_VIEW_NAMES
+        self.remaining = get_remaining_storage(user) if counted and user.is_authenticated else None
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.remaining is not None and self.field_name == MEDIA_UPLOAD_FIELD:
+            self.received += len(raw_data)
+            if self.received > self.remaining:
+                try:
+                    validate_storage_quota(
+                        self.request.user, self.received, name=self.file_name, remaining=self.remaining
+                    )
+                except forms.ValidationError as error:
+                    add_upload_error(self.request, self.field_name, error.messages[0])
+                # the rest of the body is not read
+                raise StopUpload(connection_reset=True)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
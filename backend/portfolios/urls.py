@@ -1,6 +1,8 @@
 from django.urls import path
 from portfolios.views import (
     SkillView, ProfessionalExperienceView, EducationView, CertificationView, ProjectView, InterestView, TestimonialView,
+    PortfolioImportView, PortfolioValidationView, MediaUploadView, MediaUploadDetailView, PortfolioPublishView,
+    PublishedPortfolioView,
 )
 
 urlpatterns = [
@@ -13,6 +15,7 @@ urlpatterns = [
     path("skill/<slug>/detail/", SkillView.as_view(action="detail"), name="skill_detail"),
     path("skill/<slug>/update/", SkillView.as_view(action="update"), name="skill_update"),
     path("skill/<slug>/delete/", SkillView.as_view(action="delete"), name="skill_delete"),
+    path("skills/bulk-delete/", SkillView.as_view(action="bulk_delete"), name="skill_bulk_delete"),
 
     # ----------------------------------------------------
     # *** Professional Experience ***
@@ -32,6 +35,9 @@ urlpatterns = [
     path("professional-experience/<slug>/delete/",
          ProfessionalExperienceView.as_view(action="delete"), name="professional_experience_delete"
          ),
+    path("professional-experiences/bulk-delete/",
+         ProfessionalExperienceView.as_view(action="bulk_delete"), name="professional_experience_bulk_delete"
+         ),
     # professional experience media
     path("professional-experience-media/<slug>/delete/",
          ProfessionalExperienceView.as_view(action="media_delete"), name="professional_experience_media_delete"
@@ -45,6 +51,7 @@ urlpatterns = [
     path("education/<slug>/detail/", EducationView.as_view(action="detail"), name="education_detail"),
     path("education/<slug>/update/", EducationView.as_view(action="update"), name="education_update"),
     path("education/<slug>/delete/", EducationView.as_view(action="delete"), name="education_delete"),
+    path("educations/bulk-delete/", EducationView.as_view(action="bulk_delete"), name="education_bulk_delete"),
     # education media
     path("education-media/<slug>/delete/", EducationView.as_view(action="media_delete"), name="education_media_delete"),
 
@@ -56,6 +63,9 @@ urlpatterns = [
     path("certification/<slug>/detail/", CertificationView.as_view(action="detail"), name="certification_detail"),
     path("certification/<slug>/update/", CertificationView.as_view(action="update"), name="certification_update"),
     path("certification/<slug>/delete/", CertificationView.as_view(action="delete"), name="certification_delete"),
+    path("certifications/bulk-delete/",
+         CertificationView.as_view(action="bulk_delete"), name="certification_bulk_delete"
+         ),
     # certification media
     path("certification-media/<slug>/delete/",
          CertificationView.as_view(action="media_delete"), name="certification_media_delete"
@@ -69,6 +79,7 @@ urlpatterns = [
     path("project/<slug>/detail/", ProjectView.as_view(action="detail"), name="project_detail"),
     path("project/<slug>/update/", ProjectView.as_view(action="update"), name="project_update"),
     path("project/<slug>/delete/", ProjectView.as_view(action="delete"), name="project_delete"),
+    path("projects/bulk-delete/", ProjectView.as_view(action="bulk_delete"), name="project_bulk_delete"),
     # project media
     path("project-media/<slug>/delete/",
          ProjectView.as_view(action="media_delete"), name="project_media_delete"
@@ -82,6 +93,7 @@ urlpatterns = [
     path("interest/<slug>/detail/", InterestView.as_view(action="detail"), name="interest_detail"),
     path("interest/<slug>/update/", InterestView.as_view(action="update"), name="interest_update"),
     path("interest/<slug>/delete/", InterestView.as_view(action="delete"), name="interest_delete"),
+    path("interests/bulk-delete/", InterestView.as_view(action="bulk_delete"), name="interest_bulk_delete"),
 
     # ----------------------------------------------------
     # *** Testimonial ***
@@ -91,4 +103,27 @@ urlpatterns = [
     path("testimonial/<slug>/detail/", TestimonialView.as_view(action="detail"), name="testimonial_detail"),
     path("testimonial/<slug>/update/", TestimonialView.as_view(action="update"), name="testimonial_update"),
     path("testimonial/<slug>/delete/", TestimonialView.as_view(action="delete"), name="testimonial_delete"),
+    path("testimonials/bulk-delete/", TestimonialView.as_view(action="bulk_delete"), name="testimonial_bulk_delete"),
+
+    # ----------------------------------------------------
+    # *** Portfolio Import ***
+    # ----------------------------------------------------
+    path("import/", PortfolioImportView.as_view(), name="portfolio_import"),
+
+    # ----------------------------------------------------
+    # *** Live Validation ***
+    # ----------------------------------------------------
+    path("validate/", PortfolioValidationView.as_view(), name="portfolio_validate"),
+
+    # ----------------------------------------------------
+    # *** Media Upload ***
+    # ----------------------------------------------------
+    path("uploads/", MediaUploadView.as_view(), name="media_upload"),
+    path("uploads/<uuid:pk>/", MediaUploadDetailView.as_view(), name="media_upload_detail"),
+
+    # ----------------------------------------------------
+    # *** Portfolio Snapshot ***
+    # ----------------------------------------------------
+    path("publish/", PortfolioPublishView.as_view(), name="portfolio_publish"),
+    path("published/<str:username>/", PublishedPortfolioView.as_view(), name="published_portfolio"),
 ]
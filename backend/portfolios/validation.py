@@ -0,0 +1,149 @@
+from django import forms
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models, transaction
+from django.utils.translation import gettext_lazy as _
+from portfolios.statistics import PORTFOLIO_SECTIONS, PORTFOLIO_MEDIA_SECTIONS
+from utils.validators import ALLOWED_FILE_TYPES, ALLOWED_IMAGE_TYPES, validate_file_metadata
+
+
+# the display field of a section is the field its views keep unique per user (case insensitive)
+PORTFOLIO_UNIQUE_MESSAGES = {
+    "skills": _("This skill already exists!"),
+    "professional_experiences": _("This company already exists!"),
+    "educations": _("This school already exists!"),
+    "certifications": _("This certification already exists!"),
+    "projects": _("This project already exists!"),
+    "interests": _("This interest already exists!"),
+    "testimonials": _("This testimonial already exists!"),
+}
+
+UNIQUE_VALUES_CACHE_KEY = "portfolio-unique-values-{user_id}-{section}"
+UNIQUE_VALUES_CACHE_TIMEOUT = getattr(settings, "PORTFOLIO_UNIQUE_VALUES_CACHE_TIMEOUT", 60 * 60)
+
+
+def get_unique_values_cache_key(user_id, section):
+    return UNIQUE_VALUES_CACHE_KEY.format(user_id=user_id, section=section)
+
+
+def _unique_value(value):
+    return value.casefold().strip()
+
+
+def get_unique_values(user_id, section):
+    """[Returns the cached unique values of a section of a user's portfolio, loading them on a cache miss]
+
+    Args:
+        user_id ([int]): [portfolio owner id]
+        section ([str]): [section key, one of `PORTFOLIO_SECTIONS`]
+
+    Returns:
+        [dict]: [case folded value => slug of the entry holding it]
+    """
+    cache_key = get_unique_values_cache_key(user_id, section)
+    values = cache.get(cache_key)
+    if values is None:
+        model, field = {section: (model, field) for section, model, field in PORTFOLIO_SECTIONS}[section]
+        values = {
+            _unique_value(value): slug
+            for value, slug in model.objects.filter(user_id=user_id).values_list(field, "slug") if value
+        }
+        cache.set(cache_key, values, UNIQUE_VALUES_CACHE_TIMEOUT)
+    return values
+
+
+def invalidate_unique_values(user_id, sections=None):
+    """ Drops the cached unique values of a user (all sections by default) once the current transaction commits """
+    if user_id is None:
+        return
+    sections = sections or [section for section, model, field in PORTFOLIO_SECTIONS]
+    transaction.on_commit(lambda: cache.delete_many([
+        get_unique_values_cache_key(user_id, section) for section in sections
+    ]))
+
+
+def validate_unique_value(user, section, value, slug=None):
+    """[Checks a value of the unique field of a section against the cached values of the user]
+
+    Args:
+        user ([User]): [portfolio owner]
+        section ([str]): [section key]
+        value ([str]): [submitted value]
+        slug ([str], optional): [slug of the entry being updated, its own value is not a duplicate]. Defaults to None.
+
+    Returns:
+        [list]: [error messages, empty if the value is unique]
+    """
+    if not value or not value.strip():
+        return []
+    holder = get_unique_values(user.id, section).get(_unique_value(value))
+    if holder is None or (slug and holder.casefold() == slug.casefold()):
+        return []
+    return [PORTFOLIO_UNIQUE_MESSAGES[section]]
+
+
+def get_upload_types(section, field):
+    """ Allowed extensions of a file field of a section (media uploads are `file`), None if it is no file field """
+    media_sections = {section for section, model, parent_field in PORTFOLIO_MEDIA_SECTIONS}
+    if field == "file" and section in media_sections:
+        return ALLOWED_FILE_TYPES
+    model = {section: model for section, model, display_field in PORTFOLIO_SECTIONS}[section]
+    try:
+        model_field = model._meta.get_field(field)
+    except FieldDoesNotExist:
+        return None
+    if isinstance(model_field, models.ImageField):
+        return ALLOWED_IMAGE_TYPES
+    if isinstance(model_field, models.FileField):
+        return ALLOWED_FILE_TYPES
+    return None
+
+
+def validate_upload_metadata(section, field, files):
+    """[Checks the names and sizes of files before they are uploaded, with the rules of the section forms]
+
+    Args:
+        section ([str]): [section key]
+        field ([str]): [file field name]
+        files ([list]): [(name, size in bytes) of the selected files]
+
+    Returns:
+        [list]: [error messages, empty if every file would be accepted]
+    """
+    allowed_types = get_upload_types(section, field)
+    if allowed_types is None:
+        return [_("Unknown file field.")]
+    kind = "image" if allowed_types is ALLOWED_IMAGE_TYPES else "file"
+    errors = []
+    for name, size in files:
+        try:
+            validate_file_metadata(name, size, allowed_types, kind=kind)
+        except forms.ValidationError as error:
+            errors.extend(error.messages)
+    return errors
+
+
+def validate_portfolio_field(user, section, field, value=None, files=None, slug=None):
+    """[Live validation of one field of a section form, without the form being submitted]
+
+    The unique field of a section is checked against the user's cached values, file fields only by the names
+    and sizes of the selected files. Other fields have no live rules.
+
+    Args:
+        user ([User]): [portfolio owner]
+        section ([str]): [section key]
+        field ([str]): [form field name]
+        value ([str], optional): [submitted value of a text field]. Defaults to None.
+        files ([list], optional): [(name, size in bytes) of the files selected in a file field]. Defaults to None.
+        slug ([str], optional): [slug of the entry being updated]. Defaults to None.
+
+    Returns:
+        [list]: [error messages, empty if the field is valid]
+    """
+    if files is not None:
+        return validate_upload_metadata(section, field, files)
+    unique_fields = {section: field for section, model, field in PORTFOLIO_SECTIONS}
+    if unique_fields[section] == field:
+        return validate_unique_value(user, section, value, slug=slug)
+    return []
@@ -1,3 +1,5 @@
+import gzip
+import json
 from django import forms
 from portfolios.models import (
     Skill,
@@ -6,7 +8,8 @@ from portfolios.models import (
     Certification, CertificationMedia,
     Project, ProjectMedia,
     Interest,
-    Testimonial
+    Testimonial,
+    MediaUpload
 )
 from portfolios.forms import (
     SkillForm,
@@ -17,16 +20,29 @@ from portfolios.forms import (
     InterestForm,
     TestimonialForm
 )
+from portfolios.importer import import_portfolio
+from portfolios.uploads import (
+    MEDIA_UPLOAD_CHUNK_SIZE, UploadConflict, ChecksumMismatch, parse_checksum, create_upload, receive_chunk,
+    abort_upload, get_received_ranges, get_upload_offset, get_completed_uploads, create_media_from_uploads
+)
+from portfolios.snapshots import publish_portfolio, get_portfolio_snapshot
+from portfolios.storage_usage import StorageQuotaExceeded
+from portfolios.validation import PORTFOLIO_UNIQUE_MESSAGES, validate_portfolio_field
 from utils.mixins import CustomViewSetMixin
+from django.core.exceptions import ValidationError
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.contrib import messages
-from django.http import HttpResponseRedirect, Http404
-from django.db import transaction
-from django.utils.translation import gettext_lazy as _
+from django.shortcuts import render
+from django.http import HttpResponse, HttpResponseRedirect, Http404, JsonResponse
+from django.views import View
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.translation import gettext_lazy as _, get_language, get_supported_language_variant
 
 skill_decorators = professional_experience_decorators = education_decorators = certification_decorators = \
-    project_decorators = interest_decorators = testimonial_decorators = [login_required]
+    project_decorators = interest_decorators = testimonial_decorators = portfolio_import_decorators = \
+    portfolio_publish_decorators = portfolio_validation_decorators = media_upload_decorators = [login_required]
 
 
 # ----------------------------------------------------
@@ -40,6 +56,7 @@ class SkillView(CustomViewSetMixin):
     form_class = SkillForm
     success_url = 'portfolios:skills'
     lookup_field = 'slug'
+    validation_section = 'skills'
     update_success_message = _("Skill has been updated successfully.")
     url_list = ["skills", "skill_create", "skill_detail", "skill_update", "skill_delete"]
 
@@ -77,6 +94,7 @@ class ProfessionalExperienceView(CustomViewSetMixin):
     paginate_by = 4
     success_url = 'portfolios:professional_experiences'
     lookup_field = 'slug'
+    validation_section = 'professional_experiences'
     url_list = [
         "professional_experiences", "professional_experience_create", "professional_experience_detail",
         "professional_experience_update", "professional_experience_delete"
@@ -129,6 +147,13 @@ class ProfessionalExperienceView(CustomViewSetMixin):
                 )
                 return super().form_invalid(form)
 
+            # media uploaded beforehand with the resumable upload API (see `portfolios.uploads`)
+            try:
+                uploads = get_completed_uploads(self.request.user, self.request.POST.getlist('upload'))
+            except forms.ValidationError as error:
+                form.add_error(None, error)
+                return super().form_invalid(form)
+
             # save the form
             self.object = form.save()
 
@@ -139,12 +164,12 @@ class ProfessionalExperienceView(CustomViewSetMixin):
             professional_experience_media_form = ProfessionalExperienceMediaForm(self.request.POST, self.request.FILES)
             # check if the form is valid and form has files
             if professional_experience_media_form.is_valid() and len(files) >= 1:
-                with transaction.atomic():  # ensure that all objects are saved otherwise rollback
-                    for file in files:
-                        ProfessionalExperienceMedia.objects.update_or_create(
-                            professional_experience=self.object,
-                            file=file
-                        )
+                # insert all media with a single query (all objects are saved otherwise rollback)
+                ProfessionalExperienceMedia.objects.bulk_insert(
+                    ProfessionalExperienceMedia(professional_experience=self.object, file=file) for file in files
+                )
+            # attach the referenced uploads
+            create_media_from_uploads(ProfessionalExperienceMedia, "professional_experience", self.object, uploads)
 
             return super().form_valid(form)
         return super().form_invalid(form)
@@ -164,6 +189,7 @@ class EducationView(CustomViewSetMixin):
     paginate_by = 4
     success_url = 'portfolios:educations'
     lookup_field = 'slug'
+    validation_section = 'educations'
     display_fields = [
         'school', 'degree', 'address', 'field_of_study', 'start_date', 'end_date', 'currently_studying', 'grade',
         'activities', 'description'
@@ -219,6 +245,13 @@ class EducationView(CustomViewSetMixin):
                 )
                 return super().form_invalid(form)
 
+            # media uploaded beforehand with the resumable upload API (see `portfolios.uploads`)
+            try:
+                uploads = get_completed_uploads(self.request.user, self.request.POST.getlist('upload'))
+            except forms.ValidationError as error:
+                form.add_error(None, error)
+                return super().form_invalid(form)
+
             # save the form
             self.object = form.save()
 
@@ -229,12 +262,12 @@ class EducationView(CustomViewSetMixin):
             education_media_form = EducationMediaForm(self.request.POST, self.request.FILES)
             # check if the form is valid and form has files
             if education_media_form.is_valid() and len(files) >= 1:
-                with transaction.atomic():  # ensure that all objects are saved otherwise rollback
-                    for file in files:
-                        EducationMedia.objects.update_or_create(
-                            education=self.object,
-                            file=file
-                        )
+                # insert all media with a single query (all objects are saved otherwise rollback)
+                EducationMedia.objects.bulk_insert(
+                    EducationMedia(education=self.object, file=file) for file in files
+                )
+            # attach the referenced uploads
+            create_media_from_uploads(EducationMedia, "education", self.object, uploads)
 
             return super().form_valid(form)
         return super().form_invalid(form)
@@ -254,6 +287,7 @@ class CertificationView(CustomViewSetMixin):
     paginate_by = 4
     success_url = 'portfolios:certifications'
     lookup_field = 'slug'
+    validation_section = 'certifications'
     display_fields = [
         'name', 'organization', 'address', 'issue_date', 'expiration_date', 'does_not_expire', 'credential_id',
         'credential_url', 'description'
@@ -309,6 +343,13 @@ class CertificationView(CustomViewSetMixin):
                 )
                 return super().form_invalid(form)
 
+            # media uploaded beforehand with the resumable upload API (see `portfolios.uploads`)
+            try:
+                uploads = get_completed_uploads(self.request.user, self.request.POST.getlist('upload'))
+            except forms.ValidationError as error:
+                form.add_error(None, error)
+                return super().form_invalid(form)
+
             # save the form
             self.object = form.save()
 
@@ -319,12 +360,12 @@ class CertificationView(CustomViewSetMixin):
             certification_media_form = CertificationMediaForm(self.request.POST, self.request.FILES)
             # check if the form is valid and form has files
             if certification_media_form.is_valid() and len(files) >= 1:
-                with transaction.atomic():  # ensure that all objects are saved otherwise rollback
-                    for file in files:
-                        CertificationMedia.objects.update_or_create(
-                            certification=self.object,
-                            file=file
-                        )
+                # insert all media with a single query (all objects are saved otherwise rollback)
+                CertificationMedia.objects.bulk_insert(
+                    CertificationMedia(certification=self.object, file=file) for file in files
+                )
+            # attach the referenced uploads
+            create_media_from_uploads(CertificationMedia, "certification", self.object, uploads)
 
             return super().form_valid(form)
         return super().form_invalid(form)
@@ -344,6 +385,7 @@ class ProjectView(CustomViewSetMixin):
     paginate_by = 4
     success_url = 'portfolios:projects'
     lookup_field = 'slug'
+    validation_section = 'projects'
     display_fields = [
         'title', 'short_description', 'technology', 'start_date', 'end_date', 'currently_working', 'url',
         'description'
@@ -399,6 +441,13 @@ class ProjectView(CustomViewSetMixin):
                 )
                 return super().form_invalid(form)
 
+            # media uploaded beforehand with the resumable upload API (see `portfolios.uploads`)
+            try:
+                uploads = get_completed_uploads(self.request.user, self.request.POST.getlist('upload'))
+            except forms.ValidationError as error:
+                form.add_error(None, error)
+                return super().form_invalid(form)
+
             # save the form
             self.object = form.save()
 
@@ -409,12 +458,12 @@ class ProjectView(CustomViewSetMixin):
             project_media_form = ProjectMediaForm(self.request.POST, self.request.FILES)
             # check if the form is valid and form has files
             if project_media_form.is_valid() and len(files) >= 1:
-                with transaction.atomic():  # ensure that all objects are saved otherwise rollback
-                    for file in files:
-                        ProjectMedia.objects.update_or_create(
-                            project=self.object,
-                            file=file
-                        )
+                # insert all media with a single query (all objects are saved otherwise rollback)
+                ProjectMedia.objects.bulk_insert(
+                    ProjectMedia(project=self.object, file=file) for file in files
+                )
+            # attach the referenced uploads
+            create_media_from_uploads(ProjectMedia, "project", self.object, uploads)
 
             return super().form_valid(form)
         return super().form_invalid(form)
@@ -431,6 +480,7 @@ class InterestView(CustomViewSetMixin):
     form_class = InterestForm
     success_url = 'portfolios:interests'
     lookup_field = 'slug'
+    validation_section = 'interests'
     update_success_message = _("Interest has been updated successfully.")
     url_list = ["interests", "interest_create", "interest_detail", "interest_update", "interest_delete"]
 
@@ -466,6 +516,7 @@ class TestimonialView(CustomViewSetMixin):
     form_class = TestimonialForm
     success_url = 'portfolios:testimonials'
     lookup_field = 'slug'
+    validation_section = 'testimonials'
     update_success_message = _("Testimonial has been updated successfully.")
     url_list = ["testimonials", "testimonial_create", "testimonial_detail", "testimonial_update", "testimonial_delete"]
 
@@ -488,3 +539,216 @@ class TestimonialView(CustomViewSetMixin):
                 )
             )
         return super().form_valid(form)
+
+
+# ----------------------------------------------------
+# *** Portfolio Import ***
+# ----------------------------------------------------
+
+@method_decorator(portfolio_import_decorators, name='dispatch')
+class PortfolioImportView(View):
+    """
+    Applies a whole portfolio JSON document (see `portfolios.importer`) to the portfolio of the requesting user.
+    `?dry_run=1` validates and reports the changes without applying them.
+    """
+    http_method_names = ['post']
+
+    def post(self, request, *args, **kwargs):
+        try:
+            document = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({"errors": {"document": [_("Invalid JSON document.")]}}, status=400)
+        try:
+            summary = import_portfolio(request.user, document, dry_run=request.GET.get('dry_run') in ('1', 'true'))
+        except ValidationError as error:
+            return JsonResponse({"errors": error.message_dict if hasattr(error, 'error_dict') else {
+                "document": error.messages
+            }}, status=400)
+        return JsonResponse({"summary": summary})
+
+
+# ----------------------------------------------------
+# *** Live Validation ***
+# ----------------------------------------------------
+
+@method_decorator(portfolio_validation_decorators, name='dispatch')
+class PortfolioValidationView(View):
+    """
+    Validates one field of a section form while it is filled in and renders its errors as an HTML fragment
+    (see `portfolios.validation`). Text fields send their value under their own name (or as `value`), file fields
+    send `name` and `size` of every selected file instead of the files, so rejected uploads are never posted.
+    """
+    http_method_names = ['post']
+    template_name = "snippets/field-errors.html"
+
+    def post(self, request, *args, **kwargs):
+        section = request.POST.get('section')
+        if section not in PORTFOLIO_UNIQUE_MESSAGES:
+            return HttpResponse(status=400)
+        files = None
+        if 'size' in request.POST:
+            try:
+                sizes = [int(size) for size in request.POST.getlist('size')]
+            except ValueError:
+                return HttpResponse(status=400)
+            files = list(zip(request.POST.getlist('name'), sizes))
+        field = request.POST.get('field')
+        errors = validate_portfolio_field(
+            request.user, section, field,
+            value=request.POST.get('value', request.POST.get(field)), files=files, slug=request.POST.get('slug')
+        )
+        return render(request, self.template_name, {"errors": errors})
+
+
+# ----------------------------------------------------
+# *** Media Upload ***
+# ----------------------------------------------------
+
+@method_decorator(media_upload_decorators, name='dispatch')
+class MediaUploadView(View):
+    """
+    Starts a resumable media upload (see `portfolios.uploads`) from the `Upload-Length` and `Upload-Filename`
+    headers. The response tells the id and chunk size, the chunks are then sent to `MediaUploadDetailView`.
+    """
+    http_method_names = ['post']
+
+    def post(self, request, *args, **kwargs):
+        try:
+            size = int(request.headers.get('Upload-Length', ''))
+        except ValueError:
+            return HttpResponse(status=400)
+        try:
+            upload = create_upload(request.user, request.headers.get('Upload-Filename', ''), size)
+        except StorageQuotaExceeded as error:
+            return JsonResponse({"errors": error.messages}, status=413)
+        except forms.ValidationError as error:
+            return JsonResponse({"errors": error.messages}, status=400)
+        response = JsonResponse({"id": str(upload.id), "chunk_size": MEDIA_UPLOAD_CHUNK_SIZE}, status=201)
+        response['Location'] = reverse('portfolios:media_upload_detail', kwargs={'pk': upload.pk})
+        return response
+
+
+@method_decorator(media_upload_decorators, name='dispatch')
+class MediaUploadDetailView(View):
+    """
+    One resumable upload of the requesting user, tus style.
+    HEAD / GET report `Upload-Offset` (received without a gap) and the received byte ranges, PATCH stores the
+    chunk in the body at the `Upload-Offset` header (chunks may be sent in any order and in parallel, an optional
+    `Upload-Checksum: sha256 <base64>` is verified), DELETE aborts the upload.
+    """
+    http_method_names = ['get', 'head', 'patch', 'delete']
+
+    def get_upload(self):
+        upload = MediaUpload.objects.filter(pk=self.kwargs.get('pk'), user=self.request.user).first()
+        if upload is None:
+            raise Http404(_("Upload not found!"))
+        return upload
+
+    def get_upload_headers(self, response, upload):
+        response['Upload-Length'] = upload.size
+        response['Upload-Offset'] = get_upload_offset(upload)
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    def get(self, request, *args, **kwargs):
+        upload = self.get_upload()
+        return self.get_upload_headers(JsonResponse({
+            "id": str(upload.id), "size": upload.size, "completed": upload.completed_at is not None,
+            "received": get_received_ranges(upload)
+        }), upload)
+
+    def patch(self, request, *args, **kwargs):
+        upload = self.get_upload()
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            checksum = parse_checksum(request.headers.get('Upload-Checksum'))
+        except ValueError:
+            return HttpResponse(status=400)
+        except forms.ValidationError as error:
+            return JsonResponse({"errors": error.messages}, status=400)
+        try:
+            upload = receive_chunk(upload, offset, request.body, checksum=checksum)
+        except UploadConflict:
+            return self.get_upload_headers(HttpResponse(status=409), upload)
+        except ChecksumMismatch:
+            # `460 Checksum Mismatch` of the tus checksum extension
+            return HttpResponse(status=460)
+        except forms.ValidationError as error:
+            abort_upload(upload)
+            return JsonResponse({"errors": error.messages}, status=400)
+        return self.get_upload_headers(HttpResponse(status=204), upload)
+
+    def delete(self, request, *args, **kwargs):
+        abort_upload(self.get_upload())
+        return HttpResponse(status=204)
+
+
+# ----------------------------------------------------
+# *** Portfolio Snapshot ***
+# ----------------------------------------------------
+
+@method_decorator(portfolio_publish_decorators, name='dispatch')
+class PortfolioPublishView(View):
+    """
+    Publishes the current portfolio of the requesting user as snapshots (see `portfolios.snapshots`).
+    """
+    http_method_names = ['post']
+
+    def post(self, request, *args, **kwargs):
+        published = publish_portfolio(request.user)
+        return JsonResponse({"published": {
+            language: {"content_hash": snapshot.content_hash, "entries": snapshot.entries, "changed": changed}
+            for language, (snapshot, changed) in published.items()
+        }})
+
+
+def accepts_gzip(accept_encoding):
+    """[Whether an `Accept-Encoding` request header accepts gzip, honouring q-values (`gzip;q=0` refuses it)]
+
+    Args:
+        accept_encoding ([str]): [header value]
+
+    Returns:
+        [bool]: [True if gzip (or `*` without an explicit gzip entry) has a q-value above 0]
+    """
+    qualities = {}
+    for coding in (accept_encoding or "").split(","):
+        name, *params = [part.strip() for part in coding.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _separator, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0
+        if name:
+            qualities[name.lower()] = quality
+    quality = qualities.get("gzip", qualities.get("x-gzip", qualities.get("*", 0)))
+    return quality > 0
+
+
+class PublishedPortfolioView(View):
+    """
+    Serves the published portfolio snapshot of a user in the current language as JSON, straight from its row:
+    gzip encoded when the client accepts it, with the content hash as ETag (`-gzip` suffixed for the encoded
+    representation).
+    """
+    http_method_names = ['get', 'head']
+
+    def get(self, request, username, *args, **kwargs):
+        snapshot = get_portfolio_snapshot(username, get_supported_language_variant(get_language()))
+        if snapshot is None:
+            raise Http404(_("Portfolio not published!"))
+        encoded = accepts_gzip(request.headers.get('Accept-Encoding'))
+        # both representations have their own strong validator
+        etag = f'"{snapshot.content_hash}-gzip"' if encoded else f'"{snapshot.content_hash}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None and encoded:
+            response = HttpResponse(bytes(snapshot.content), content_type="application/json")
+            response['Content-Encoding'] = 'gzip'
+        elif response is None:
+            response = HttpResponse(gzip.decompress(bytes(snapshot.content)), content_type="application/json")
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
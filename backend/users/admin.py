@@ -13,7 +13,7 @@ class UserAdmin(BaseUserAdmin):
             )}),
         ('Permissions', {
             'fields': (
-                'is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions',
+                'is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions', 'storage_quota',
             )}),
     )
     add_fieldsets = (
@@ -1,7 +1,20 @@
 import factory
+from functools import lru_cache
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils.text import slugify
 from factory.django import DjangoModelFactory
 from utils.helpers import create_factory_data
+from utils.snippets import compact_uuid
+
+
+DUMMY_USER_PASSWORD = 'test12345'
+
+
+@lru_cache(maxsize=None)
+def get_dummy_user_password_hash():
+    # password hashing is slow by design, so all dummy users share a single hash of the same password
+    return make_password(DUMMY_USER_PASSWORD)
 
 
 class UserFactory(DjangoModelFactory):
@@ -9,12 +22,37 @@ class UserFactory(DjangoModelFactory):
         model = get_user_model()
         django_get_or_create = ('email',)
 
+    class Params:
+        email_domain = factory.Faker("free_email_domain")
+
     name = factory.Faker("first_name")
-    email = factory.Faker("email")
-    password = factory.PostGenerationMethodCall('set_password', 'test12345')
+    # random suffix keeps emails unique when generating a large number of users
+    email = factory.LazyAttribute(
+        lambda user: f"{slugify(user.name)}.{compact_uuid()[-8:]}@{user.email_domain}"
+    )
+
+    @factory.post_generation
+    def password(user, create, extracted, **kwargs):
+        if extracted is not None:
+            user.set_password(extracted)
+            return True
+
+    @classmethod
+    def _adjust_kwargs(cls, **kwargs):
+        # users without an explicit password get the shared hash before they are saved or bulk inserted
+        kwargs["password"] = get_dummy_user_password_hash()
+        return kwargs
+
+    @classmethod
+    def _after_postgeneration(cls, instance, create, results=None):
+        # only an explicitly passed password changes the instance after it was saved
+        if create and results and results.get("password"):
+            instance.save()
 
 
-def create_users_with_factory(num_of_data=7, display_name="user", display_name_plural="users", delete_old_data=False):
+def create_users_with_factory(
+    num_of_data=7, display_name="user", display_name_plural="users", delete_old_data=False, **kwargs
+):
 
     return create_factory_data(
         factory=UserFactory,
@@ -22,5 +60,6 @@ def create_users_with_factory(num_of_data=7, display_name="user", display_name_p
         display_name=display_name,
         display_name_plural=display_name_plural,
         delete_old_data=delete_old_data,
-        model=get_user_model()
+        model=get_user_model(),
+        **kwargs
     )
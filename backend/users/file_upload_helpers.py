@@ -1,6 +1,7 @@
 import os
 import time
 from utils.helpers import get_user_media_path
+from utils.storages import content_addressed
 
 
 def get_filename_ext(filepath):
@@ -9,6 +10,7 @@ def get_filename_ext(filepath):
     return name, ext
 
 
+@content_addressed("image")
 def upload_user_image(instance, filename):
     new_filename = "{datetime}".format(datetime=time.strftime("%Y%m%d-%H%M%S"))
     name, ext = get_filename_ext(filename)
@@ -1,18 +1,29 @@
-from django.db import models
-from safedelete.models import SafeDeleteModel, SOFT_DELETE_CASCADE
+from django.db import models, router, transaction
+from django.db.models.functions import Lower
+from safedelete.config import FIELD_NAME
+from safedelete.managers import SafeDeleteManager
+from safedelete.models import SafeDeleteModel, SOFT_DELETE, SOFT_DELETE_CASCADE
 from django.db.models.signals import pre_save
 from django.urls import reverse
 from django.dispatch import receiver
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils import timezone
 from django.http import Http404
-from utils.snippets import autoslugFromUUID, generate_unique_username_from_email
+from utils.snippets import (
+    autoslugFromUUID, generate_unique_username_from_email, generate_unique_usernames_from_emails
+)
+from utils.file_metadata import connect_file_metadata
+from utils.image_optimization import connect_image_optimization
+from utils.image_variants import connect_image_variants, get_image_variant_url
+from utils.helpers import BulkInsertManagerMixin, get_soft_delete_cascade, soft_delete_cascade, undelete_cascade
 from users.file_upload_helpers import upload_user_image
 from django.utils.translation import gettext_lazy as _
 from django.templatetags.static import static
 
 
-class UserManager(BaseUserManager):
+class UserManager(BulkInsertManagerMixin, BaseUserManager):
+    """ Includes soft deleted users, authentication (`get_by_natural_key()`) and the admin keep finding them """
+
     use_in_migrations = True
 
     def _create_user(self, email, password, **extra_fields):
@@ -52,6 +63,17 @@ class UserManager(BaseUserManager):
 
         return self._create_user(email, password, **extra_fields)
 
+    def prepare_for_bulk_insert(self, objs):
+        for obj in objs:
+            if not obj.email:
+                raise ValueError('Users must have an email address')
+            obj.email = self.normalize_email(obj.email)
+        # allocate usernames for the whole batch at once (skipped by `update_username_from_email`)
+        generate_unique_usernames_from_emails(objs)
+        for obj in objs:
+            obj._username_generated = True
+        return super().prepare_for_bulk_insert(objs)
+
     def all(self):
         return self.get_queryset()
 
@@ -102,6 +124,8 @@ class User(SafeDeleteModel, AbstractBaseUser, PermissionsMixin):
     nick_name = models.CharField(max_length=100, null=True, blank=True)
     gender = models.CharField(max_length=20, choices=Gender.choices, blank=True, null=True)
     image = models.ImageField(upload_to=upload_user_image, null=True, blank=True)
+    # size, mime type, dimensions and dominant color (see `utils.file_metadata`)
+    image_metadata = models.JSONField(default=dict, blank=True, editable=False)
     dob = models.DateField(null=True, blank=True, verbose_name="date of birth")
     website = models.URLField(null=True, blank=True)
     contact = models.CharField(max_length=30, null=True, blank=True)
@@ -109,6 +133,8 @@ class User(SafeDeleteModel, AbstractBaseUser, PermissionsMixin):
     address = models.CharField(max_length=254, null=True, blank=True)
     about = models.TextField(null=True, blank=True)
     """ Additional Fields Ends """
+    # bytes of media the user may store, empty for the default `MEDIA_STORAGE_QUOTA`
+    storage_quota = models.PositiveBigIntegerField(null=True, blank=True)
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
@@ -120,12 +146,21 @@ class User(SafeDeleteModel, AbstractBaseUser, PermissionsMixin):
     REQUIRED_FIELDS = []
 
     objects = UserManager()
+    # live users only (`deleted IS NULL`)
+    live_objects = SafeDeleteManager()
 
     class Meta:
         db_table = 'user'
         verbose_name = ("User")
         verbose_name_plural = ("Users")
         ordering = ["-date_joined"]
+        # live lookups use the full unique indexes (soft deleted users keep their email, username and slug, so they
+        # can be restored), the purge gets a partial index on soft deleted rows only (PostgreSQL and SQLite),
+        # `provision_users` looks emails up in any letter case
+        indexes = [
+            models.Index(Lower("email"), name="user_email_lower_idx"),
+            models.Index(fields=["deleted"], name="user_deleted_idx", condition=models.Q(deleted__isnull=False)),
+        ]
 
     def get_absolute_url(self):
         return reverse("users:user_profile")
@@ -147,7 +182,8 @@ class User(SafeDeleteModel, AbstractBaseUser, PermissionsMixin):
 
     def get_user_image(self):
         if self.image:
-            return self.image.url
+            # avatars are shown at 32px (64px on high density screens)
+            return get_image_variant_url(self.image, 64)
         else:
             if self.gender and self.gender == "Male":
                 return static("icons/user/avatar-male.png")
@@ -165,9 +201,45 @@ class User(SafeDeleteModel, AbstractBaseUser, PermissionsMixin):
             return self.contact_email
         return self.email
 
+    def _get_soft_delete_cascade(self, using):
+        return get_soft_delete_cascade(self.__class__._base_manager.using(using).filter(pk=self.pk))
+
+    def soft_delete_cascade_policy_action(self, **kwargs):
+        """
+        Set-based SOFT_DELETE_CASCADE: safedelete collects (loads) every related object of the user and soft deletes
+        them one by one, here the user is soft deleted and the dependent rows are updated with one UPDATE per
+        relation, all in one transaction. Dependent rows get the timestamp of the user and send no signals.
+        """
+        using = kwargs.get('using') or router.db_for_write(self.__class__, instance=self)
+        plan = self._get_soft_delete_cascade(using)
+        if plan is None:
+            return super().soft_delete_cascade_policy_action(**kwargs)
+        with transaction.atomic(using=using):
+            self._delete(force_policy=SOFT_DELETE, **kwargs)
+            soft_delete_cascade(plan, getattr(self, FIELD_NAME))
+
+    def undelete(self, force_policy=None, **kwargs):
+        """ Restores the user and, set-based, the dependent rows soft deleted together with it """
+        if (force_policy or self._safedelete_policy) != SOFT_DELETE_CASCADE:
+            return super().undelete(force_policy=force_policy, **kwargs)
+        using = kwargs.get('using') or router.db_for_write(self.__class__, instance=self)
+        plan = self._get_soft_delete_cascade(using)
+        if plan is None:
+            return super().undelete(force_policy=force_policy, **kwargs)
+        deleted_at = getattr(self, FIELD_NAME)
+        with transaction.atomic(using=using):
+            super().undelete(force_policy=SOFT_DELETE, **kwargs)
+            undelete_cascade(plan, deleted_at)
+
 
 @receiver(pre_save, sender=User)
 def update_username_from_email(sender, instance, **kwargs):
     """ Generates and updates username from user email on User pre_save hook """
-    if not instance.pk:
+    if not instance.pk and not getattr(instance, "_username_generated", False):
         instance.username = generate_unique_username_from_email(instance=instance)
+
+
+# optimisation, renditions and metadata of uploaded profile images
+connect_image_optimization(User)
+connect_image_variants(User)
+connect_file_metadata(User)
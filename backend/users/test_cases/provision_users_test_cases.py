@@ -0,0 +1,60 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from users.factories.user_factory import UserFactory
+
+
+class ProvisionUsersTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        UserFactory(email="foo@example.com", username="foo")
+        UserFactory(email="jane@example.com", username="jane")
+
+    def provision(self, lines, *args):
+        path = os.path.join(self.directory, "users.csv")
+        rejects = os.path.join(self.directory, "rejects.ndjson")
+        with open(path, "w") as file:
+            file.write("email,name,password\n" + "\n".join(lines) + "\n")
+        call_command(
+            "provision_users", path, "--workers", "1", "--rejects", rejects, *args, stdout=StringIO(), stderr=StringIO()
+        )
+        with open(rejects) as file:
+            return {reject["line"]: reject["reason"] for reject in map(json.loads, file)}
+
+    def test_users_are_provisioned_and_invalid_rows_rejected(self):
+        rejects = self.provision([
+            "Foo@example.com,Existing in another case,secret",
+            "jane@other.com,Jane,secret",
+            "JANE@other.com,Duplicate in another case,secret",
+            "not-an-email,Invalid,secret",
+            "jane@third.com,Another Jane,",
+        ])
+        self.assertEqual(set(rejects), {2, 4, 5})
+        self.assertIn("already exists", rejects[2])
+        self.assertIn("Duplicate email", rejects[4])
+        self.assertIn("email", rejects[5].lower())
+        self.assertFalse(get_user_model()._base_manager.filter(email="Foo@example.com").exists())
+
+        # usernames continue after the taken ones
+        users = get_user_model()._base_manager.filter(email__in=["jane@other.com", "jane@third.com"])
+        self.assertEqual(
+            dict(users.values_list("email", "username")), {"jane@other.com": "jane_1", "jane@third.com": "jane_2"}
+        )
+        self.assertTrue(users.get(email="jane@other.com").check_password("secret"))
+        self.assertFalse(users.get(email="jane@third.com").has_usable_password())
+
+    def test_dry_run_inserts_nothing_and_starts_no_workers(self):
+        with mock.patch(
+            "utils.management.commands.provision_users.ProcessPoolExecutor", side_effect=AssertionError
+        ):
+            rejects = self.provision(["new@example.com,New,secret", "FOO@example.com,Existing,secret"], "--dry-run")
+        self.assertEqual(set(rejects), {3})
+        self.assertFalse(get_user_model()._base_manager.filter(email="new@example.com").exists())
@@ -0,0 +1,67 @@
+import datetime
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from portfolios.models import Skill
+from users.factories.user_factory import UserFactory
+from utils.helpers import get_soft_delete_cascade, now
+
+
+class UserSoftDeleteTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        Skill.objects.bulk_insert(Skill(user=cls.user, title=f"Skill {index}") for index in range(20))
+
+    def test_soft_delete_does_not_load_related_objects(self):
+        user = get_user_model()._base_manager.get(pk=self.user.pk)
+        # savepoint, update user, release (independent of the portfolio size)
+        with self.assertNumQueries(3):
+            user.delete()
+        self.assertIsNotNone(get_user_model()._base_manager.get(pk=user.pk).deleted)
+        self.assertFalse(get_user_model().live_objects.filter(pk=user.pk).exists())
+        self.assertEqual(Skill.objects.filter(user=user).count(), 20)
+
+    def test_undelete_restores_user(self):
+        user = get_user_model()._base_manager.get(pk=self.user.pk)
+        user.delete()
+        with self.assertNumQueries(3):
+            user.undelete()
+        self.assertIsNone(get_user_model()._base_manager.get(pk=user.pk).deleted)
+
+    def test_cascade_plan_is_set_based(self):
+        # portfolio rows follow the user by CASCADE but are no safedelete models, so nothing is updated
+        self.assertEqual(get_soft_delete_cascade(get_user_model()._base_manager.filter(pk=self.user.pk)), [])
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_soft_deleted_users_are_hidden_from_live_users_only(self):
+        self.user.delete()
+        self.assertFalse(get_user_model().live_objects.filter(pk=self.user.pk).exists())
+        # authentication and the admin still find them (e.g. to restore them)
+        self.assertEqual(get_user_model().objects.get_by_natural_key(self.user.email), self.user)
+        self.assertEqual(get_user_model()._default_manager.filter(pk=self.user.pk).count(), 1)
+        self.client.force_login(UserFactory(is_staff=True, is_superuser=True))
+        response = self.client.get(reverse("admin:users_user_changelist"))
+        self.assertContains(response, self.user.email)
+
+
+class PurgeDeletedUsersTestCase(TestCase):
+
+    def test_purge_hard_deletes_expired_users_only(self):
+        expired, recent, live = UserFactory(), UserFactory(), UserFactory()
+        expired.groups.add(Group.objects.create(name="Editors"))
+        Skill.objects.bulk_insert(Skill(user=user, title="Python") for user in (expired, recent, live))
+        expired.delete()
+        recent.delete()
+        get_user_model()._base_manager.filter(pk=expired.pk).update(deleted=now() - datetime.timedelta(days=31))
+
+        call_command("purge_deleted_users", days=30, batch_size=1, pause=0, stdout=StringIO())
+        self.assertEqual(
+            set(get_user_model()._base_manager.values_list("pk", flat=True)), {recent.pk, live.pk}
+        )
+        self.assertEqual(set(Skill.objects.values_list("user", flat=True)), {recent.pk, live.pk})
+        self.assertFalse(get_user_model().groups.through.objects.filter(user_id=expired.pk).exists())
@@ -1,6 +1,6 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
-from users.factories.user_factory import create_users_with_factory
+from users.factories.user_factory import DUMMY_USER_PASSWORD, UserFactory, create_users_with_factory
 
 
 class UserTestCase(TestCase):
@@ -14,3 +14,11 @@ class UserTestCase(TestCase):
     def test_data_created_sucessfully(self):
         instance = self.__MODEL.objects.get(id=self.user.id)
         self.assertEqual(instance.username, self.user.username)
+
+    # test if dummy users can log in with the default or an explicitly passed password
+    def test_factory_passwords_are_hashed(self):
+        self.assertTrue(self.user.check_password(DUMMY_USER_PASSWORD))
+        user = UserFactory(password="secret12345")
+        user.refresh_from_db()
+        self.assertTrue(user.check_password("secret12345"))
+        self.assertTrue(UserFactory.build(password="secret12345").check_password("secret12345"))
@@ -1,3 +1,5 @@
 # import test cases
 
 from users.test_cases.user_test_cases import UserTestCase  # NOQA
+from users.test_cases.soft_delete_test_cases import UserSoftDeleteTestCase, PurgeDeletedUsersTestCase  # NOQA
+from users.test_cases.provision_users_test_cases import ProvisionUsersTestCase  # NOQA
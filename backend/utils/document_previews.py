@@ -0,0 +1,153 @@
+import io
+import logging
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models.signals import pre_save, post_save
+from PIL import Image
+from utils.file_metadata import get_dominant_color, get_metadata_fields
+from utils.image_variants import encode_image, get_document_preview_name, has_document_preview
+from utils.signals import post_bulk_insert
+
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_PREVIEW_WIDTH = getattr(settings, "DOCUMENT_PREVIEW_WIDTH", 256)
+DOCUMENT_PREVIEW_TIMEOUT = 30  # in seconds
+# poppler's `pdftoppm` renders the pages, documents get no preview where it is not installed
+PDFTOPPM = shutil.which("pdftoppm")
+
+# a single background thread renders the previews, so uploads never wait for them
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="document-previews")
+
+# models connected with `connect_document_previews()`
+DOCUMENT_PREVIEW_MODELS = []
+
+
+def render_pdf_page(content, width):
+    """[Renders the first page of a pdf document]
+
+    Args:
+        content ([bytes]): [pdf document]
+        width ([int]): [width of the image in pixels (the height keeps the aspect ratio)]
+
+    Returns:
+        [Image]: [Pillow image of the page, None without `pdftoppm`]
+    """
+    if PDFTOPPM is None:
+        return None
+    # the document is read from stdin, the page is written to stdout
+    result = subprocess.run(
+        [PDFTOPPM, "-f", "1", "-l", "1", "-singlefile", "-png", "-scale-to-x", str(width), "-scale-to-y", "-1", "-"],
+        input=content, capture_output=True, timeout=DOCUMENT_PREVIEW_TIMEOUT, check=True
+    )
+    image = Image.open(io.BytesIO(result.stdout))
+    image.load()
+    return image
+
+
+def generate_document_preview(field_file):
+    """[Renders and stores the preview image of the first page of a stored document]
+
+    Args:
+        field_file ([FieldFile]): [stored document]
+
+    Returns:
+        [dict]: [`width`, `height` and `color` of the stored preview, None if the document has no preview]
+    """
+    if not field_file or not has_document_preview(field_file.name):
+        return None
+    storage = field_file.storage
+    try:
+        with storage.open(field_file.name) as file:
+            image = render_pdf_page(file.read(), DOCUMENT_PREVIEW_WIDTH)
+    except (OSError, ValueError, subprocess.SubprocessError):
+        logger.exception("There was an exception rendering the preview of `%s`", field_file.name)
+        return None
+    if image is None:
+        return None
+    name = get_document_preview_name(field_file.name)
+    storage.delete(name)
+    storage.save(name, ContentFile(encode_image(image, "JPEG")))
+    return {"width": image.width, "height": image.height, "color": get_dominant_color(image)}
+
+
+def update_document_previews(model, pk):
+    """ Renders the previews of the documents of a row and records them in its file metadata (`preview`) """
+    try:
+        obj = model._base_manager.filter(pk=pk).first()
+        if obj is None:
+            return
+        for field, metadata_field in get_metadata_fields(model):
+            field_file = getattr(obj, field.name)
+            preview = generate_document_preview(field_file)
+            if preview is not None:
+                # a replaced file keeps the metadata of its replacement
+                model._base_manager.filter(pk=pk, **{field.name: field_file.name}).update(**{
+                    metadata_field: dict(getattr(obj, metadata_field), preview=preview)
+                })
+    except Exception:
+        logger.exception("There was an exception updating the document previews of %s %s", model.__name__, pk)
+
+
+def _update_document_previews_in_background(model, pk):
+    # the background thread keeps its own database connection
+    close_old_connections()
+    try:
+        update_document_previews(model, pk)
+    finally:
+        close_old_connections()
+
+
+def queue_document_previews(model, instances, using=None):
+    """ Renders the previews of the documents of rows once the current transaction commits """
+    pks = [instance.pk for instance in instances if getattr(instance, "_new_documents", False)]
+    if not pks:
+        return
+
+    def render():
+        for pk in pks:
+            if settings.DOCUMENT_PREVIEWS_IN_BACKGROUND:
+                _executor.submit(_update_document_previews_in_background, model, pk)
+            else:
+                update_document_previews(model, pk)
+
+    transaction.on_commit(render, using=using)
+
+
+# ----------------------------------------------------
+# *** Signal Receivers ***
+# ----------------------------------------------------
+
+def mark_new_documents(sender, instance, raw=False, **kwargs):
+    """ Remembers whether a document with a preview is uploaded with this save """
+    instance._new_documents = not raw and any(
+        getattr(instance, field.name) and not getattr(instance, field.name)._committed
+        and has_document_preview(getattr(instance, field.name).name)
+        for field, metadata_field in get_metadata_fields(sender)
+    )
+
+
+def queue_previews_on_save(sender, instance, raw=False, using=None, **kwargs):
+    queue_document_previews(sender, [instance], using=using)
+    instance._new_documents = False
+
+
+def queue_previews_on_bulk_insert(sender, instances, using=None, **kwargs):
+    queue_document_previews(sender, instances, using=using)
+
+
+def connect_document_previews(model):
+    """ Renders a preview of every document uploaded to `model` (deleted with the document like a rendition) """
+    if not get_metadata_fields(model):
+        return
+    if model not in DOCUMENT_PREVIEW_MODELS:
+        DOCUMENT_PREVIEW_MODELS.append(model)
+    pre_save.connect(mark_new_documents, sender=model, dispatch_uid=f"{model.__name__}_mark_new_documents")
+    post_save.connect(queue_previews_on_save, sender=model, dispatch_uid=f"{model.__name__}_document_previews")
+    post_bulk_insert.connect(
+        queue_previews_on_bulk_insert, sender=model, dispatch_uid=f"{model.__name__}_document_previews_bulk_insert"
+    )
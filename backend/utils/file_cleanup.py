@@ -0,0 +1,70 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+# a single background thread removes queued files, so requests never wait for the storage
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-cleanup")
+
+
+def delete_files(files):
+    """[Deletes a batch of stored files, logging (not raising) failures]
+
+    Args:
+        files ([list]): [(storage, name) pairs]
+    """
+    for storage, name in files:
+        try:
+            storage.delete(name)
+        except Exception:
+            logger.exception("There was an exception deleting the file `%s`", name)
+
+
+def delete_uncommitted_files(files):
+    """[Deletes the files stored for rows whose insert rolled back, logging (not raising) failures]
+
+    Storages counting references (see `utils.storages.ContentAddressedStorage.delete_uncommitted()`) only delete
+    files no committed row references.
+
+    Args:
+        files ([list]): [(storage, name) pairs]
+    """
+    for storage, name in files:
+        try:
+            getattr(storage, "delete_uncommitted", storage.delete)(name)
+        except Exception:
+            logger.exception("There was an exception deleting the file `%s`", name)
+
+
+def _delete_files_in_background(files):
+    # storages counting references write to the database, the background thread keeps its own connection
+    close_old_connections()
+    try:
+        delete_files(files)
+    finally:
+        close_old_connections()
+
+
+def queue_file_cleanup(files, using=None):
+    """[Deletes files in batches once the current transaction commits (nothing is deleted on rollback)]
+
+    Args:
+        files ([iterable]): [(storage, name) pairs, empty names are skipped]
+        using ([str], optional): [database alias of the transaction]. Defaults to None.
+    """
+    files = [(storage, name) for storage, name in files if name]
+    if not files:
+        return
+    batch_size = settings.FILE_CLEANUP_BATCH_SIZE
+
+    def cleanup():
+        for start in range(0, len(files), batch_size):
+            if settings.FILE_CLEANUP_IN_BACKGROUND:
+                _executor.submit(_delete_files_in_background, files[start:start + batch_size])
+            else:
+                delete_files(files[start:start + batch_size])
+
+    transaction.on_commit(cleanup, using=using)
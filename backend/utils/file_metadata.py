@@ -0,0 +1,158 @@
+import logging
+import mimetypes
+import os
+import re
+from django.db import models
+from django.db.models.signals import pre_save
+from PIL import Image
+
+
+logger = logging.getLogger(__name__)
+
+# a file field `<name>` keeps the metadata of its file in the JSON field `<name>_metadata` of the same model
+METADATA_FIELD_SUFFIX = "_metadata"
+# images are scaled down to this size (in pixels) before their dominant color is picked
+DOMINANT_COLOR_SAMPLE_SIZE = 64
+# recorded once the renditions of a stored file are rendered (see `utils.image_variants`), not read from the file
+DERIVED_METADATA_KEYS = ("variants", "preview")
+SVG_SIZE_HEAD = 4096
+SVG_ROOT = re.compile(rb"<svg\b[^>]*>", re.IGNORECASE)
+SVG_ATTRIBUTE = re.compile(rb"""\b(width|height|viewBox)\s*=\s*["']([^"']*)["']""", re.IGNORECASE)
+
+# models connected with `connect_file_metadata()`
+FILE_METADATA_MODELS = []
+
+
+def get_metadata_fields(model):
+    """ (file field, metadata field name) of every file field of a model with a metadata field """
+    field_names = {field.name for field in model._meta.concrete_fields}
+    return [
+        (field, f"{field.name}{METADATA_FIELD_SUFFIX}") for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField) and f"{field.name}{METADATA_FIELD_SUFFIX}" in field_names
+    ]
+
+
+def get_dominant_color(image):
+    """[Picks the most frequent color of an image after reducing it to a small palette]
+
+    Args:
+        image ([Image]): [Pillow image]
+
+    Returns:
+        [str]: [`#rrggbb`, transparent areas count as white]
+    """
+    image = image.copy()
+    image.thumbnail((DOMINANT_COLOR_SAMPLE_SIZE, DOMINANT_COLOR_SAMPLE_SIZE))
+    if "A" in image.mode or "transparency" in image.info:
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, image)
+    image = image.convert("RGB").quantize(colors=5)
+    count, index = max(image.getcolors())
+    red, green, blue = image.getpalette()[index * 3:index * 3 + 3]
+    return f"#{red:02x}{green:02x}{blue:02x}"
+
+
+def _get_svg_dimensions(head):
+    """ Width and height of an svg image from its `width` / `height` attributes or its `viewBox` """
+    root = SVG_ROOT.search(head)
+    if root is None:
+        return None, None
+    attributes = {name.lower(): value.strip() for name, value in SVG_ATTRIBUTE.findall(root.group())}
+    try:
+        width = float(re.sub(rb"px$", b"", attributes[b"width"]))
+        height = float(re.sub(rb"px$", b"", attributes[b"height"]))
+    except (KeyError, ValueError):
+        try:
+            width, height = [float(value) for value in re.split(rb"[\s,]+", attributes[b"viewbox"])[2:4]]
+        except (KeyError, ValueError):
+            return None, None
+    return round(width), round(height)
+
+
+def get_file_metadata(file, name):
+    """[Reads the metadata of a file once, e.g. of an upload before it is stored]
+
+    Args:
+        file ([File]): [open file, its position is restored]
+        name ([str]): [file name]
+
+    Returns:
+        [dict]: [`size` (bytes) and `mime_type`, plus `width`, `height` (pixels) and `color` (`#rrggbb`) of images
+            and `original_size` (bytes) of optimised uploads]
+    """
+    metadata = {"size": file.size, "mime_type": mimetypes.guess_type(name)[0] or "application/octet-stream"}
+    optimization = getattr(file, "image_optimization", None)
+    if optimization:
+        # bytes of the upload before `utils.image_optimization` optimised it
+        metadata["original_size"] = optimization["original_size"]
+    extension = os.path.splitext(name)[1].lower()
+    position = file.tell() if hasattr(file, "tell") else 0
+    try:
+        file.seek(0)
+        if extension == ".svg":
+            width, height = _get_svg_dimensions(file.read(SVG_SIZE_HEAD))
+            if width and height:
+                metadata.update(width=width, height=height)
+        elif metadata["mime_type"].startswith("image/"):
+            with Image.open(file) as image:
+                metadata.update(
+                    mime_type=Image.MIME.get(image.format, metadata["mime_type"]),
+                    width=image.width, height=image.height, color=get_dominant_color(image)
+                )
+    except Exception:
+        logger.exception("There was an exception reading the metadata of `%s`", name)
+    finally:
+        file.seek(position)
+    return metadata
+
+
+# ----------------------------------------------------
+# *** Signal Receivers ***
+# ----------------------------------------------------
+
+def update_file_metadata(sender, instance, raw=False, **kwargs):
+    """ Stores the metadata of newly assigned files (read before they are stored), so rendering never opens them """
+    if raw:
+        return
+    for field, metadata_field in get_metadata_fields(sender):
+        field_file = getattr(instance, field.name)
+        if not field_file:
+            setattr(instance, metadata_field, {})
+        elif not field_file._committed:
+            setattr(instance, metadata_field, get_file_metadata(field_file.file, field_file.name))
+
+
+def update_stored_file_metadata(instance):
+    """[Reads the metadata of the stored files of a row again (for rows stored before metadata existed)]
+
+    Returns:
+        [list]: [names of the updated metadata fields]
+    """
+    updated = []
+    for field, metadata_field in get_metadata_fields(type(instance)):
+        field_file = getattr(instance, field.name)
+        metadata = {}
+        if field_file:
+            try:
+                with field_file.storage.open(field_file.name) as file:
+                    metadata = get_file_metadata(file, field_file.name)
+            except OSError:
+                logger.exception("There was an exception opening `%s`", field_file.name)
+                continue
+            # the renditions of the file are still stored
+            metadata.update(
+                (key, value) for key, value in getattr(instance, metadata_field).items() if key in DERIVED_METADATA_KEYS
+            )
+        setattr(instance, metadata_field, metadata)
+        updated.append(metadata_field)
+    return updated
+
+
+def connect_file_metadata(model):
+    """ Keeps the `<file field>_metadata` fields of `model` up to date """
+    if not get_metadata_fields(model):
+        return
+    if model not in FILE_METADATA_MODELS:
+        FILE_METADATA_MODELS.append(model)
+    pre_save.connect(update_file_metadata, sender=model, dispatch_uid=f"{model.__name__}_file_metadata")
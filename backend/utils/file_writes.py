@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from django.conf import settings
+from django.db import models
+from utils.file_cleanup import delete_files
+
+
+# a bounded pool writes the files of a multi file submission side by side, storage writes are I/O bound
+_executor = ThreadPoolExecutor(max_workers=settings.FILE_WRITE_WORKERS, thread_name_prefix="file-write")
+
+
+def get_new_files(instances):
+    """ (instance, field, field file) of every file field holding a new (not yet stored) file """
+    return [
+        (instance, field, getattr(instance, field.attname))
+        for instance in instances for field in instance._meta.concrete_fields
+        if isinstance(field, models.FileField) and getattr(instance, field.attname)
+        and not getattr(instance, field.attname)._committed
+    ]
+
+
+def save_files(instances):
+    """[Stores the new files of unsaved model instances concurrently, before their rows are inserted]
+
+    Names are generated in the calling thread (`upload_to` functions may read related rows), only the storage
+    writes run in the pool. The fields end up exactly like after `FieldFile.save()`, so inserting the rows writes
+    nothing anymore. If any write fails, the files written so far are deleted and the first error is raised.
+
+    Args:
+        instances ([list]): [unsaved model instances]
+
+    Returns:
+        [list]: [(storage, name) pairs of the stored files]
+    """
+    new_files = get_new_files(instances)
+    futures = [
+        _executor.submit(
+            field_file.storage.save, field.generate_filename(instance, field_file.name), field_file.file,
+            max_length=field.max_length
+        )
+        for instance, field, field_file in new_files
+    ]
+    wait(futures)
+    stored = [
+        (field_file.storage, future.result())
+        for (instance, field, field_file), future in zip(new_files, futures) if future.exception() is None
+    ]
+    errors = [future.exception() for future in futures if future.exception() is not None]
+    if errors:
+        delete_files(stored)
+        raise errors[0]
+    for (instance, field, field_file), future in zip(new_files, futures):
+        field_file.name = future.result()
+        setattr(instance, field.attname, field_file.name)
+        field_file._committed = True
+    return stored
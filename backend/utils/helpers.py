@@ -2,9 +2,25 @@ from django.utils.text import slugify
 from django.conf import settings
 from django.utils import timezone
 import datetime
-from django.db import models
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.apps import apps
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models.signals import pre_save
 from django.http import Http404
 from django.utils.translation import gettext_lazy as _
+from factory import SubFactory
+from factory.random import reseed_random
+from safedelete.config import FIELD_NAME as SAFE_DELETE_FIELD_NAME
+from safedelete.models import is_safedelete_cls
+from utils.file_cleanup import delete_uncommitted_files, queue_file_cleanup
+from utils.file_writes import save_files
+from utils.image_variants import get_image_variant_names
+from utils.signals import post_bulk_delete, post_bulk_insert
 
 
 def get_user_media_path(user):
@@ -24,7 +40,8 @@ def now():
 
 
 def create_factory_data(factory=None, num_of_data=7, display_name="item", display_name_plural="items",
-                        delete_old_data=False, model=None):
+                        delete_old_data=False, model=None, bulk=False, batch_size=1000, owner_pool_size=10,
+                        workers=1, quiet=False):
 
     """[Creates dummy data]
 
@@ -35,11 +52,18 @@ def create_factory_data(factory=None, num_of_data=7, display_name="item", displa
         display_name_plural (str, optional): [Representational name plural]. Defaults to "items".
         delete_old_data (bool, optional): [True, if want to delete old data]. Defaults to False.
         model (optional): [Django Model Class, Required if delete_old_data = True]. Defaults to None.
+        bulk (bool, optional): [True, if want to build in memory and insert in batches]. Defaults to False.
+        batch_size (int, optional): [Number of rows per INSERT in bulk mode]. Defaults to 1000.
+        owner_pool_size (int, optional): [Number of owners (SubFactory rows) shared in bulk mode]. Defaults to 10.
+        workers (int, optional): [Number of processes inserting batches in bulk mode]. Defaults to 1.
+        quiet (bool, optional): [True, if want to suppress the progress output]. Defaults to False.
 
     Returns:
-        [list]: [List of created data]
+        [list]: [List of created data (bulk mode with workers only returns the data of the parent process)]
     """
 
+    log = (lambda *args: None) if quiet else print
+
     if delete_old_data:
         # raise attribute error if model is not provided
         if model is None:
@@ -48,25 +72,446 @@ def create_factory_data(factory=None, num_of_data=7, display_name="item", displa
             )
 
         # delete old data
-        print(f"Deleting old {display_name_plural}...")
+        log(f"Deleting old {display_name_plural}...")
         model.objects.all().delete()
-        print(f"Deleted old {display_name_plural}...")
+        log(f"Deleted old {display_name_plural}...")
+
+    if bulk:
+        return create_factory_data_in_bulk(
+            factory, num_of_data, display_name_plural=display_name_plural, batch_size=batch_size,
+            owner_pool_size=owner_pool_size, workers=workers, log=log
+        )
 
     data = []
-    print(f"Creating {display_name_plural}...")
+    log(f"Creating {display_name_plural}...")
     for _ in range(num_of_data):  # NOQA
         instance = factory()
         data.append(instance)
-        print(f"Created {display_name}:", instance)
-    print(f"Created {display_name_plural}...")
+        log(f"Created {display_name}:", instance)
+    log(f"Created {display_name_plural}...")
+
+    return data
+
+
+# ----------------------------------------------------
+# *** Bulk Factory Data ***
+# ----------------------------------------------------
+
+# a batch is rebuilt (with new fake values) this many times when it hits a unique constraint
+FACTORY_BATCH_RETRIES = 3
+
+
+def create_factory_owner_pool(factory, size):
+    """[Creates shared owners for every SubFactory declaration (e.g. `user`) of a factory]
+
+    Args:
+        factory ([DjangoModelFactory]): [factory whose SubFactory declarations need owners]
+        size ([int]): [number of owners created per declaration]
+
+    Returns:
+        [dict]: [declaration name => list of created owners]
+    """
+    return {
+        name: insert_factory_batch(declaration.get_factory(), size, create_factory_owner_pool(
+            declaration.get_factory(), size
+        ))
+        for name, declaration in factory._meta.declarations.items()
+        if isinstance(declaration, SubFactory)
+    }
+
+
+def get_per_user_unique_fields(model):
+    """ Names of the fields that are unique together with the owner, e.g. skill titles (`unique_together`) """
+    return [
+        name for unique_fields in model._meta.unique_together if "user" in unique_fields and len(unique_fields) == 2
+        for name in unique_fields if name != "user"
+    ]
+
+
+def build_factory_batch(factory, size, owners=None, start=0):
+    """[Builds `size` unsaved instances, picking SubFactory values from the `owners` pool]
+
+    Owners are shared by every batch (and worker), so repeated fake values of fields unique together with the
+    owner would collide. These fields get the sequence number of the row in the run (`start` + position) appended.
+
+    Args:
+        factory ([DjangoModelFactory]): [factory to build instances with]
+        size ([int]): [number of instances]
+        owners ([dict], optional): [SubFactory values to pick from, see `create_factory_owner_pool()`]
+        start (int, optional): [number of rows built before this batch in the run]. Defaults to 0.
+
+    Returns:
+        [list]: [unsaved instances]
+    """
+    owners = owners or {}
+    batch = [
+        factory.build(**{name: random.choice(pool) for name, pool in owners.items()})
+        for _ in range(size)
+    ]
+    model = factory._meta.model
+    for name in get_per_user_unique_fields(model):
+        max_length = model._meta.get_field(name).max_length
+        for sequence, obj in enumerate(batch, start=start + 1):
+            suffix = f" {sequence}"
+            value = str(getattr(obj, name))
+            setattr(obj, name, (value[:max_length - len(suffix)] if max_length else value) + suffix)
+    return batch
+
+
+def insert_factory_batch(factory, size, owners=None, start=0):
+    """[Builds and inserts `size` instances of a factory with one bulk insert]
+
+    Args:
+        factory ([DjangoModelFactory]): [factory to build instances with]
+        size ([int]): [number of instances]
+        owners ([dict], optional): [SubFactory values to pick from, see `create_factory_owner_pool()`]
+        start (int, optional): [number of rows built before this batch in the run]. Defaults to 0.
+
+    Returns:
+        [list]: [inserted instances]
+    """
+    manager = factory._meta.model._default_manager
+    insert = getattr(manager, "bulk_insert", manager.bulk_create)
+    for attempt in range(1, FACTORY_BATCH_RETRIES + 1):
+        try:
+            with transaction.atomic(using=manager.db):
+                return insert(build_factory_batch(factory, size, owners, start), batch_size=size)
+        except IntegrityError:
+            # fake values (e.g. emails or usernames of concurrent workers) may collide, rebuild the batch
+            if attempt == FACTORY_BATCH_RETRIES:
+                raise
+
+
+def _init_factory_worker():
+    # worker processes started with `spawn` need their own app registry
+    if not apps.ready:
+        django.setup()
+    # forked workers inherit the random state of the parent and would generate the same fake values
+    seed = int.from_bytes(os.urandom(8), "big")
+    reseed_random(seed)
+    random.seed(seed)
+
+
+def _insert_factory_batch_in_worker(factory, size, owners, start):
+    return len(insert_factory_batch(factory, size, owners, start))
+
+
+def create_factory_data_in_bulk(factory, num_of_data, display_name_plural="items", batch_size=1000,
+                                owner_pool_size=10, workers=1, log=print):
+    """[Builds dummy data in memory and inserts it in batches, optionally across worker processes]
+
+    Args:
+        factory ([DjangoModelFactory]): [factory to build instances with]
+        num_of_data ([int]): [total number of data to generate]
+        display_name_plural (str, optional): [Representational name plural]. Defaults to "items".
+        batch_size (int, optional): [number of rows per INSERT]. Defaults to 1000.
+        owner_pool_size (int, optional): [number of owners shared by all rows]. Defaults to 10.
+        workers (int, optional): [number of processes inserting batches]. Defaults to 1.
+        log (optional): [progress output function]. Defaults to print.
 
+    Returns:
+        [list]: [created data when inserted in this process, otherwise an empty list]
+    """
+    started_at = time.monotonic()
+    log(f"Creating {display_name_plural}...")
+    owners = create_factory_owner_pool(factory, owner_pool_size)
+    starts = list(range(0, num_of_data, batch_size))
+    sizes = [min(batch_size, num_of_data - start) for start in starts]
+
+    data = []
+    created = 0
+    if workers > 1:
+        # workers open their own connections, the forked ones must not reuse the parent's
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_factory_worker) as executor:
+            for count in executor.map(
+                _insert_factory_batch_in_worker, itertools.repeat(factory), sizes, itertools.repeat(owners), starts
+            ):
+                created += count
+                log(f"Created {created}/{num_of_data} {display_name_plural}...")
+    else:
+        for start, size in zip(starts, sizes):
+            data.extend(insert_factory_batch(factory, size, owners, start))
+            created += size
+            log(f"Created {created}/{num_of_data} {display_name_plural}...")
+
+    elapsed = time.monotonic() - started_at
+    log(f"Created {created} {display_name_plural} in {elapsed:.2f}s ({created / elapsed if elapsed else 0:.0f}/s)...")
     return data
 
 
-class CustomModelManager(models.Manager):
+# ----------------------------------------------------
+# *** Bulk Delete ***
+# ----------------------------------------------------
+
+# primary keys per `IN (...)` list, below the parameter limits of every supported database
+BULK_DELETE_CHUNK_SIZE = 500
+
+
+def _chunked(values, size=BULK_DELETE_CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _get_bulk_delete_fields(model):
+    """
+    Fields loaded for deleted rows: primary key, foreign keys (for signal receivers), files (for cleanup) and the
+    `<file field>_size` byte sizes of files (for storage accounting)
+    """
+    file_sizes = {
+        f"{field.name}_size" for field in model._meta.concrete_fields if isinstance(field, models.FileField)
+    }
+    return [
+        field.name for field in model._meta.concrete_fields
+        if field.primary_key or field.is_relation or isinstance(field, models.FileField) or field.name in file_sizes
+    ]
+
+
+def _collect_bulk_delete(model, instances, using, plan, hard_delete=False):
+    """[Appends `(model, instances)` of the rows cascading from `instances` (children first), then of `instances`]
+
+    Returns:
+        [bool]: [False, if a relation needs more than a row delete (SET_NULL, PROTECT, custom many to many through
+            models, soft delete unless `hard_delete`)]
+    """
+    if hasattr(model, "_safedelete_policy") and not hard_delete:
+        return False
+    pks = [obj.pk for obj in instances]
+    for field in model._meta.many_to_many:
+        through = field.remote_field.through
+        if not through._meta.auto_created:
+            return False
+        plan.append((through, [
+            obj for chunk in _chunked(pks)
+            for obj in through._base_manager.using(using).filter(**{f"{field.m2m_field_name()}__in": chunk})
+        ]))
+    for relation in model._meta.related_objects:
+        if relation.on_delete is models.DO_NOTHING:
+            continue
+        if relation.on_delete is not models.CASCADE or relation.many_to_many:
+            return False
+        related_model = relation.related_model
+        related_instances = [
+            obj for chunk in _chunked(pks) for obj in related_model._base_manager.using(using).filter(
+                **{f"{relation.field.name}__in": chunk}
+            ).only(*_get_bulk_delete_fields(related_model))
+        ]
+        # receivers resolving the parent (e.g. the owner of a media) must not query it per row
+        parents = {obj.pk: obj for obj in instances}
+        for obj in related_instances:
+            relation.field.set_cached_value(obj, parents.get(getattr(obj, relation.field.attname)))
+        if related_instances and not _collect_bulk_delete(
+            related_model, related_instances, using, plan, hard_delete=hard_delete
+        ):
+            return False
+    plan.append((model, instances))
+    return True
+
+
+def bulk_delete(queryset, hard_delete=False):
+    """[Deletes the rows of a queryset, and the rows cascading from them, with one DELETE ... WHERE pk IN (...) per
+    model instead of fetching and deleting (and signalling) row by row. `post_bulk_delete` is sent per model and
+    the files of the deleted rows are queued for removal after commit. Querysets with relations that need more than
+    a row delete fall back to `QuerySet.delete()`]
+
+    Args:
+        queryset ([QuerySet]): [rows to delete]
+        hard_delete (bool, optional): [True, to delete the rows of safedelete models too (pass a `_base_manager`
+            queryset, so that a fallback hard deletes as well)]. Defaults to False.
+
+    Returns:
+        [tuple]: [number of deleted rows, number of deleted rows per model label (like `QuerySet.delete()`)]
+    """
+    model = queryset.model
+    using = queryset.db
+    with transaction.atomic(using=using):
+        plan = []
+        instances = list(queryset.only(*_get_bulk_delete_fields(model)))
+        if not instances:
+            return 0, {}
+        if not _collect_bulk_delete(model, instances, using, plan, hard_delete=hard_delete):
+            return queryset.delete()
+
+        deleted = {}
+        files = []
+        for model, instances in plan:
+            if not instances:
+                continue
+            count = 0
+            for chunk in _chunked([obj.pk for obj in instances]):
+                count += model._base_manager.using(using).filter(pk__in=chunk)._raw_delete(using)
+            deleted[model._meta.label] = deleted.get(model._meta.label, 0) + count
+            post_bulk_delete.send(sender=model, instances=instances, using=using)
+            for field in model._meta.concrete_fields:
+                if not isinstance(field, models.FileField):
+                    continue
+                for obj in instances:
+                    name = getattr(obj, field.attname).name
+                    files.append((field.storage, name))
+                    # renditions of images are stored next to them
+                    files.extend((field.storage, variant) for variant in get_image_variant_names(name))
+        queue_file_cleanup(files, using=using)
+    return sum(deleted.values()), deleted
+
+
+# ----------------------------------------------------
+# *** Set-Based Soft Delete Cascade ***
+# ----------------------------------------------------
+
+def _collect_soft_delete_cascade(queryset, plan, path):
+    for relation in queryset.model._meta.related_objects:
+        if relation.many_to_many or relation.on_delete is models.DO_NOTHING:
+            continue
+        related_model = relation.related_model
+        related = related_model._base_manager.using(queryset.db).filter(
+            **{f"{relation.field.name}__in": queryset.values("pk")}
+        )
+        if relation.on_delete is models.CASCADE:
+            # self referencing cascades need the row-wise collector
+            if related_model in path:
+                return False
+            if is_safedelete_cls(related_model):
+                plan.append((related, None))
+            if not _collect_soft_delete_cascade(related, plan, path + (related_model,)):
+                return False
+        elif relation.on_delete in (models.SET_NULL, models.SET_DEFAULT):
+            plan.append((related, relation.field))
+        else:
+            # PROTECT, RESTRICT and SET(...) need the related objects themselves
+            return False
+    return True
+
+
+def get_soft_delete_cascade(queryset):
+    """[Plans a set-based SOFT_DELETE_CASCADE of the rows of a queryset without loading any related object]
+
+    Every relation becomes one UPDATE with a `WHERE <foreign key> IN (<subquery>)` condition: safedelete rows
+    reached through CASCADE relations are marked (or restored) and SET_NULL / SET_DEFAULT foreign keys are set.
+
+    Args:
+        queryset ([QuerySet]): [soft deleted (root) rows]
+
+    Returns:
+        [list or None]: [(related queryset, SET_NULL / SET_DEFAULT field or None) updates, None if a relation
+            needs the row-wise collector of safedelete]
+    """
+    plan = []
+    if not _collect_soft_delete_cascade(queryset, plan, (queryset.model,)):
+        return None
+    return plan
+
+
+def soft_delete_cascade(plan, deleted_at):
+    """[Applies a `get_soft_delete_cascade()` plan, marking the dependent rows with the timestamp of their root]
+
+    Returns:
+        [int]: [number of updated rows]
+    """
+    updated = 0
+    for related, field in plan:
+        if field is None:
+            updated += related.filter(**{f"{SAFE_DELETE_FIELD_NAME}__isnull": True}).update(
+                **{SAFE_DELETE_FIELD_NAME: deleted_at}
+            )
+        else:
+            updated += related.update(**{field.name: None if field.null else field.get_default()})
+    return updated
+
+
+def undelete_cascade(plan, deleted_at):
+    """[Restores the dependent rows that were soft deleted together with their root (same `deleted_at`)]
+
+    Rows that were soft deleted on their own before keep their state, SET_NULL / SET_DEFAULT foreign keys
+    can not be restored (like with safedelete).
+
+    Returns:
+        [int]: [number of restored rows]
+    """
+    return sum(
+        related.filter(**{SAFE_DELETE_FIELD_NAME: deleted_at}).update(**{SAFE_DELETE_FIELD_NAME: None})
+        for related, field in plan if field is None
+    )
+
+
+class BulkInsertManagerMixin(object):
+    """
+    Bulk insert support for model managers.
+    `bulk_create()` skips `save()` and the `pre_save` receivers that derive slugs, usernames, file sizes etc.
+    `bulk_insert()` runs the same derivations in memory for a batch and then inserts it with one `bulk_create()`.
+    actions: bulk_insert(objs, batch_size), prepare_for_bulk_insert(objs)
+    """
+
+    bulk_insert_batch_size = 1000
+
+    def prepare_for_bulk_insert(self, objs):
+        """[Derives fields of a batch in memory, exactly like a regular save would do]
+
+        Args:
+            objs ([list]): [unsaved model instances of a single batch]
+
+        Returns:
+            [list]: [prepared model instances]
+        """
+        using = self.db
+        generate_slug = getattr(self.model, "generate_slug", None)
+        for obj in objs:
+            if generate_slug is not None and not obj.slug:
+                # a batch can not be retried row by row, so slug generators use their collision free form
+                obj._slug_generated = True
+            pre_save.send(sender=self.model, instance=obj, raw=False, using=using, update_fields=None)
+
+        # `order_with_respect_to` models get their `_order` from `save()`, so number the batch after existing rows
+        order_with_respect_to = self.model._meta.order_with_respect_to
+        if order_with_respect_to is not None:
+            attname = order_with_respect_to.attname
+            parent_ids = {getattr(obj, attname) for obj in objs}
+            next_order = dict(
+                self.get_queryset().filter(**{f"{attname}__in": parent_ids}).order_by().values_list(attname)
+                .annotate(count=models.Count("pk"))
+            )
+            for obj in objs:
+                parent_id = getattr(obj, attname)
+                obj._order = next_order.get(parent_id, 0)
+                next_order[parent_id] = obj._order + 1
+        return objs
+
+    def bulk_insert(self, objs, batch_size=None, **kwargs):
+        """[Inserts model instances with derived fields using one `bulk_create()` per batch]
+
+        New files are stored concurrently per batch (see `utils.file_writes`), they are deleted again if the
+        insert fails.
+
+        Args:
+            objs ([iterable]): [unsaved model instances]
+            batch_size ([int], optional): [number of rows per INSERT]. Defaults to `bulk_insert_batch_size`.
+
+        Returns:
+            [list]: [inserted model instances]
+        """
+        objs = list(objs)
+        batch_size = batch_size or self.bulk_insert_batch_size
+        inserted = []
+        stored_files = []
+        try:
+            with transaction.atomic(using=self.db, savepoint=False):
+                for start in range(0, len(objs), batch_size):
+                    batch = self.prepare_for_bulk_insert(objs[start:start + batch_size])
+                    # the new files of a batch are written concurrently, before any of its rows is inserted
+                    stored_files.extend(save_files(batch))
+                    batch = self.bulk_create(batch, batch_size=batch_size, **kwargs)
+                    post_bulk_insert.send(sender=self.model, instances=batch, using=self.db)
+                    inserted.extend(batch)
+        except Exception:
+            # no row references the files of a failed insert (their counted references rolled back with the rows)
+            delete_uncommitted_files(stored_files)
+            raise
+        return inserted
+
+
+class CustomModelManager(BulkInsertManagerMixin, models.Manager):
     """
     Custom Model Manager
-    actions: all(), get_by_id(id), get_by_slug(slug)
+    actions: all(), get_by_id(id), get_by_slug(slug), bulk_insert(objs, batch_size)
     """
 
     def all(self):
@@ -0,0 +1,200 @@
+import io
+import logging
+import os
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models.signals import pre_save
+from PIL import Image, ImageOps
+from utils.image_variants import IMAGE_VARIANT_EXTENSIONS, get_image_fields
+from utils.validators import is_image_size_allowed
+
+
+logger = logging.getLogger(__name__)
+
+# larger uploads are scaled down to this size (longest side), the renditions are rendered from the stored image
+IMAGE_INGEST_MAX_DIMENSION = getattr(settings, "IMAGE_INGEST_MAX_DIMENSION", 2560)
+# JPEG quality is lowered in steps from the first to the minimum quality until the target size is met
+IMAGE_INGEST_QUALITY = getattr(settings, "IMAGE_INGEST_QUALITY", 85)
+IMAGE_INGEST_MIN_QUALITY = min(getattr(settings, "IMAGE_INGEST_MIN_QUALITY", 70), IMAGE_INGEST_QUALITY)
+IMAGE_INGEST_QUALITY_STEP = 5
+IMAGE_INGEST_TARGET_BITS_PER_PIXEL = getattr(settings, "IMAGE_INGEST_TARGET_BITS_PER_PIXEL", 1.5)
+# metadata that only describes the file (EXIF incl. camera and GPS data, XMP, comments) is dropped
+STRIPPED_IMAGE_INFO = ("exif", "xmp", "XML:com.adobe.xmp", "comment", "photoshop")
+# JPEG segments holding it: APP1 (EXIF, XMP), APP13 (Photoshop, IPTC) and COM
+STRIPPED_JPEG_SEGMENTS = (0xE1, 0xED, 0xFE)
+EXIF_ORIENTATION = 0x0112
+# luminance quantization table of the IJG encoder at quality 50, the tables of other qualities are scaled from it
+IJG_LUMINANCE_TABLE = (
+    16, 11, 10, 16, 24, 40, 51, 61, 12, 12, 14, 19, 26, 58, 60, 55, 14, 13, 16, 24, 40, 57, 69, 56,
+    14, 17, 22, 29, 51, 87, 80, 62, 18, 22, 37, 56, 68, 109, 103, 77, 24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101, 72, 92, 95, 98, 112, 100, 103, 99,
+)
+
+# models connected with `connect_image_optimization()`
+IMAGE_OPTIMIZATION_MODELS = []
+
+
+def _get_jpeg_quality(image):
+    """ Estimates the quality a JPEG image was encoded at from its luminance quantization table (100 if unknown) """
+    tables = getattr(image, "quantization", None) or {}
+    if not tables.get(0):
+        return 100
+    scale = sum(tables[0]) * 100 / sum(IJG_LUMINANCE_TABLE)
+    quality = (200 - scale) / 2 if scale <= 100 else 5000 / scale
+    return max(1, min(100, round(quality)))
+
+
+def _strip_jpeg_metadata(data):
+    """ Drops the metadata segments of a JPEG file, the compressed image data is copied as it is (lossless) """
+    if data[:2] != b"\xff\xd8":
+        raise ValueError("Not a JPEG file")
+    segments = [data[:2]]
+    position = 2
+    while position < len(data):
+        if data[position] != 0xFF:
+            raise ValueError("Invalid JPEG marker")
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # fill byte
+            position += 1
+        elif marker in (0xDA, 0xD9):
+            # start of scan (the entropy coded data and every following segment are kept) or end of image
+            segments.append(data[position:])
+            break
+        elif marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            # markers without a length
+            segments.append(data[position:position + 2])
+            position += 2
+        else:
+            end = position + 2 + int.from_bytes(data[position + 2:position + 4], "big")
+            if marker not in STRIPPED_JPEG_SEGMENTS:
+                segments.append(data[position:end])
+            position = end
+    return b"".join(segments)
+
+
+def _encode_jpeg(image, max_quality=100):
+    """ Encodes at the highest quality step (at most `max_quality`) meeting the size target (or the minimum quality) """
+    image = image if image.mode in ("L", "RGB") else image.convert("RGB")
+    target_size = image.width * image.height * IMAGE_INGEST_TARGET_BITS_PER_PIXEL / 8
+    params = {"optimize": True, "progressive": True}
+    if image.info.get("icc_profile"):
+        # wide gamut photos (e.g. Display P3) need their color profile
+        params["icc_profile"] = image.info["icc_profile"]
+    first_quality = min(IMAGE_INGEST_QUALITY, max_quality)
+    for quality in range(first_quality, min(IMAGE_INGEST_MIN_QUALITY, first_quality) - 1, -IMAGE_INGEST_QUALITY_STEP):
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=quality, **params)
+        if buffer.tell() <= target_size:
+            break
+    return buffer.getvalue()
+
+
+def _encode_png(image):
+    """ Encodes losslessly, keeping the transparency and color profile only """
+    buffer = io.BytesIO()
+    params = {key: image.info[key] for key in ("transparency", "icc_profile") if image.info.get(key) is not None}
+    image.save(buffer, "PNG", optimize=True, **params)
+    return buffer.getvalue()
+
+
+def _optimize_image_data(original, content):
+    """ Optimised content of an opened image, None if there is nothing to optimise """
+    # png text chunks (`tEXt`, `iTXt`, `zTXt`) hold metadata too
+    has_metadata = any(key in original.info for key in STRIPPED_IMAGE_INFO) or bool(getattr(original, "text", None))
+    rotated = original.getexif().get(EXIF_ORIENTATION, 1) != 1
+    scaled = max(original.size) > IMAGE_INGEST_MAX_DIMENSION
+    if original.format == "JPEG":
+        quality = _get_jpeg_quality(original)
+        oversized = quality > IMAGE_INGEST_MIN_QUALITY and (
+            len(content) > original.width * original.height * IMAGE_INGEST_TARGET_BITS_PER_PIXEL / 8
+        )
+        if not (rotated or scaled or oversized):
+            # only the metadata has to go, the image data is kept as it is
+            return _strip_jpeg_metadata(content) if has_metadata else None
+
+    original.load()
+    image = ImageOps.exif_transpose(original)
+    if scaled:
+        if image.mode == "P":
+            image = image.convert("RGBA")
+        image.thumbnail((IMAGE_INGEST_MAX_DIMENSION, IMAGE_INGEST_MAX_DIMENSION), Image.LANCZOS)
+    if original.format != "JPEG":
+        return _encode_png(image)
+    data = _encode_jpeg(image, max_quality=quality)
+    if len(data) >= len(content) and has_metadata and not rotated:
+        # the recompressed image is not smaller, at least strip the metadata of the original
+        return _strip_jpeg_metadata(content)
+    return data
+
+
+def optimize_image(file, name):
+    """[Optimises an uploaded raster image before it is stored]
+
+    The EXIF orientation is applied, file metadata (camera, GPS, XMP, comments) stripped, images larger than
+    `IMAGE_INGEST_MAX_DIMENSION` are scaled down and JPEG images above the size target recompressed, never above
+    their own quality. JPEG images only carrying metadata are stripped losslessly. The format (and so the
+    extension) never changes and the upload is kept whenever the result is not smaller.
+
+    Args:
+        file ([File]): [open upload, its position is restored]
+        name ([str]): [file name]
+
+    Returns:
+        [ContentFile]: [optimised image, with its report (`original_size`, `size`, `saved` in bytes) as
+            `image_optimization`, None if the upload is kept as it is]
+    """
+    if os.path.splitext(name)[1].lower() not in IMAGE_VARIANT_EXTENSIONS or hasattr(file, "image_optimization"):
+        return None
+    position = file.tell() if hasattr(file, "tell") else 0
+    try:
+        file.seek(0)
+        content = file.read()
+        with Image.open(io.BytesIO(content)) as original:
+            # the forms reject these, never decode them here
+            if original.format not in ("JPEG", "PNG") or not is_image_size_allowed(*original.size):
+                return None
+            data = _optimize_image_data(original, content)
+    except (OSError, ValueError, IndexError, Image.DecompressionBombError):
+        logger.exception("There was an exception optimising the image `%s`", name)
+        return None
+    finally:
+        file.seek(position)
+
+    original_size = len(content)
+    if data is None or len(data) >= original_size:
+        return None
+    optimized = ContentFile(data, name=name)
+    optimized.image_optimization = {
+        "original_size": original_size, "size": len(data), "saved": original_size - len(data)
+    }
+    # per upload, bulk inserts would log a line per row
+    logger.debug(
+        "Optimised the image `%s`: %s => %s bytes (%s saved)", name, original_size, len(data), original_size - len(data)
+    )
+    return optimized
+
+
+# ----------------------------------------------------
+# *** Signal Receivers ***
+# ----------------------------------------------------
+
+def optimize_new_images(sender, instance, raw=False, **kwargs):
+    """ Replaces the content of newly assigned images with the optimised image before it is stored """
+    if raw:
+        return
+    for field in get_image_fields(sender):
+        field_file = getattr(instance, field.name)
+        if field_file and not field_file._committed:
+            optimized = optimize_image(field_file.file, field_file.name)
+            if optimized is not None:
+                field_file.file = optimized
+
+
+def connect_image_optimization(model):
+    """ Optimises every image uploaded to `model` (connect it before the receivers reading the new files) """
+    if not get_image_fields(model):
+        return
+    if model not in IMAGE_OPTIMIZATION_MODELS:
+        IMAGE_OPTIMIZATION_MODELS.append(model)
+    pre_save.connect(optimize_new_images, sender=model, dispatch_uid=f"{model.__name__}_image_optimization")
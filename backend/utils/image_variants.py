@@ -0,0 +1,291 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, models, transaction
+from django.db.models.signals import pre_save, post_save
+from django_cleanup.signals import cleanup_pre_delete
+from PIL import Image, ImageOps, features
+from utils.file_metadata import METADATA_FIELD_SUFFIX
+from utils.signals import post_bulk_insert
+
+
+logger = logging.getLogger(__name__)
+
+# widths (in pixels) of the renditions rendered next to every uploaded raster image
+IMAGE_VARIANT_WIDTHS = tuple(sorted(getattr(settings, "IMAGE_VARIANT_WIDTHS", (64, 128, 256, 512))))
+IMAGE_VARIANT_QUALITY = getattr(settings, "IMAGE_VARIANT_QUALITY", 85)
+# vector images (.svg) scale by themselves and are served as they are
+IMAGE_VARIANT_EXTENSIONS = (".jpg", ".jpeg", ".png")
+# modern formats every rendition is also transcoded to (in order of preference), if the local codec supports them
+IMAGE_VARIANT_FORMATS = tuple(
+    image_format for image_format in getattr(settings, "IMAGE_VARIANT_FORMATS", ("avif", "webp"))
+    if features.check(image_format)
+)
+IMAGE_FORMAT_CONTENT_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+# documents get a preview image of their first page instead (see `utils.document_previews`)
+DOCUMENT_PREVIEW_EXTENSIONS = (".pdf",)
+
+# a single background thread renders the renditions, so uploads never wait for them
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-variants")
+
+# models connected with `connect_image_variants()`
+IMAGE_VARIANT_MODELS = []
+
+
+def get_image_variant_name(name, width, image_format=None):
+    """ `<upload path>/<name>-<width>w<ext>` next to the original, `<name>-<width>w.<format>` when transcoded """
+    root, ext = os.path.splitext(name)
+    return f"{root}-{width}w{f'.{image_format}' if image_format else ext}"
+
+
+def has_image_variants(name):
+    return bool(name) and os.path.splitext(name)[1].lower() in IMAGE_VARIANT_EXTENSIONS
+
+
+def has_document_preview(name):
+    return bool(name) and os.path.splitext(name)[1].lower() in DOCUMENT_PREVIEW_EXTENSIONS
+
+
+def get_document_preview_name(name):
+    """ `<upload path>/<name>-preview.jpg` next to the document """
+    return f"{os.path.splitext(name)[0]}-preview.jpg"
+
+
+def get_image_variant_names(name):
+    """ Stored names of all renditions of a file (images in every format, the preview of a document) """
+    if has_document_preview(name):
+        return [get_document_preview_name(name)]
+    if not has_image_variants(name):
+        return []
+    return [
+        get_image_variant_name(name, width, image_format)
+        for width in IMAGE_VARIANT_WIDTHS for image_format in (None,) + IMAGE_VARIANT_FORMATS
+    ]
+
+
+def get_accepted_image_format(accept):
+    """[Picks the preferred transcoded format a client accepts]
+
+    Args:
+        accept ([str]): [`Accept` request header]
+
+    Returns:
+        [str]: [one of `IMAGE_VARIANT_FORMATS`, None if the client only gets the original format]
+    """
+    accepted = set()
+    for media_range in (accept or "").split(","):
+        content_type, *params = [part.strip() for part in media_range.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0
+        # wildcards (`image/*`) are sent by clients without AVIF or WebP support too
+        if quality > 0:
+            accepted.add(content_type.lower())
+    for image_format in IMAGE_VARIANT_FORMATS:
+        if IMAGE_FORMAT_CONTENT_TYPES[image_format] in accepted:
+            return image_format
+    return None
+
+
+def encode_image(image, image_format):
+    """ Encodes a Pillow image as JPEG, PNG, WEBP or AVIF with the rendition quality """
+    buffer = io.BytesIO()
+    image_format = image_format.upper()
+    if image_format == "JPEG":
+        image.convert("RGB").save(buffer, "JPEG", quality=IMAGE_VARIANT_QUALITY, optimize=True, progressive=True)
+    elif image_format in ("WEBP", "AVIF"):
+        image = image if image.mode in ("RGB", "RGBA") else image.convert(
+            "RGBA" if "A" in image.mode or "transparency" in image.info else "RGB"
+        )
+        image.save(buffer, image_format, quality=IMAGE_VARIANT_QUALITY)
+    else:
+        image.save(buffer, image_format, optimize=True)
+    return buffer.getvalue()
+
+
+def generate_image_variants(field_file):
+    """[Renders one rendition per `IMAGE_VARIANT_WIDTHS` width next to a stored image]
+
+    Renditions keep the aspect ratio of the original and are never upscaled, widths above the original width are
+    re-encoded at the original size so every width of the `srcset` exists. Every rendition is stored in the format
+    of the original and transcoded to each of `IMAGE_VARIANT_FORMATS`.
+
+    Args:
+        field_file ([FieldFile]): [stored image]
+
+    Returns:
+        [dict]: [rendered `widths` and transcoded `formats` (recorded as `variants` in the file metadata), None if
+            nothing was rendered]
+    """
+    if not field_file or not has_image_variants(field_file.name):
+        return None
+    storage = field_file.storage
+    try:
+        with storage.open(field_file.name) as file:
+            image = Image.open(file)
+            image.load()
+            image_format = image.format
+        image = ImageOps.exif_transpose(image)
+    except (OSError, ValueError):
+        logger.exception("There was an exception reading the image `%s`", field_file.name)
+        return None
+
+    # every rendition is scaled down from the next larger one
+    for width in reversed(IMAGE_VARIANT_WIDTHS):
+        image.thumbnail((width, image.height))
+        for variant_format in (None,) + IMAGE_VARIANT_FORMATS:
+            name = get_image_variant_name(field_file.name, width, variant_format)
+            storage.delete(name)
+            storage.save(name, ContentFile(encode_image(image, variant_format or image_format)))
+    return {"widths": list(IMAGE_VARIANT_WIDTHS), "formats": list(IMAGE_VARIANT_FORMATS)}
+
+
+def delete_image_variants(storage, name):
+    for variant in get_image_variant_names(name):
+        storage.delete(variant)
+
+
+def get_recorded_image_variants(field_file):
+    """ Renditions of an image recorded in the metadata of its row (`widths`, `formats`), None until rendered """
+    metadata = getattr(field_file.instance, f"{field_file.field.name}{METADATA_FIELD_SUFFIX}", None) or {}
+    return metadata.get("variants") if has_image_variants(field_file.name) else None
+
+
+def get_image_variant_url(field_file, width, image_format=None):
+    """ URL of the smallest rendition at least `width` pixels wide (the original for larger widths or until the
+        renditions are rendered) """
+    if not field_file:
+        return ""
+    variants = get_recorded_image_variants(field_file)
+    if variants:
+        if image_format not in variants["formats"]:
+            image_format = None
+        for variant_width in variants["widths"]:
+            if variant_width >= width:
+                return field_file.storage.url(get_image_variant_name(field_file.name, variant_width, image_format))
+    return field_file.url
+
+
+def get_image_srcset(field_file, image_format=None):
+    """ `srcset` attribute value listing every rendition of an image (in `image_format`) with its width """
+    variants = get_recorded_image_variants(field_file) if field_file else None
+    if not variants:
+        return ""
+    if image_format not in variants["formats"]:
+        image_format = None
+    return ", ".join(
+        f"{field_file.storage.url(get_image_variant_name(field_file.name, width, image_format))} {width}w"
+        for width in variants["widths"]
+    )
+
+
+def update_image_variants(model, pk, field_names):
+    """ Renders the renditions of images of a row and records them in its file metadata (`variants`), returns the
+        number of recorded images """
+    recorded = 0
+    try:
+        obj = model._base_manager.filter(pk=pk).first()
+        if obj is None:
+            return recorded
+        for name in field_names:
+            field_file = getattr(obj, name)
+            variants = generate_image_variants(field_file)
+            if variants is not None:
+                metadata_field = f"{name}{METADATA_FIELD_SUFFIX}"
+                # a replaced image keeps the metadata of its replacement
+                recorded += model._base_manager.filter(pk=pk, **{name: field_file.name}).update(**{
+                    metadata_field: dict(getattr(obj, metadata_field), variants=variants)
+                })
+    except Exception:
+        logger.exception("There was an exception updating the image renditions of %s %s", model.__name__, pk)
+    return recorded
+
+
+def _update_image_variants_in_background(model, pk, field_names):
+    # the background thread keeps its own database connection
+    close_old_connections()
+    try:
+        update_image_variants(model, pk, field_names)
+    finally:
+        close_old_connections()
+
+
+def queue_image_variants(model, instances, using=None):
+    """ Renders the renditions of the images uploaded to rows once the current transaction commits """
+    rows = [
+        (instance.pk, instance._new_image_fields) for instance in instances
+        if getattr(instance, "_new_image_fields", None)
+    ]
+    if not rows:
+        return
+
+    def render():
+        for pk, field_names in rows:
+            if settings.IMAGE_VARIANTS_IN_BACKGROUND:
+                _executor.submit(_update_image_variants_in_background, model, pk, field_names)
+            else:
+                update_image_variants(model, pk, field_names)
+
+    transaction.on_commit(render, using=using)
+
+
+# ----------------------------------------------------
+# *** Signal Receivers ***
+# ----------------------------------------------------
+
+def get_image_fields(model):
+    return [field for field in model._meta.concrete_fields if isinstance(field, models.ImageField)]
+
+
+def get_image_variant_fields(model):
+    """ Image fields of a model with a metadata field, only these record (and so serve) renditions """
+    field_names = {field.name for field in model._meta.concrete_fields}
+    return [field for field in get_image_fields(model) if f"{field.name}{METADATA_FIELD_SUFFIX}" in field_names]
+
+
+def mark_new_images(sender, instance, raw=False, **kwargs):
+    """ Remembers the image fields with a new (not yet stored) upload """
+    if raw:
+        return
+    instance._new_image_fields = [
+        field.name for field in get_image_variant_fields(sender)
+        if getattr(instance, field.name) and not getattr(instance, field.name)._committed
+    ]
+
+
+def queue_variants_on_save(sender, instance, raw=False, using=None, **kwargs):
+    """ Renders the renditions of the images uploaded with this save """
+    queue_image_variants(sender, [instance], using=using)
+    instance._new_image_fields = []
+
+
+def queue_variants_on_bulk_insert(sender, instances, using=None, **kwargs):
+    queue_image_variants(sender, instances, using=using)
+
+
+def delete_variants_on_cleanup(sender, file, **kwargs):
+    """ Deletes the renditions of an image django-cleanup is about to delete (replaced or of a deleted row) """
+    delete_image_variants(file.storage, file.name)
+
+
+def connect_image_variants(model):
+    """ Renders renditions (in the background) for every image uploaded to `model` and deletes them with the
+        original """
+    if not get_image_variant_fields(model):
+        return
+    if model not in IMAGE_VARIANT_MODELS:
+        IMAGE_VARIANT_MODELS.append(model)
+    pre_save.connect(mark_new_images, sender=model, dispatch_uid=f"{model.__name__}_mark_new_images")
+    post_save.connect(queue_variants_on_save, sender=model, dispatch_uid=f"{model.__name__}_image_variants")
+    post_bulk_insert.connect(
+        queue_variants_on_bulk_insert, sender=model, dispatch_uid=f"{model.__name__}_image_variants_bulk_insert"
+    )
+    cleanup_pre_delete.connect(delete_variants_on_cleanup, dispatch_uid="image_variants_cleanup")
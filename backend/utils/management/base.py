@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class DummyDataCommand(BaseCommand):
+    """
+    Base command of the `generate_dummy_*` commands.
+    Data is built in memory and inserted in batches, each batch in its own transaction.
+    Subclasses set `create_data_with_factory` to the `create_*_with_factory` function of their model.
+    """
+    help = "Generates dummy data"
+    create_data_with_factory = None
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=7, help="Number of rows to generate")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of rows inserted at once")
+        parser.add_argument('--workers', type=int, default=1, help="Number of processes inserting batches")
+        parser.add_argument(
+            '--owners', type=int, default=10, help="Number of users shared as owners of the generated rows"
+        )
+        parser.add_argument('--quiet', action='store_true', help="Do not print the progress")
+
+    def _generate_dummy_data(self, **options):
+        # the function is a class attribute, it is not bound to the command
+        type(self).create_data_with_factory(**options)
+
+    def handle(self, *args, **options):
+        for option in ('count', 'batch_size', 'workers', 'owners'):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be positive")
+        # generate data
+        self._generate_dummy_data(
+            num_of_data=options['count'],
+            delete_old_data=False,
+            bulk=True,
+            batch_size=options['batch_size'],
+            owner_pool_size=options['owners'],
+            workers=options['workers'],
+            quiet=options['quiet'],
+        )
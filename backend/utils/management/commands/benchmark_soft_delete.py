@@ -0,0 +1,76 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+from django.test.utils import CaptureQueriesContext
+from safedelete.models import SafeDeleteModel
+from portfolios.seeding import generate_portfolios, get_seed_models
+from users.factories.user_factory import UserFactory
+
+# (strategy, soft delete, restore)
+SOFT_DELETE_STRATEGIES = (
+    ("row-wise (safedelete)", SafeDeleteModel.soft_delete_cascade_policy_action, SafeDeleteModel.undelete),
+    ("set-based", lambda user: user.delete(), lambda user: user.undelete()),
+)
+
+
+def get_stored_file_names():
+    """ (storage, name) of every file referenced by the seeded tables """
+    return {
+        (field.storage, name)
+        for model in get_seed_models()
+        for field in model._meta.concrete_fields if isinstance(field, models.FileField)
+        for name in model._base_manager.exclude(**{field.name: ""}).values_list(field.name, flat=True) if name
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks soft deleting and restoring a user with a full portfolio, safedelete's row-wise cascade "
+        "against the set-based cascade of `User` (all changes are rolled back)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=50, help="Entries per portfolio section")
+        parser.add_argument('--media', type=int, default=2, help="Media files per entry")
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per strategy (the fastest is reported)")
+
+    def handle(self, *args, **options):
+        if options['entries'] < 0 or options['media'] < 0 or options['repeat'] < 1:
+            raise CommandError("--entries and --media can not be negative, --repeat must be positive")
+        existing_files = get_stored_file_names()
+        for strategy, soft_delete, restore in SOFT_DELETE_STRATEGIES:
+            runs = [
+                self._run(soft_delete, restore, options['entries'], options['media'], existing_files)
+                for _ in range(options['repeat'])
+            ]
+            delete_time, delete_queries, restore_time, restore_queries = min(runs)
+            self.stdout.write(
+                f"{strategy}: soft delete {delete_time * 1000:.1f}ms ({delete_queries} queries), "
+                f"restore {restore_time * 1000:.1f}ms ({restore_queries} queries)"
+            )
+
+    def _measure(self, action, user):
+        with CaptureQueriesContext(connection) as queries:
+            started_at = time.monotonic()
+            action(user)
+            elapsed = time.monotonic() - started_at
+        return elapsed, len(queries)
+
+    def _run(self, soft_delete, restore, entries, media, existing_files):
+        generated_files = set()
+        try:
+            with transaction.atomic():
+                user = UserFactory()
+                generate_portfolios([user], entries, media, [b"benchmark"])
+                generated_files = get_stored_file_names() - existing_files
+                # a fresh instance, nothing related is cached
+                user = get_user_model()._base_manager.get(pk=user.pk)
+                delete_time, delete_queries = self._measure(soft_delete, user)
+                restore_time, restore_queries = self._measure(restore, user)
+                transaction.set_rollback(True)
+        finally:
+            # rows are rolled back, the files generated for them are not
+            for storage, name in generated_files:
+                storage.delete(name)
+        return delete_time, delete_queries, restore_time, restore_queries
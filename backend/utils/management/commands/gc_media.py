@@ -0,0 +1,126 @@
+import datetime
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.template.defaultfilters import filesizeformat
+from portfolios.uploads import get_upload_chunk_names, purge_stale_uploads
+from utils.file_cleanup import delete_files
+from utils.helpers import now
+from utils.media_gc import get_referenced_digests, get_sweep_units, sweep_unit
+from utils.storages import ContentAddressedStorage
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Finds (and with --delete removes) media files no row references anymore: every referenced name is marked "
+        "from the database, then the storage tree is swept in parallel. Progress is checkpointed per directory, "
+        "an interrupted run resumes where it stopped"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=settings.MEDIA_GC_GRACE_HOURS,
+            help="Files modified less than this many hours ago are kept (their rows may not be committed yet)"
+        )
+        parser.add_argument(
+            '--upload-expiry-hours', type=float, default=settings.MEDIA_UPLOAD_EXPIRY_HOURS,
+            help="Resumable uploads started this many hours ago are purged first (with --delete)"
+        )
+        parser.add_argument('--delete', action='store_true', help="Delete the orphaned files instead of listing them")
+        parser.add_argument('--workers', type=int, default=8, help="Number of directories swept in parallel")
+        parser.add_argument(
+            '--state', default=os.path.join(tempfile.gettempdir(), "gc_media.json"),
+            help="Checkpoint file of the run (removed once it completes)"
+        )
+        parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint of an interrupted run")
+
+    def load_state(self, path, options):
+        state = {
+            "media_root": str(settings.MEDIA_ROOT), "delete": options['delete'], "swept": [], "files": 0, "bytes": 0
+        }
+        if options['restart'] or not os.path.exists(path):
+            return state
+        with open(path) as file:
+            saved = json.load(file)
+        if saved.get("media_root") != state["media_root"] or saved.get("delete") != state["delete"]:
+            raise CommandError(f"The checkpoint {path} belongs to another run, use --restart to ignore it")
+        self.stdout.write(f"Resuming after {len(saved['swept'])} swept directories...")
+        return saved
+
+    def save_state(self, path, state):
+        # replaced atomically, an interruption never leaves half a checkpoint
+        with open(f"{path}.tmp", "w") as file:
+            json.dump(state, file)
+        os.replace(f"{path}.tmp", path)
+
+    def sweep(self, unit, referenced, older_than, delete):
+        orphans = sweep_unit(default_storage, unit, referenced, older_than)
+        if delete and isinstance(default_storage, ContentAddressedStorage):
+            # content addressed files go with their blob rows
+            try:
+                for name, size in orphans:
+                    try:
+                        default_storage.delete_unreferenced(name, older_than)
+                    except Exception:
+                        logger.exception("There was an exception deleting the file `%s`", name)
+            finally:
+                # every worker thread has its own database connection
+                connection.close()
+        elif delete:
+            delete_files([(default_storage, name) for name, size in orphans])
+        return unit, orphans
+
+    def handle(self, *args, **options):
+        if options['grace_hours'] < 0 or options['upload_expiry_hours'] < 0 or options['workers'] < 1:
+            raise CommandError("--grace-hours and --upload-expiry-hours can not be negative, --workers must be > 0")
+        started_at = time.monotonic()
+        state = self.load_state(options['state'], options)
+
+        if options['delete']:
+            purged = purge_stale_uploads(now() - datetime.timedelta(hours=options['upload_expiry_hours']))
+            self.stdout.write(f"Purged {purged} stale uploads")
+
+        # mark
+        referenced = get_referenced_digests(extra_names=get_upload_chunk_names())
+        self.stdout.write(f"Marked {len(referenced)} referenced files")
+
+        # sweep
+        older_than = now() - datetime.timedelta(hours=options['grace_hours'])
+        swept = set(state["swept"])
+        units = [unit for unit in get_sweep_units(default_storage) if unit not in swept]
+        with ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix="gc-media") as executor:
+            futures = [
+                executor.submit(self.sweep, unit, referenced, older_than, options['delete']) for unit in units
+            ]
+            try:
+                for future in as_completed(futures):
+                    unit, orphans = future.result()
+                    for name, size in orphans:
+                        if not options['delete'] or options['verbosity'] > 1:
+                            self.stdout.write(f"{name} ({filesizeformat(size)})")
+                    state["swept"].append(unit)
+                    state["files"] += len(orphans)
+                    state["bytes"] += sum(size for name, size in orphans)
+                    self.save_state(options['state'], state)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        if os.path.exists(options['state']):
+            os.remove(options['state'])
+
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Deleted' if options['delete'] else 'Found'} {state['files']} orphaned files "
+            f"({filesizeformat(state['bytes'])}) in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,43 @@
+import time
+from django.core.management.base import BaseCommand
+from utils.document_previews import DOCUMENT_PREVIEW_MODELS, PDFTOPPM, update_document_previews
+from utils.file_metadata import get_metadata_fields
+from utils.image_variants import has_document_preview
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders the missing first page previews of stored pdf documents, e.g. of documents uploaded before "
+        "previews existed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Render previews that already exist again")
+
+    def handle(self, *args, **options):
+        if PDFTOPPM is None:
+            self.stderr.write(self.style.ERROR("`pdftoppm` (poppler-utils) is not installed"))
+            return
+        documents = rendered = 0
+        started_at = time.monotonic()
+        for model in DOCUMENT_PREVIEW_MODELS:
+            metadata_fields = get_metadata_fields(model)
+            queryset = model._base_manager.only("pk", *[
+                name for field, metadata_field in metadata_fields for name in (field.name, metadata_field)
+            ])
+            for obj in queryset.iterator():
+                missing = [
+                    field for field, metadata_field in metadata_fields
+                    if has_document_preview(getattr(obj, field.name).name)
+                    and (options['force'] or "preview" not in getattr(obj, metadata_field))
+                ]
+                documents += any(
+                    has_document_preview(getattr(obj, field.name).name) for field, metadata_field in metadata_fields
+                )
+                if missing:
+                    update_document_previews(model, obj.pk)
+                    rendered += 1
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {documents} documents in {elapsed:.2f}s ({rendered} rendered)"
+        ))
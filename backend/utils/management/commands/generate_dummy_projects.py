@@ -1,19 +1,6 @@
 from portfolios.factories.project_factory import create_projects_with_factory
-from django.db import transaction
-from django.core.management.base import BaseCommand
+from utils.management.base import DummyDataCommand
 
 
-class Command(BaseCommand):
-    help = "Generates dummy data"
-
-    def _generate_dummy_data(self):
-        # Create dummy data
-        create_projects_with_factory(
-            num_of_data=7,
-            delete_old_data=False
-        )
-
-    @transaction.atomic
-    def handle(self, *args, **kwargs):
-        # generate data
-        self._generate_dummy_data()
+class Command(DummyDataCommand):
+    create_data_with_factory = create_projects_with_factory
@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from utils.image_variants import (
+    IMAGE_VARIANT_MODELS, get_image_variant_fields, get_recorded_image_variants, update_image_variants
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Renders the renditions (see `IMAGE_VARIANT_WIDTHS`) of stored images not recorded in their file metadata "
+        "yet, e.g. of images uploaded before renditions existed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Render renditions that already exist again")
+
+    def handle(self, *args, **options):
+        images = generated = 0
+        started_at = time.monotonic()
+        for model in IMAGE_VARIANT_MODELS:
+            for field in get_image_variant_fields(model):
+                for obj in model._base_manager.exclude(**{field.name: ""}).exclude(
+                    **{f"{field.name}__isnull": True}
+                ).only("pk", field.name, f"{field.name}_metadata").iterator():
+                    images += 1
+                    if not options['force'] and get_recorded_image_variants(getattr(obj, field.name)):
+                        continue
+                    generated += update_image_variants(model, obj.pk, [field.name])
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {images} images in {elapsed:.2f}s ({generated} rendered)"
+        ))
@@ -0,0 +1,49 @@
+import json
+import sys
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from portfolios.importer import import_portfolio
+
+
+class Command(BaseCommand):
+    help = "Applies a whole portfolio JSON document to the portfolio of a user, writing only the difference"
+
+    def add_arguments(self, parser):
+        parser.add_argument('user', help="Email or username of the portfolio owner")
+        parser.add_argument('path', help="JSON document to import ('-' for stdin)")
+        parser.add_argument('--dry-run', action='store_true', help="Report the changes without applying them")
+
+    def handle(self, *args, **options):
+        user = get_user_model().live_objects.filter(
+            Q(email__iexact=options['user']) | Q(username=options['user'])
+        ).first()
+        if user is None:
+            raise CommandError(f"User `{options['user']}` does not exist")
+
+        try:
+            if options['path'] == '-':
+                document = json.load(sys.stdin)
+            else:
+                with open(options['path'], encoding='utf-8') as stream:
+                    document = json.load(stream)
+        except ValueError as exception:
+            raise CommandError(f"Invalid JSON document: {exception}")
+
+        try:
+            summary = import_portfolio(user, document, dry_run=options['dry_run'])
+        except ValidationError as error:
+            errors = error.message_dict if hasattr(error, 'error_dict') else {'document': error.messages}
+            for path, messages in errors.items():
+                self.stderr.write(f"{path}: {' '.join(messages)}")
+            raise CommandError("The document is invalid, nothing was imported")
+
+        for section, counts in summary.items():
+            self.stdout.write(
+                f"{section}: {counts['created']} created, {counts['updated']} updated, "
+                f"{counts['deleted']} deleted, {counts['unchanged']} unchanged"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            "Validated the document" if options['dry_run'] else "Imported the document"
+        ))
@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from portfolios.seeding import SEED_LOAD_BATCH_SIZE, load_seed
+
+
+class Command(BaseCommand):
+    help = "Loads a scale profile dump written by `seed_profile --dump` with raw bulk COPY/INSERT statements"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Dump file (.jsonl.gz)")
+        parser.add_argument(
+            '--batch-size', type=int, default=SEED_LOAD_BATCH_SIZE, help="Number of rows per COPY/INSERT"
+        )
+        parser.add_argument('--quiet', action='store_true', help="Do not print the progress")
+
+    def handle(self, *args, **options):
+        log = (lambda *args: None) if options['quiet'] else self.stdout.write
+        started_at = time.monotonic()
+        try:
+            counts = load_seed(options['path'], batch_size=options['batch_size'], log=log)
+        except ValueError as exception:
+            raise CommandError(exception)
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {sum(counts.values())} rows in {time.monotonic() - started_at:.2f}s"
+        ))
@@ -0,0 +1,62 @@
+import os
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.defaultfilters import filesizeformat
+from utils.file_metadata import get_metadata_fields
+from utils.image_optimization import IMAGE_OPTIMIZATION_MODELS, optimize_image
+from utils.image_variants import get_image_fields
+
+
+class Command(BaseCommand):
+    help = (
+        "Optimises stored images like new uploads (metadata stripped, orientation applied, scaled down and "
+        "recompressed), e.g. images uploaded before the optimisation existed. Renditions and metadata are renewed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Check images that were optimised already")
+        parser.add_argument('--dry-run', action='store_true', help="Only report the bytes that would be saved")
+
+    def optimize(self, obj, field, metadata_fields):
+        field_file = getattr(obj, field.name)
+        metadata_field = metadata_fields.get(field.name)
+        if metadata_field and "original_size" in getattr(obj, metadata_field) and not self.options['force']:
+            return None
+        try:
+            with field_file.storage.open(field_file.name) as file:
+                optimized = optimize_image(file, os.path.basename(field_file.name))
+        except OSError:
+            self.stderr.write(f"Could not open {field_file.name}")
+            return None
+        if optimized is None or self.options['dry_run']:
+            return optimized
+        # a new upload: django-cleanup deletes the old file and its renditions, the new renditions are rendered
+        setattr(obj, field.name, optimized)
+        with transaction.atomic():
+            obj.save(update_fields=[field.name] + ([metadata_field] if metadata_field else []))
+        return optimized
+
+    def handle(self, *args, **options):
+        self.options = options
+        images = optimized = saved = 0
+        started_at = time.monotonic()
+        for model in IMAGE_OPTIMIZATION_MODELS:
+            metadata_fields = {field.name: metadata_field for field, metadata_field in get_metadata_fields(model)}
+            for field in get_image_fields(model):
+                for obj in model._base_manager.exclude(**{field.name: ""}).exclude(
+                    **{f"{field.name}__isnull": True}
+                ).iterator():
+                    images += 1
+                    result = self.optimize(obj, field, metadata_fields)
+                    if result is not None:
+                        optimized += 1
+                        saved += result.image_optimization["saved"]
+                        if options['verbosity'] > 1:
+                            saved_bytes = filesizeformat(result.image_optimization['saved'])
+                            self.stdout.write(f"{getattr(obj, field.name).name}: {saved_bytes} saved")
+        elapsed = time.monotonic() - started_at
+        action = "optimisable" if options['dry_run'] else "optimised"
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {images} images in {elapsed:.2f}s ({optimized} {action}, {filesizeformat(saved)} saved)"
+        ))
@@ -0,0 +1,188 @@
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import islice
+import django
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from django.db.models.functions import Lower
+
+# columns (besides `email` and `password`) that can be provided for every user
+PROVISIONING_FIELDS = (
+    'name', 'nick_name', 'gender', 'dob', 'website', 'contact', 'contact_email', 'address', 'about', 'is_active'
+)
+# fields generated or managed by the application, not validated from the input
+EXCLUDED_CLEAN_FIELDS = ['password', 'username', 'slug', 'last_login', 'image']
+
+
+def _init_worker():
+    # worker processes started with `spawn` need their own app registry
+    if not apps.ready:
+        django.setup()
+
+
+def read_csv_rows(stream):
+    # header is line 1, so data rows start at line 2
+    for line_number, row in enumerate(csv.DictReader(stream), start=2):
+        yield line_number, {key: value for key, value in row.items() if key and value not in (None, '')}
+
+
+def read_ndjson_rows(stream):
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exception:
+            row = exception
+        yield line_number, row
+
+
+class Command(BaseCommand):
+    help = "Provisions users in bulk from a CSV or NDJSON (newline delimited JSON) file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or NDJSON file to read users from ('-' for stdin)")
+        parser.add_argument(
+            '--format', choices=['csv', 'ndjson'], default=None,
+            help="Input format (detected from the file extension by default)"
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000, help="Number of users validated and inserted at once"
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(), help="Number of processes used to hash passwords"
+        )
+        parser.add_argument('--rejects', default=None, help="Write rejected rows with reasons to this NDJSON file")
+        parser.add_argument('--dry-run', action='store_true', help="Validate only, do not insert users")
+
+    def handle(self, *args, **options):
+        input_format = options['format'] or ('csv' if options['path'].lower().endswith('.csv') else 'ndjson')
+        if options['chunk_size'] < 1 or options['workers'] < 1:
+            raise CommandError("--chunk-size and --workers must be positive")
+
+        stream = sys.stdin if options['path'] == '-' else open(options['path'], newline='', encoding='utf-8')
+        rejects = open(options['rejects'], 'w', encoding='utf-8') if options['rejects'] else None
+        rows = read_csv_rows(stream) if input_format == 'csv' else read_ndjson_rows(stream)
+
+        self.model = get_user_model()
+        self.dry_run = options['dry_run']
+        self.chunk_size = options['chunk_size']
+        self.workers = options['workers']
+        self.seen_emails = set()
+        self.created = self.rejected = 0
+        self.rejects = rejects
+        started_at = time.monotonic()
+
+        try:
+            # a dry run hashes no passwords, so it needs no worker processes
+            executor = nullcontext() if self.dry_run else ProcessPoolExecutor(
+                max_workers=options['workers'], initializer=_init_worker
+            )
+            with executor:
+                self.executor = executor
+                while True:
+                    chunk = list(islice(rows, self.chunk_size))
+                    if not chunk:
+                        break
+                    self._provision_chunk(chunk)
+                    elapsed = time.monotonic() - started_at
+                    self.stdout.write(
+                        f"{self.created} created, {self.rejected} rejected "
+                        f"({(self.created + self.rejected) / elapsed:.0f} rows/s)"
+                    )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if rejects:
+                rejects.close()
+
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Validated' if self.dry_run else 'Provisioned'} {self.created} users in {elapsed:.2f}s "
+            f"({self.created / elapsed if elapsed else 0:.0f} users/s), rejected {self.rejected} rows"
+        ))
+
+    def _reject(self, line_number, row, reason):
+        self.rejected += 1
+        if isinstance(row, dict):
+            # never write passwords to the report
+            row = {key: value for key, value in row.items() if key != 'password'}
+        self.stderr.write(f"line {line_number}: {reason}")
+        if self.rejects:
+            self.rejects.write(json.dumps({'line': line_number, 'row': row, 'reason': reason}, default=str) + "\n")
+
+    def _build_user(self, row):
+        if not isinstance(row, dict):
+            raise ValidationError(f"Invalid row: {row}")
+        email = self.model.objects.normalize_email(row.get('email') or '').strip()
+        if not email:
+            raise ValidationError("Users must have an email address")
+        user = self.model(email=email, **{field: row[field] for field in PROVISIONING_FIELDS if field in row})
+        user.full_clean(exclude=EXCLUDED_CLEAN_FIELDS, validate_unique=False)
+        return user
+
+    def _provision_chunk(self, chunk):
+        valid = self._validate_chunk(chunk)
+        if not valid:
+            return
+        if self.dry_run:
+            self.created += len(valid)
+            return
+        self._insert_chunk(valid)
+
+    def _validate_chunk(self, chunk):
+        # validate rows in memory
+        candidates = []
+        for line_number, row in chunk:
+            try:
+                user = self._build_user(row)
+            except ValidationError as exception:
+                self._reject(line_number, row, "; ".join(exception.messages))
+                continue
+            if user.email.lower() in self.seen_emails:
+                self._reject(line_number, row, f"Duplicate email {user.email} in input")
+                continue
+            self.seen_emails.add(user.email.lower())
+            candidates.append((line_number, row, user))
+
+        # reject already existing emails (in any letter case) with one query, served by the `Lower('email')` index
+        existing = set(
+            self.model._base_manager.annotate(email_lower=Lower('email')).filter(
+                email_lower__in=[user.email.lower() for line_number, row, user in candidates]
+            ).order_by().values_list('email_lower', flat=True)
+        )
+        valid = []
+        for line_number, row, user in candidates:
+            if user.email.lower() in existing:
+                self._reject(line_number, row, f"User with email {user.email} already exists")
+            else:
+                valid.append((line_number, row, user))
+        return valid
+
+    def _insert_chunk(self, valid):
+        # hash passwords in parallel, users without password get an unusable one
+        passwords = [row.get('password') for line_number, row, user in valid]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        for (line_number, row, user), password in zip(
+            valid, self.executor.map(make_password, passwords, chunksize=chunksize)
+        ):
+            user.password = password
+
+        try:
+            self.model.objects.bulk_insert([user for line_number, row, user in valid], batch_size=self.chunk_size)
+        except IntegrityError as exception:
+            # e.g. a concurrent signup took one of the emails, the whole chunk is rolled back
+            for line_number, row, user in valid:
+                self._reject(line_number, row, f"Chunk rolled back: {exception}")
+            return
+        self.created += len(valid)
@@ -0,0 +1,34 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from portfolios.snapshots import get_snapshot_languages, publish_portfolio
+
+
+class Command(BaseCommand):
+    help = "Publishes portfolio snapshots (one row per user and language) of one or all users"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default=None, help="Email or username of a single portfolio owner")
+        parser.add_argument(
+            '--language', action='append', choices=get_snapshot_languages(), default=None,
+            help="Language to publish (repeatable, all languages by default)"
+        )
+
+    def handle(self, *args, **options):
+        users = get_user_model().live_objects.order_by('pk')
+        if options['user']:
+            users = users.filter(Q(email__iexact=options['user']) | Q(username=options['user']))
+            if not users.exists():
+                raise CommandError(f"User `{options['user']}` does not exist")
+
+        published = changed = 0
+        started_at = time.monotonic()
+        for user in users.iterator():
+            snapshots = publish_portfolio(user, languages=options['language'])
+            published += 1
+            changed += sum(1 for snapshot, snapshot_changed in snapshots.values() if snapshot_changed)
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f"Published the portfolios of {published} users in {elapsed:.2f}s ({changed} snapshots changed)"
+        ))
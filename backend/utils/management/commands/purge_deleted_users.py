@@ -0,0 +1,55 @@
+import datetime
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from safedelete.config import FIELD_NAME
+from utils.helpers import bulk_delete, now
+
+
+class Command(BaseCommand):
+    help = (
+        "Hard deletes users soft deleted before the retention window, with everything that cascades from them, "
+        "in bounded batches (one transaction each) with pauses in between"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.USER_PURGE_RETENTION_DAYS,
+            help="Retention window, users soft deleted less than this many days ago are kept"
+        )
+        parser.add_argument('--batch-size', type=int, default=100, help="Number of users deleted per transaction")
+        parser.add_argument('--pause', type=float, default=0.5, help="Seconds to wait between batches")
+        parser.add_argument('--limit', type=int, default=None, help="Stop after purging this many users")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the users that would be purged")
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1 or options['pause'] < 0:
+            raise CommandError("--days and --pause can not be negative, --batch-size must be positive")
+        model = get_user_model()
+        # served by the partial index on soft deleted users
+        expired = model._base_manager.filter(
+            **{f"{FIELD_NAME}__lt": now() - datetime.timedelta(days=options['days'])}
+        ).order_by(FIELD_NAME)
+        if options['dry_run']:
+            self.stdout.write(f"{expired.count()} soft deleted users would be purged")
+            return
+
+        purged = rows = 0
+        started_at = time.monotonic()
+        while options['limit'] is None or purged < options['limit']:
+            size = options['batch_size'] if options['limit'] is None else min(
+                options['batch_size'], options['limit'] - purged
+            )
+            pks = list(expired.values_list("pk", flat=True)[:size])
+            if not pks:
+                break
+            deleted, deleted_per_model = bulk_delete(model._base_manager.filter(pk__in=pks), hard_delete=True)
+            purged += deleted_per_model.get(model._meta.label, 0)
+            rows += deleted
+            self.stdout.write(f"Purged {purged} users ({rows} rows)...")
+            # give live traffic the tables (and the database) back between batches
+            time.sleep(options['pause'])
+
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} soft deleted users ({rows} rows) in {elapsed:.2f}s"))
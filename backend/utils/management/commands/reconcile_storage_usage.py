@@ -0,0 +1,49 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from portfolios.storage_usage import reconcile_storage_usage
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the media storage counters (files and bytes per user, section and media model) from the stored "
+        "files, several users in parallel. The counters are maintained with every write, this corrects any drift"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', type=int, dest='users', help="Only reconcile this user id")
+        parser.add_argument('--workers', type=int, default=4, help="Number of users reconciled in parallel")
+
+    def reconcile(self, user_id):
+        try:
+            return reconcile_storage_usage(user_id)
+        finally:
+            # every worker thread has its own database connection
+            connection.close()
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError("--workers must be > 0")
+        started_at = time.monotonic()
+        user_ids = options['users'] or list(get_user_model()._base_manager.values_list("pk", flat=True))
+        files = size = corrected = 0
+        if options['workers'] == 1:
+            results = map(reconcile_storage_usage, user_ids)
+        else:
+            executor = ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix="reconcile-storage")
+            results = executor.map(self.reconcile, user_ids)
+        for user_id, (usage, user_corrected) in zip(user_ids, results):
+            corrected += user_corrected
+            files += sum(model_files for model_files, model_size in usage.values())
+            size += sum(model_size for model_files, model_size in usage.values())
+            if options['verbosity'] > 1:
+                self.stdout.write(f"User {user_id}: {usage}")
+        if options['workers'] != 1:
+            executor.shutdown()
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {len(user_ids)} users in {elapsed:.2f}s ({files} files, {size} bytes, "
+            f"{corrected} file sizes corrected)"
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from portfolios.seeding import SEED_PROFILES, dump_seed, generate_seed_profile
+
+
+class Command(BaseCommand):
+    help = "Generates a deterministic scale profile (users with full portfolios) and optionally dumps it"
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile', choices=list(SEED_PROFILES), help="Scale profile to generate")
+        parser.add_argument('--dump', default=None, help="Write the generated data to this dump file (.jsonl.gz)")
+        parser.add_argument('--quiet', action='store_true', help="Do not print the progress")
+
+    def handle(self, *args, **options):
+        log = (lambda *args: None) if options['quiet'] else self.stdout.write
+        try:
+            generate_seed_profile(options['profile'], log=log)
+        except ValueError as exception:
+            raise CommandError(exception)
+        if options['dump']:
+            dump_seed(options['dump'], profile=options['profile'], log=log)
+        self.stdout.write(self.style.SUCCESS(f"Generated the {options['profile']} profile"))
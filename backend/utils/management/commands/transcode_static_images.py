@@ -0,0 +1,59 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, ImageOps
+from utils.image_variants import IMAGE_VARIANT_EXTENSIONS, IMAGE_VARIANT_FORMATS, encode_image
+
+
+class Command(BaseCommand):
+    help = (
+        "Transcodes the raster images of `STATICFILES_DIRS` to `IMAGE_VARIANT_FORMATS` next to the originals "
+        "(a build step before `collectstatic`, served by the `static_image` template tag)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', action='append', default=None,
+            help="Directory relative to the static directories, e.g. `icons` (repeatable, everything by default)"
+        )
+        parser.add_argument('--force', action='store_true', help="Transcode images with up to date copies again")
+
+    def handle(self, *args, **options):
+        if not IMAGE_VARIANT_FORMATS:
+            raise CommandError("No codec of `IMAGE_VARIANT_FORMATS` is available")
+        roots = [
+            os.path.join(static_dir, path) for static_dir in settings.STATICFILES_DIRS
+            for path in (options['path'] or [""])
+        ]
+        images = written = 0
+        started_at = time.monotonic()
+        for root in roots:
+            for directory, directories, files in os.walk(root):
+                for name in files:
+                    if os.path.splitext(name)[1].lower() not in IMAGE_VARIANT_EXTENSIONS:
+                        continue
+                    images += 1
+                    written += self._transcode(os.path.join(directory, name), options['force'])
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {images} images in {elapsed:.2f}s ({written} copies written)"
+        ))
+
+    def _transcode(self, source, force):
+        targets = [
+            f"{os.path.splitext(source)[0]}.{image_format}" for image_format in IMAGE_VARIANT_FORMATS
+        ]
+        # copies newer than their original are up to date
+        targets = [
+            target for target in targets
+            if force or not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(source)
+        ]
+        if not targets:
+            return 0
+        with Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            for target, image_format in zip(targets, [os.path.splitext(target)[1][1:] for target in targets]):
+                with open(target, "wb") as file:
+                    file.write(encode_image(image, image_format))
+        return len(targets)
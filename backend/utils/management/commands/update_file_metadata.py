@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand
+from utils.file_metadata import FILE_METADATA_MODELS, get_metadata_fields, update_stored_file_metadata
+
+
+class Command(BaseCommand):
+    help = (
+        "Stores the missing metadata (size, mime type, dimensions, dominant color) of stored files, e.g. of files "
+        "uploaded before metadata existed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Read the metadata of every file again")
+
+    def handle(self, *args, **options):
+        rows = updated = 0
+        started_at = time.monotonic()
+        for model in FILE_METADATA_MODELS:
+            metadata_fields = get_metadata_fields(model)
+            queryset = model._base_manager.only("pk", *[
+                name for field, metadata_field in metadata_fields for name in (field.name, metadata_field)
+            ])
+            for obj in queryset.iterator():
+                rows += 1
+                if not options['force'] and all(
+                    getattr(obj, metadata_field) or not getattr(obj, field.name)
+                    for field, metadata_field in metadata_fields
+                ):
+                    continue
+                update_fields = update_stored_file_metadata(obj)
+                if update_fields:
+                    # `update()` skips the signal receivers of a save, the files did not change
+                    model._base_manager.filter(pk=obj.pk).update(**{
+                        name: getattr(obj, name) for name in update_fields
+                    })
+                    updated += 1
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {rows} rows in {elapsed:.2f}s ({updated} updated)"
+        ))
@@ -0,0 +1,79 @@
+import hashlib
+from utils.image_variants import get_image_variant_names
+from utils.storages import CONTENT_ADDRESSED_MEDIA_ROOT, get_file_fields
+
+
+MEDIA_GC_CHUNK_SIZE = 2000
+
+
+def get_name_digest(name):
+    """ 8 byte digest of a stored name, a set of digests stays small for millions of files """
+    return hashlib.blake2b(name.encode(), digest_size=8).digest()
+
+
+def get_referenced_digests(extra_names=()):
+    """[Marks every stored name a row references, with the renditions and previews derived from it]
+
+    The names are streamed field by field from the database (rows of soft deleted users included).
+
+    Args:
+        extra_names ([iterable], optional): [further referenced names]. Defaults to ().
+
+    Returns:
+        [set]: [digests (see `get_name_digest()`) of the referenced names]
+    """
+    referenced = set()
+    for model, field in get_file_fields():
+        names = model._base_manager.exclude(**{field.attname: ""}).exclude(
+            **{f"{field.attname}__isnull": True}
+        ).order_by().values_list(field.attname, flat=True).iterator(chunk_size=MEDIA_GC_CHUNK_SIZE)
+        for name in names:
+            referenced.add(get_name_digest(name))
+            referenced.update(get_name_digest(variant) for variant in get_image_variant_names(name))
+    referenced.update(get_name_digest(name) for name in extra_names)
+    return referenced
+
+
+def get_sweep_units(storage):
+    """[Splits the storage tree into units swept (and checkpointed) independently]
+
+    Returns:
+        [list]: [directory names, every user directory and every shard of the content addressed root,
+            "" stands for the files at the top level]
+    """
+    directories, files = storage.listdir("")
+    units = [""] if files else []
+    for directory in sorted(directories):
+        if directory == CONTENT_ADDRESSED_MEDIA_ROOT:
+            units.extend(f"{directory}/{shard}" for shard in sorted(storage.listdir(directory)[0]))
+        else:
+            units.append(directory)
+    return units
+
+
+def sweep_unit(storage, unit, referenced, older_than):
+    """[Finds the unreferenced files of a unit of the storage tree]
+
+    Args:
+        storage ([Storage]): [media storage]
+        unit ([str]): [directory (see `get_sweep_units()`), its whole subtree is swept except for "" (top level)]
+        referenced ([set]): [digests of the referenced names]
+        older_than ([datetime]): [newer files are kept (e.g. uploads whose rows are not committed yet)]
+
+    Returns:
+        [list]: [(name, size) of the orphaned files]
+    """
+    orphans = []
+    pending = [unit]
+    while pending:
+        directory = pending.pop()
+        directories, files = storage.listdir(directory)
+        if directory:
+            pending.extend(f"{directory}/{name}" for name in directories)
+        for file_name in files:
+            name = f"{directory}/{file_name}" if directory else file_name
+            if file_name.startswith(".") or get_name_digest(name) in referenced:
+                continue
+            if storage.get_modified_time(name) < older_than:
+                orphans.append((name, storage.size(name)))
+    return orphans
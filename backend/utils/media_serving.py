@@ -0,0 +1,161 @@
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.utils.translation import gettext_lazy as _
+from utils.storages import CONTENT_ADDRESSED_NAME
+
+
+MEDIA_BLOCK_SIZE = 64 * 1024
+# content addressed files never change under their name
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# other files may be replaced, clients revalidate them (cheap with the ETag)
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+# user uploaded documents (e.g. svg images) must not run scripts on the site's origin
+MEDIA_CONTENT_SECURITY_POLICY = "default-src 'none'; img-src 'self' data:; style-src 'unsafe-inline'; sandbox"
+BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def get_media_file(name):
+    """[Resolves a media file below `MEDIA_ROOT`]
+
+    Args:
+        name ([str]): [media path from the URL]
+
+    Raises:
+        Http404: [for paths outside of `MEDIA_ROOT`, directories and missing files]
+
+    Returns:
+        [tuple]: [absolute path, `os.stat_result`]
+    """
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+        stat_result = os.stat(path)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404(_("File not found!"))
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404(_("File not found!"))
+    return path, stat_result
+
+
+def get_media_etag(name, stat_result):
+    """ Strong ETag of a media file: its content hash if content addressed, modification time and size otherwise """
+    match = CONTENT_ADDRESSED_NAME.match(name)
+    if match is not None:
+        return f'"{match.group("hash")}{match.group("derived") or ""}"'
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def parse_range_header(header, size):
+    """[Parses a single range `Range` header]
+
+    Multiple ranges are not supported, the whole file is sent for them (which a server may always do).
+
+    Args:
+        header ([str]): [`Range` request header]
+        size ([int]): [file size in bytes]
+
+    Returns:
+        [tuple]: [(first, last) byte positions (inclusive), None for the whole file, () if not satisfiable]
+    """
+    match = BYTE_RANGE.match((header or "").replace(" ", ""))
+    if match is None or not (match.group(1) or match.group(2)):
+        return None
+    if not match.group(1):
+        # the last n bytes
+        length = int(match.group(2))
+        return (max(size - length, 0), size - 1) if length and size else ()
+    first = int(match.group(1))
+    last = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+    if first > last or first >= size:
+        return ()
+    return first, last
+
+
+def iterate_file_range(file, first, last):
+    """ Reads `first`..`last` (inclusive) of an open file in `MEDIA_BLOCK_SIZE` pieces, closing it at the end """
+    try:
+        file.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            data = file.read(min(MEDIA_BLOCK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        file.close()
+
+
+def _is_range_current(request, etag, last_modified):
+    """ `If-Range`: a range of a file is only sent if the client's copy is still the current one """
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def serve_media(request, name):
+    """[Responds with a media file (GET / HEAD) the way a static file server would]
+
+    Conditional requests are answered with `304` / `412`, single `Range` requests with `206` (or `416`).
+    With `MEDIA_SENDFILE_HEADER` the transfer is handed to the front proxy (`X-Accel-Redirect` for nginx,
+    `X-Sendfile` for Apache / lighttpd), which also serves the ranges, so no byte passes through Python.
+    Otherwise whole files are sent with the server's `wsgi.file_wrapper` (sendfile where available) and ranges
+    are streamed in `MEDIA_BLOCK_SIZE` pieces.
+
+    Args:
+        request ([HttpRequest]): [request]
+        name ([str]): [media path below `MEDIA_URL`]
+
+    Returns:
+        [HttpResponse]: [response]
+    """
+    path, stat_result = get_media_file(name)
+    size = stat_result.st_size
+    etag = get_media_etag(name, stat_result)
+    last_modified = int(stat_result.st_mtime)
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        sendfile_header = getattr(settings, "MEDIA_SENDFILE_HEADER", None)
+        byte_range = parse_range_header(request.headers.get("Range"), size) if request.method == "GET" else None
+        if byte_range is not None and not _is_range_current(request, etag, last_modified):
+            byte_range = None
+        if sendfile_header:
+            response = HttpResponse(content_type=content_type)
+            if sendfile_header.lower() == "x-accel-redirect":
+                response[sendfile_header] = f"{settings.MEDIA_ACCEL_REDIRECT_LOCATION.rstrip('/')}/{quote(name)}"
+            else:
+                response[sendfile_header] = path
+        elif byte_range == ():
+            response = HttpResponse(status=416, content_type=content_type)
+            response["Content-Range"] = f"bytes */{size}"
+        elif byte_range:
+            first, last = byte_range
+            response = StreamingHttpResponse(
+                iterate_file_range(open(path, "rb"), first, last), status=206, content_type=content_type
+            )
+            response["Content-Length"] = last - first + 1
+            response["Content-Range"] = f"bytes {first}-{last}/{size}"
+        else:
+            response = FileResponse(open(path, "rb"), content_type=content_type)
+            response["Content-Length"] = size
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = (
+        IMMUTABLE_CACHE_CONTROL if CONTENT_ADDRESSED_NAME.match(name) else REVALIDATE_CACHE_CONTROL
+    )
+    response["Content-Security-Policy"] = MEDIA_CONTENT_SECURITY_POLICY
+    return response
@@ -0,0 +1,18 @@
+from django.utils.cache import patch_vary_headers
+
+
+class AcceptVaryMiddleware(object):
+    """
+    Adds `Vary: Accept` to responses whose content was negotiated by the `Accept` header, e.g. pages rendering
+    image renditions in the best accepted format (see `utils.templatetags.image_variants`), so shared caches keep
+    one copy per format.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if getattr(request, "vary_on_accept", False):
+            patch_vary_headers(response, ("Accept",))
+        return response
@@ -6,7 +6,8 @@ from django.urls import reverse
 from django.http import HttpResponseRedirect, Http404
 from django.core.exceptions import ImproperlyConfigured
 from django.contrib import messages
-from utils.helpers import now
+from utils.helpers import now, bulk_delete
+from utils.file_metadata import METADATA_FIELD_SUFFIX
 
 
 """
@@ -81,8 +82,13 @@ class ContextMixinView(ContextMixin):
                 if field.name in getattr(self, "display_fields", [])
             ]
             if hasattr(self, "display_fields")
-            else self.model._meta.get_fields(),
+            else [
+                # file metadata is shown through its file (see `utils.file_metadata`)
+                field for field in self.model._meta.get_fields() if not field.name.endswith(METADATA_FIELD_SUFFIX)
+            ],
             "action": self.action if self.action else None,
+            # section key of the live form validation endpoint
+            "validation_section": getattr(self, "validation_section", None),
             # head & page title
             "head_title": display_name,
             "page_title": display_name,
@@ -220,6 +226,9 @@ class CustomViewSetMixin(UpdateView, ListView, TemplateView, ContextMixinView):
             pass
 
         form = self.get_form()
+        # uploads rejected while they were received (see `utils.upload_handlers.UploadValidationHandler`)
+        for field, message in getattr(request, "upload_errors", {}).items():
+            form.add_error(field if field in form.fields else None, message)
 
         # assign object_list
         self.object_list = self.get_queryset()
@@ -248,6 +257,30 @@ class CustomViewSetMixin(UpdateView, ListView, TemplateView, ContextMixinView):
             messages.add_message(self.request, messages.ERROR, self.get_error_message())
         return HttpResponseRedirect(success_url)
 
+    def bulk_delete(self, request, *args, **kwargs):
+        """
+        Deletes the selected objects (`selected` values of `lookup_field`, limited to `get_queryset()`) with one
+        DELETE per model and then redirects to the success URL. Their files are removed after commit.
+        """
+        success_url = self.get_success_url()
+        selected = request.POST.getlist("selected")
+        if not selected:
+            messages.add_message(self.request, messages.ERROR, _("No items selected!"))
+            return HttpResponseRedirect(success_url)
+        try:
+            deleted, deleted_per_model = bulk_delete(
+                self.get_queryset().filter(**{f"{self.lookup_field}__in": selected})
+            )
+            count = deleted_per_model.get(self.model._meta.label, 0)
+            messages.add_message(
+                self.request, messages.SUCCESS,
+                _(f"{count} {getattr(self.model._meta, 'verbose_name_plural', self.model.__name__).title()} "
+                  f"Deleted Successfully")
+            )
+        except Exception:
+            messages.add_message(self.request, messages.ERROR, self.get_error_message())
+        return HttpResponseRedirect(success_url)
+
     def form_valid(self, form):
         try:
             if form.is_valid():
@@ -0,0 +1,26 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+""" *************** Content Blob *************** """
+
+
+class ContentBlob(models.Model):
+    """
+    Reference count of content addressed media files (see `utils.storages.ContentAddressedStorage`).
+    Details: Counted up with `F()` when a row is given the content (in its transaction, before the file is written)
+    and down when the reference is released. The files of the content are only deleted together with the row of a
+    zero count, so a concurrent save of the same content either keeps the files or writes them again.
+    """
+    # sha256 hex digest of the content
+    digest = models.CharField(max_length=64, unique=True)
+    references = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'content_blob'
+        verbose_name = _('Content Blob')
+        verbose_name_plural = _('Content Blobs')
+
+    def __str__(self):
+        return f"{self.digest} ({self.references})"
@@ -0,0 +1,10 @@
+from django.dispatch import Signal
+
+
+# Sent by `BulkInsertManagerMixin.bulk_insert()` after every inserted batch (`bulk_create` sends no post_save).
+# Provides `instances` (list of inserted objects) and `using` (database alias).
+post_bulk_insert = Signal()
+
+# Sent by `bulk_delete()` for every model it deleted rows from (row deletes send no post_delete).
+# Provides `instances` (deleted objects with only their primary key, foreign keys and files loaded) and `using`.
+post_bulk_delete = Signal()
@@ -1,9 +1,10 @@
+import os
 import random
 import string
 import time
 from django.utils.text import slugify
 from urllib.parse import urlparse
-from django.db import models
+from django.db import IntegrityError, connections, models, router, transaction
 from django.dispatch import receiver
 import uuid
 
@@ -72,9 +73,53 @@ def simple_random_string_with_timestamp(size=None):
     return bindings
 
 
+CROCKFORD_BASE32_ALPHABET = "0123456789abcdefghjkmnpqrstvwxyz"
+
+# number of times a save is retried with a regenerated slug when the slug hits the unique constraint
+SLUG_COLLISION_RETRIES = 3
+
+
+def time_ordered_uuid():
+    """[Generates a time ordered UUID (version 7 layout)]
+
+    The first 48 bits hold the unix timestamp in milliseconds and the remaining bits are random,
+    so values generated later sort after earlier ones (keeps unique slug indexes append-mostly)
+    while two values generated in the same millisecond still differ in 74 random bits.
+
+    Returns:
+        [uuid.UUID]: [Generated UUID]
+    """
+    timestamp_ms = time.time_ns() // 1000000
+    value = (timestamp_ms & 0xFFFFFFFFFFFF) << 80 | int.from_bytes(os.urandom(10), "big")
+    # version 7
+    value = (value & ~(0xF << 76)) | (0x7 << 76)
+    # RFC 4122 variant
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)
+    return uuid.UUID(int=value)
+
+
+def compact_uuid(value=None):
+    """[Encodes a UUID as a 26 character lowercase Crockford base32 string]
+
+    Args:
+        value ([uuid.UUID], optional): [UUID to encode]. Defaults to a new `time_ordered_uuid()`.
+
+    Returns:
+        [str]: [Encoded (slug safe and sortable) string]
+    """
+    number = (value or time_ordered_uuid()).int
+    characters = []
+    for _ in range(26):
+        number, remainder = divmod(number, 32)
+        characters.append(CROCKFORD_BASE32_ALPHABET[remainder])
+    return "".join(reversed(characters))
+
+
 def unique_slug_generator(instance, field=None, new_slug=None):
     """[Generates unique slug]
 
+    The slug gets a compact time ordered suffix, so it is unique without querying the database.
+
     Args:
         instance ([Model Class instance]): [Django Model class object instance].
         field ([Django Model Field], optional): [Django Model Class Field]. Defaults to None.
@@ -83,22 +128,11 @@ def unique_slug_generator(instance, field=None, new_slug=None):
     Returns:
         [str]: [Generated unique slug]
     """
+    if new_slug is not None:
+        return new_slug
     if field is None:
         field = instance.title
-    if new_slug is not None:
-        slug = new_slug
-    else:
-        slug = slugify(field[:50])
-
-    Klass = instance.__class__
-    qs_exists = Klass.objects.filter(slug=slug).exists()
-    if qs_exists:
-        new_slug = "{slug}-{randstr}".format(
-            slug=slug,
-            randstr=random_string_generator(size=4)
-        )
-        return unique_slug_generator(instance, new_slug=new_slug)
-    return slug
+    return "{slug}-{suffix}".format(slug=slugify(field[:50]), suffix=compact_uuid())
 
 
 def url_check(url):
@@ -121,43 +155,137 @@ def url_check(url):
         return False
 
 
-def autoslugWithFieldAndUUID(fieldname):
-    """[Generates auto slug integrating model's field value and UUID]
+def get_slug_constraint_names(model, using):
+    """ Names of the unique constraints (and unique indexes) covering only the `slug` column of a model's table """
+    connection = connections[using]
+    column = model._meta.get_field("slug").column
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return {
+        name for name, constraint in constraints.items() if constraint["unique"] and constraint["columns"] == [column]
+    }
+
+
+def is_slug_collision(error, model, using):
+    """[Checks if an `IntegrityError` was raised by the unique `slug` constraint of a model]
+
+    PostgreSQL reports the violated constraint by name, SQLite reports the table and columns of a unique constraint.
+    Other errors (e.g. NOT NULL or other unique columns) are no collisions, neither is anything on other backends.
 
     Args:
-        fieldname ([str]): [Model field name to use to generate slug]
+        error ([IntegrityError]): [raised error]
+        model ([Model Class]): [Django Model class with a `slug` field]
+        using ([str]): [database alias of the failed save]
+
+    Returns:
+        [bool]: [True if the generated slug collided]
+    """
+    vendor = connections[using].vendor
+    if vendor == "sqlite":
+        column = model._meta.get_field("slug").column
+        return str(error) == f"UNIQUE constraint failed: {model._meta.db_table}.{column}"
+    if vendor == "postgresql":
+        constraint_name = getattr(getattr(error.__cause__, "diag", None), "constraint_name", None)
+        return constraint_name is not None and constraint_name in get_slug_constraint_names(model, using)
+    return False
+
+
+def retry_save_on_slug_collision(model, generate_slug, savepoint=False):
+    """[Wraps `model.save()` to regenerate the slug and retry when an insert hits the unique slug constraint]
+
+    Slugs are generated without checking the database, so a (rare) collision is handled here instead.
+    Outside of a transaction the failed INSERT has already been rolled back and the save is simply repeated.
+    Inside of a transaction a savepoint is required to recover, which costs extra round trips, so it is only
+    used when `savepoint` is True (for slugs that are likely to collide).
+
+    Args:
+        model ([Model Class]): [Django Model class with a `slug` field]
+        generate_slug ([callable]): [Takes an instance and returns a new slug]
+        savepoint (bool, optional): [Use a savepoint to retry inside of transactions]. Defaults to False.
+    """
+    original_save = model.save
+
+    def save(self, *args, **kwargs):
+        # only inserts with a generated slug are retried
+        if self.pk is not None or (self.slug and not getattr(self, "_slug_generated", False)):
+            return original_save(self, *args, **kwargs)
+
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        in_transaction = transaction.get_connection(using).in_atomic_block
+        if in_transaction and not savepoint:
+            return original_save(self, *args, **kwargs)
+
+        for attempt in range(SLUG_COLLISION_RETRIES + 1):
+            try:
+                if in_transaction:
+                    with transaction.atomic(using=using):
+                        return original_save(self, *args, **kwargs)
+                return original_save(self, *args, **kwargs)
+            except IntegrityError as error:
+                if attempt == SLUG_COLLISION_RETRIES or not is_slug_collision(error, type(self), using):
+                    raise
+                self.pk = None
+                self._state.adding = True
+                self.slug = generate_slug(self)
+
+    model.save = save
+
+
+def autoslug(generate_slug, savepoint=False):
+    """[Generates auto slug with `generate_slug` on pre_save (when the instance has no slug yet)]
+
+    The slug generator is attached to the model as `model.generate_slug` so that it can also be applied
+    in memory (e.g. before `bulk_create`).
+
+    Args:
+        generate_slug ([callable]): [Takes an instance and returns a slug]
+        savepoint (bool, optional): [See `retry_save_on_slug_collision`]. Defaults to False.
     """
 
     def decorator(model):
-        # some sanity checks first
-        assert hasattr(model, fieldname), f"Model has no field {fieldname}"
         assert hasattr(model, "slug"), "Model is missing a slug field"
 
+        def generate(instance):
+            try:
+                return generate_slug(instance)
+            except Exception:
+                return simple_random_string()
+
         @receiver(models.signals.pre_save, sender=model, weak=False)
-        def generate_slug(sender, instance, *args, raw=False, **kwargs):
+        def generate_slug_on_pre_save(sender, instance, *args, raw=False, **kwargs):
             if not raw and not instance.slug:
-                source = getattr(instance, fieldname)
-                try:
-                    slug = slugify(source[:23]) + "-" + str(uuid.uuid4())
-                    Klass = instance.__class__
-                    qs_exists = Klass.objects.filter(slug=slug).exists()
-                    if qs_exists:
-                        new_slug = "{slug}-{randstr}".format(
-                            slug=slug,
-                            randstr=random_string_generator(size=4)
-                        )
-                        instance.slug = new_slug
-                    else:
-                        instance.slug = slug
-                except Exception:
-                    instance.slug = simple_random_string()
+                instance.slug = generate(instance)
+                instance._slug_generated = True
+
+        model.generate_slug = staticmethod(generate)
+        retry_save_on_slug_collision(model, generate, savepoint=savepoint)
         return model
     return decorator
 
 
+def autoslugWithFieldAndUUID(fieldname):
+    """[Generates auto slug integrating model's field value and a time ordered UUID]
+
+    Args:
+        fieldname ([str]): [Model field name to use to generate slug]
+    """
+
+    def decorator(model):
+        # some sanity checks first
+        assert hasattr(model, fieldname), f"Model has no field {fieldname}"
+
+        def generate_slug(instance):
+            return slugify(getattr(instance, fieldname)[:23]) + "-" + str(time_ordered_uuid())
+
+        return autoslug(generate_slug)(model)
+    return decorator
+
+
 def autoslugFromField(fieldname):
     """[Generates auto slug from model's field value]
 
+    A colliding slug gets a compact time ordered suffix on retry.
+
     Args:
         fieldname ([str]): [Model field name to use to generate slug]
     """
@@ -165,49 +293,79 @@ def autoslugFromField(fieldname):
     def decorator(model):
         # some sanity checks first
         assert hasattr(model, fieldname), f"Model has no field {fieldname!r}"
-        assert hasattr(model, "slug"), "Model is missing a slug field"
 
-        @receiver(models.signals.pre_save, sender=model, weak=False)
-        def generate_slug(sender, instance, *args, raw=False, **kwargs):
-            if not raw and not instance.slug:
-                source = getattr(instance, fieldname)
-                try:
-                    slug = slugify(source)
-                    Klass = instance.__class__
-                    qs_exists = Klass.objects.filter(slug=slug).exists()
-                    if qs_exists:
-                        new_slug = "{slug}-{randstr}".format(
-                            slug=slug,
-                            randstr=random_string_generator(size=4)
-                        )
-                        instance.slug = new_slug
-                    else:
-                        instance.slug = slug
-                except Exception:
-                    instance.slug = simple_random_string()
-        return model
+        def generate_slug(instance):
+            slug = slugify(getattr(instance, fieldname))
+            if getattr(instance, "_slug_generated", False):
+                # retry after a collision
+                return "{slug}-{suffix}".format(slug=slug[:200], suffix=compact_uuid())
+            return slug
+
+        return autoslug(generate_slug, savepoint=True)(model)
     return decorator
 
 
 def autoslugFromUUID():
-    """[Generates auto slug using UUID]
+    """[Generates auto slug using a time ordered UUID]
     """
 
     def decorator(model):
-        assert hasattr(model, "slug"), "Model is missing a slug field"
+        def generate_slug(instance):
+            return str(time_ordered_uuid())
 
-        @receiver(models.signals.pre_save, sender=model, weak=False)
-        def generate_slug(sender, instance, *args, raw=False, **kwargs):
-            if not raw and not instance.slug:
-                try:
-                    instance.slug = str(uuid.uuid4())
-                except Exception:
-                    instance.slug = simple_random_string()
-        return model
+        return autoslug(generate_slug)(model)
     return decorator
 
 
-def generate_unique_username_from_email(instance, is_exists=False):
+# number of email prefixes looked up with a single query when allocating usernames in batch
+USERNAME_PREFIX_QUERY_SIZE = 500
+
+
+def get_username_prefix(email):
+    """[Returns the username prefix (local part of the email) used to generate a username]
+
+    Raises:
+        ValueError: [If found invalid email]
+    """
+    if not email:
+        raise ValueError("Invalid email!")
+    return email.split("@")[0][:15]
+
+
+class UsernameAllocator(object):
+    """
+    Allocates unique usernames in memory.
+    All existing usernames sharing the requested prefixes are fetched once (indexed `LIKE 'prefix%'` queries),
+    then every allocation picks the first free candidate out of `prefix`, `prefix_1`, `prefix_2`, ...
+    actions: allocate(prefix)
+    """
+
+    def __init__(self, model, prefixes):
+        self.taken = set()
+        # continue scanning numbered candidates where the last allocation of a prefix stopped
+        self.next_suffix = {}
+        prefixes = sorted(set(prefixes))
+        for start in range(0, len(prefixes), USERNAME_PREFIX_QUERY_SIZE):
+            query = models.Q()
+            for prefix in prefixes[start:start + USERNAME_PREFIX_QUERY_SIZE]:
+                query |= models.Q(username__startswith=prefix)
+            self.taken.update(
+                model._base_manager.filter(query).values_list("username", flat=True).iterator()
+            )
+
+    def allocate(self, prefix):
+        username = prefix
+        if username in self.taken:
+            suffix = self.next_suffix.get(prefix, 1)
+            while f"{prefix}_{suffix}" in self.taken:
+                suffix += 1
+            self.next_suffix[prefix] = suffix + 1
+            username = f"{prefix}_{suffix}"
+        self.taken.add(username)
+        return username
+
+
+def generate_unique_username_from_email(instance):
     """[Generates unique username from email]
 
     Args:
@@ -219,24 +377,26 @@ def generate_unique_username_from_email(instance, is_exists=False):
     Returns:
         [str]: [unique username]
     """
+    prefix = get_username_prefix(instance.email)
+    return UsernameAllocator(instance.__class__, [prefix]).allocate(prefix)
 
-    # get email from instance
-    email = instance.email
-
-    if not email:
-        raise ValueError("Invalid email!")
-
-    def generate_username(email):
-        username = email.split("@")[0][:15]
-        return username + "_" + simple_random_string_with_timestamp(size=5) if is_exists else username
 
-    generated_username = generate_username(email=email)
+def generate_unique_usernames_from_emails(instances):
+    """[Assigns unique usernames generated from emails to many instances at once]
 
-    Klass = instance.__class__
-    qs_exists = Klass.objects.filter(username=generated_username).exists()
+    Args:
+        instances ([list]): [model class object instances]
 
-    if qs_exists:
-        # recursive call with is_exists=True
-        generate_unique_username_from_email(instance=instance, is_exists=True)
+    Raises:
+        ValueError: [If found invalid email]
 
-    return generated_username
+    Returns:
+        [list]: [instances with assigned usernames]
+    """
+    if not instances:
+        return instances
+    prefixes = [get_username_prefix(instance.email) for instance in instances]
+    allocator = UsernameAllocator(instances[0].__class__, prefixes)
+    for instance, prefix in zip(instances, prefixes):
+        instance.username = allocator.allocate(prefix)
+    return instances
@@ -0,0 +1,218 @@
+import collections
+import functools
+import hashlib
+import os
+import re
+import uuid
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from utils.helpers import now
+from utils.image_variants import get_image_variant_names
+from utils.models import ContentBlob
+
+
+# content addressed files are stored as `<root>/<first 2 hex digits>/<sha256><ext>`, files derived from them
+# (e.g. image renditions) as `<root>/<first 2 hex digits>/<sha256>-<suffix>`
+CONTENT_ADDRESSED_MEDIA_ROOT = getattr(settings, "CONTENT_ADDRESSED_MEDIA_ROOT", "blobs")
+CONTENT_ADDRESSED_NAME = re.compile(
+    rf"^{re.escape(CONTENT_ADDRESSED_MEDIA_ROOT)}/[0-9a-f]{{2}}/"
+    r"(?P<hash>[0-9a-f]{64})(?P<derived>-[^/]+)?(\.[^/.]+)?$"
+)
+
+
+def get_content_hash(file):
+    """[Returns the sha256 hex digest of a file's content]
+
+    Uploads hashed by `utils.upload_handlers` are not read again, other files are hashed chunk by chunk.
+
+    Args:
+        file ([File]): [file to hash]
+
+    Returns:
+        [str]: [sha256 hex digest]
+    """
+    content_hash = getattr(file, "content_hash", None)
+    if content_hash:
+        return content_hash
+    hasher = hashlib.sha256()
+    if hasattr(file, "seek"):
+        file.seek(0)
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    if hasattr(file, "seek"):
+        file.seek(0)
+    file.content_hash = hasher.hexdigest()
+    return file.content_hash
+
+
+def get_content_addressed_name(field_file, filename):
+    """[Names a newly assigned file by its content, for the `upload_to` functions of the media fields]
+
+    The new reference to the content is counted (see `add_content_references()`).
+
+    Args:
+        field_file ([FieldFile]): [field file being saved, its `file` is the new content]
+        filename ([str]): [original file name (only its extension is kept)]
+
+    Returns:
+        [str]: [`<root>/<first 2 hex digits>/<sha256><ext>`]
+    """
+    content_hash = get_content_hash(field_file.file)
+    ext = os.path.splitext(filename)[1].lower()
+    name = f"{CONTENT_ADDRESSED_MEDIA_ROOT}/{content_hash[:2]}/{content_hash}{ext}"
+    # counted before the file is written, in the transaction of the row
+    add_content_references([name])
+    return name
+
+
+def content_addressed(field_name):
+    """[Decorates the `upload_to` function of a file field to name files by content (see
+    `get_content_addressed_name()`) while `CONTENT_ADDRESSED_MEDIA` is enabled]
+
+    Args:
+        field_name ([str]): [name of the file field using the `upload_to` function]
+
+    Returns:
+        [function]: [decorator]
+    """
+    def decorator(upload_to):
+        @functools.wraps(upload_to)
+        def wrapper(instance, filename):
+            if settings.CONTENT_ADDRESSED_MEDIA:
+                return get_content_addressed_name(getattr(instance, field_name), filename)
+            return upload_to(instance, filename)
+        return wrapper
+    return decorator
+
+
+def is_content_addressed(name):
+    return bool(name) and CONTENT_ADDRESSED_NAME.match(name) is not None
+
+
+def get_file_fields():
+    """ (model, field) of every file and image field of every installed model """
+    return [
+        (model, field) for model in apps.get_models()
+        for field in model._meta.concrete_fields if isinstance(field, models.FileField)
+    ]
+
+
+def get_content_digest(name):
+    """ sha256 hex digest of a content addressed name (renditions included), None for other names """
+    match = CONTENT_ADDRESSED_NAME.match(name) if name else None
+    return match.group("hash") if match is not None else None
+
+
+def add_content_references(names):
+    """[Counts references to content addressed files up, in the current transaction]
+
+    Called when rows are given content addressed names: new content by `get_content_addressed_name()` (before the
+    file is written), existing files by writers assigning names directly (imports, seed loads). Other names are
+    skipped.
+
+    Args:
+        names ([iterable]): [stored names, one per referencing row and field]
+    """
+    references = collections.Counter(digest for digest in map(get_content_digest, names) if digest)
+    for digest, count in references.items():
+        blobs = ContentBlob.objects.filter(digest=digest)
+        values = {"references": F("references") + count, "updated_at": now()}
+        if blobs.update(**values):
+            continue
+        try:
+            with transaction.atomic():
+                ContentBlob.objects.create(digest=digest, references=count)
+        except IntegrityError:
+            # created by a concurrent transaction
+            blobs.update(**values)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage for media files named by content (see `get_content_addressed_name()`).
+    Such names are never probed for an available name. Saving a name that already exists writes nothing
+    (identical uploads share one file), new content is moved in place atomically. Deleting a file releases one
+    reference (see `utils.models.ContentBlob`), the content and its renditions are removed with the last one.
+    Other names behave exactly like `FileSystemStorage`.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        if is_content_addressed(name):
+            return name
+        return super().get_available_name(name, max_length=max_length)
+
+    def _save(self, name, content):
+        if not is_content_addressed(name):
+            return super()._save(name, content)
+        # the reference was counted before, a concurrent delete of the last other reference either removed the
+        # file already (it is written again) or keeps it
+        if self.exists(name):
+            return name
+        # written under a unique name and moved in place: concurrent writes of the same content do not collide
+        # and a blob is never seen half written
+        temporary_name = super()._save(f"{name}.{uuid.uuid4().hex}.part", content)
+        os.replace(self.path(temporary_name), self.path(name))
+        return name
+
+    def delete(self, name):
+        if not is_content_addressed(name):
+            return super().delete(name)
+        if CONTENT_ADDRESSED_NAME.match(name).group("derived") is not None:
+            # renditions are removed with their content
+            return
+        with transaction.atomic():
+            blobs = ContentBlob.objects.filter(digest=get_content_digest(name))
+            if not blobs.update(references=F("references") - 1, updated_at=now()):
+                # stored before references were counted (or never counted), `gc_media` removes it once unreferenced
+                return
+            # the row stays locked until the files are gone, a concurrent save of the content waits for it
+            if not blobs.filter(references__lte=0).delete()[0]:
+                return
+            super().delete(name)
+            for variant in get_image_variant_names(name):
+                super().delete(variant)
+
+    def delete_uncommitted(self, name):
+        """[Deletes a file stored for rows whose insert failed, after its transaction rolled back]
+
+        The reference counted for the file rolled back with the rows, so `delete()` would release a reference of
+        another row. A content addressed file is only deleted if no committed row counts its content (the blob was
+        created by the failed insert), inside a still open transaction the rolled back counts are not visible yet
+        and the file is left to `gc_media`.
+
+        Args:
+            name ([str]): [stored name]
+        """
+        if not is_content_addressed(name):
+            return super().delete(name)
+        if transaction.get_connection().in_atomic_block:
+            return
+        with transaction.atomic():
+            if ContentBlob.objects.select_for_update().filter(digest=get_content_digest(name)).exists():
+                return
+            super().delete(name)
+            for variant in get_image_variant_names(name):
+                super().delete(variant)
+
+    def delete_unreferenced(self, name, older_than):
+        """[Deletes a file no row references anymore (found by `gc_media`)]
+
+        A content addressed file goes with its blob row, unless the content was counted since `older_than`
+        (a save of the same content may be running). Files stored before references were counted have no row.
+
+        Args:
+            name ([str]): [stored name]
+            older_than ([datetime]): [blob rows updated later are kept]
+        """
+        match = CONTENT_ADDRESSED_NAME.match(name)
+        if match is None or match.group("derived") is not None:
+            return super().delete(name)
+        with transaction.atomic():
+            blobs = ContentBlob.objects.filter(digest=match.group("hash"))
+            blobs.filter(updated_at__lt=older_than).delete()
+            if blobs.exists():
+                return
+            super().delete(name)
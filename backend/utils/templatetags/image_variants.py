@@ -0,0 +1,67 @@
+import functools
+import os
+from django import template
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html
+from utils.image_variants import (
+    get_accepted_image_format, get_document_preview_name, get_image_srcset, get_image_variant_url
+)
+
+register = template.Library()
+
+
+def _get_image_format(context):
+    """ Preferred transcoded format the requesting client accepts (None without a request) """
+    request = context.get("request")
+    if request is None:
+        return None
+    # the response depends on the `Accept` header now (see `utils.middleware.AcceptVaryMiddleware`)
+    request.vary_on_accept = True
+    return get_accepted_image_format(request.headers.get("Accept"))
+
+
+@register.simple_tag(takes_context=True)
+def srcset(context, image):
+    """ `srcset` of the renditions of an image in the best accepted format, e.g. `{% srcset object.image %}` """
+    return get_image_srcset(image, _get_image_format(context))
+
+
+@register.simple_tag(takes_context=True)
+def image_variant(context, image, width):
+    """ URL of the smallest rendition of an image at least `width` pixels wide in the best accepted format """
+    return get_image_variant_url(image, int(width), _get_image_format(context))
+
+
+@functools.lru_cache(maxsize=None)
+def _static_exists(path):
+    return bool(finders.find(path)) or staticfiles_storage.exists(path)
+
+
+@register.simple_tag(takes_context=True)
+def static_image(context, path):
+    """ `{% static %}` URL of an image, of its transcoded copy (see `transcode_static_images`) if one is accepted """
+    image_format = _get_image_format(context)
+    if image_format:
+        transcoded = f"{os.path.splitext(path)[0]}.{image_format}"
+        if _static_exists(transcoded):
+            return static(transcoded)
+    return static(path)
+
+
+@register.simple_tag
+def image_attributes(metadata):
+    """ `width`, `height` and placeholder color of an `<img>` from stored metadata (see `utils.file_metadata`) """
+    if not metadata or not metadata.get("width"):
+        return ""
+    attributes = format_html('width="{}" height="{}"', metadata["width"], metadata["height"])
+    if metadata.get("color"):
+        attributes += format_html(' style="background-color: {}"', metadata["color"])
+    return attributes
+
+
+@register.simple_tag
+def document_preview(document):
+    """ URL of the first page preview of a document (see `utils.document_previews`) """
+    return document.storage.url(get_document_preview_name(document.name)) if document else ""
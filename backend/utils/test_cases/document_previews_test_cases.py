@@ -0,0 +1,96 @@
+import datetime
+import io
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+from portfolios.models import Project, ProjectMedia
+from users.factories.user_factory import UserFactory
+from utils.document_previews import generate_document_preview
+from utils.helpers import bulk_delete
+from utils.image_variants import get_document_preview_name
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def get_pdf(size=(300, 400)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (30, 60, 200)).save(buffer, "PDF")
+    return buffer.getvalue()
+
+
+def render_pdf_page(content, width):
+    # pages as rendered by pdftoppm
+    return Image.new("RGB", (width, width * 4 // 3), (30, 60, 200))
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    FILE_CLEANUP_IN_BACKGROUND=False, DOCUMENT_PREVIEWS_IN_BACKGROUND=False, MEDIA_ROOT=MEDIA_ROOT
+)
+class DocumentPreviewTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = Project.objects.create(
+            user=UserFactory(), title="Project", short_description="Project", start_date=datetime.date(2020, 1, 1)
+        )
+
+    def create_media(self, *names):
+        with self.captureOnCommitCallbacks(execute=True):
+            media = ProjectMedia.objects.bulk_insert(
+                ProjectMedia(project=self.project, file=ContentFile(get_pdf(), name=name)) for name in names
+            )
+        return list(ProjectMedia.objects.filter(pk__in=[obj.pk for obj in media]))
+
+    @mock.patch("utils.document_previews.render_pdf_page", side_effect=render_pdf_page)
+    def test_previews_are_rendered_after_upload(self, render):
+        media, = self.create_media("transcript.pdf")
+        self.assertEqual(media.file_metadata["preview"], {"width": 256, "height": 341, "color": "#1e3cc8"})
+        name = get_document_preview_name(media.file.name)
+        self.assertTrue(default_storage.exists(name))
+
+        html = Template(
+            "{% load image_variants %}<img src=\"{% document_preview media.file %}\" "
+            "{% image_attributes media.file_metadata.preview %}>"
+        ).render(Context({"media": media}))
+        self.assertIn(default_storage.url(name), html)
+        self.assertIn('width="256" height="341"', html)
+
+        # deleted with the document
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_delete(ProjectMedia.objects.filter(pk=media.pk))
+        self.assertFalse(default_storage.exists(name))
+
+    @mock.patch("utils.document_previews.render_pdf_page", side_effect=render_pdf_page)
+    def test_missing_previews_are_backfilled(self, render):
+        with mock.patch("utils.document_previews.PDFTOPPM", None), \
+                mock.patch("utils.document_previews.render_pdf_page", return_value=None):
+            media, = self.create_media("transcript.pdf")
+        self.assertNotIn("preview", media.file_metadata)
+        with mock.patch("utils.management.commands.generate_document_previews.PDFTOPPM", "pdftoppm"):
+            call_command("generate_document_previews", stdout=io.StringIO())
+        media.refresh_from_db()
+        self.assertEqual(media.file_metadata["preview"]["width"], 256)
+        default_storage.delete(get_document_preview_name(media.file.name))
+
+    @unittest.skipUnless(shutil.which("pdftoppm"), "pdftoppm (poppler-utils) is not installed")
+    def test_first_pages_are_rendered(self):
+        media = ProjectMedia(project=self.project, file=ContentFile(get_pdf(), name="transcript.pdf"))
+        media.file.save(media.file.name, media.file.file, save=False)
+        preview = generate_document_preview(media.file)
+        self.assertEqual(preview["width"], 256)
+        self.assertEqual(preview["height"], 341)
+        default_storage.delete(get_document_preview_name(media.file.name))
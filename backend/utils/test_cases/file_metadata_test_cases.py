@@ -0,0 +1,94 @@
+import datetime
+import io
+import shutil
+import tempfile
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+from portfolios.factories.skill_factory import SkillFactory
+from portfolios.models import Project, ProjectMedia, Skill
+from portfolios.snapshots import decode_snapshot, publish_portfolio
+from users.factories.user_factory import UserFactory
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def get_image(size=(120, 80), color=(200, 30, 30), image_format="PNG"):
+    buffer = io.BytesIO()
+    image = Image.new("RGB", size, color)
+    # a small patch of another color
+    image.paste((0, 0, 255), (0, 0, 10, 10))
+    image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}, FILE_CLEANUP_IN_BACKGROUND=False,
+    MEDIA_ROOT=MEDIA_ROOT
+)
+class FileMetadataTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.project = Project.objects.create(
+            user=cls.user, title="Project", short_description="Project", start_date=datetime.date(2020, 1, 1)
+        )
+
+    def create_skill(self, content, name="logo.png"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return SkillFactory(user=self.user, image=ContentFile(content, name=name))
+
+    def test_metadata_is_stored_on_upload(self):
+        content = get_image()
+        skill = self.create_skill(content)
+        # the metadata describes the optimised image (see `utils.image_optimization`)
+        self.assertEqual(skill.image_metadata, {
+            "size": skill.image.size, "original_size": len(content), "mime_type": "image/png", "width": 120,
+            "height": 80, "color": "#c81e1e"
+        })
+        skill = self.create_skill(
+            b'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 48 24.5"></svg>',
+            name="logo.svg"
+        )
+        self.assertEqual((skill.image_metadata["width"], skill.image_metadata["height"]), (48, 24))
+
+        # documents (and bulk inserted media) get their size and type
+        media = ProjectMedia.objects.bulk_insert([ProjectMedia(
+            project=self.project, file=ContentFile(b"%PDF-1.4 cv", name="cv.pdf")
+        )])[0]
+        self.assertEqual(ProjectMedia.objects.get(pk=media.pk).file_metadata, {
+            "size": 11, "mime_type": "application/pdf"
+        })
+
+        # removed images take their metadata with them
+        skill.image = None
+        skill.save()
+        self.assertEqual(skill.image_metadata, {})
+
+    def test_metadata_is_rendered_without_opening_files(self):
+        skill = self.create_skill(get_image())
+        skill = Skill.objects.get(pk=skill.pk)
+        html = Template("{% load image_variants %}<img {% image_attributes skill.image_metadata %}>").render(
+            Context({"skill": skill})
+        )
+        self.assertEqual(html, '<img width="120" height="80" style="background-color: #c81e1e">')
+
+        data = decode_snapshot(publish_portfolio(self.user, languages=["en"])["en"][0])
+        self.assertEqual(data["files"][skill.image.name]["width"], 120)
+
+    def test_missing_metadata_is_backfilled(self):
+        skill = self.create_skill(get_image(image_format="JPEG"), name="logo.jpg")
+        Skill.objects.filter(pk=skill.pk).update(image_metadata={})
+        call_command("update_file_metadata", stdout=io.StringIO())
+        skill.refresh_from_db()
+        self.assertEqual(skill.image_metadata["mime_type"], "image/jpeg")
+        self.assertEqual(skill.image_metadata["width"], 120)
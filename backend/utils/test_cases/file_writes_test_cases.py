@@ -0,0 +1,88 @@
+import datetime
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.test import TestCase, override_settings
+from portfolios.models import Project, ProjectMedia
+from users.factories.user_factory import UserFactory
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    FILE_CLEANUP_IN_BACKGROUND=False, MEDIA_ROOT=MEDIA_ROOT
+)
+class ConcurrentFileWriteTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = Project.objects.create(
+            user=UserFactory(), title="Project", short_description="Project", start_date=datetime.date(2020, 1, 1)
+        )
+
+    def setUp(self):
+        self.threads = set()
+        self._save = FileSystemStorage._save
+
+    def slow_save(self, storage, name, content):
+        # a slow storage backend
+        self.threads.add(threading.current_thread().name)
+        time.sleep(0.2)
+        if content.name == "broken.pdf":
+            raise OSError("Disk full")
+        return self._save(storage, name, content)
+
+    def get_media(self, *names):
+        return [ProjectMedia(project=self.project, file=ContentFile(f"%PDF {name}", name=name)) for name in names]
+
+    def test_files_are_written_concurrently(self):
+        started = time.monotonic()
+        with mock.patch.object(FileSystemStorage, "_save", autospec=True, side_effect=self.slow_save):
+            media = ProjectMedia.objects.bulk_insert(self.get_media(*[f"media-{i}.pdf" for i in range(5)]))
+        self.assertLess(time.monotonic() - started, 0.8)
+        self.assertGreater(len(self.threads), 1)
+        for obj in ProjectMedia.objects.filter(pk__in=[obj.pk for obj in media]):
+            self.assertTrue(default_storage.exists(obj.file.name))
+            self.assertEqual(obj.file_size, default_storage.size(obj.file.name))
+
+    def test_failed_writes_insert_nothing_and_leave_no_files(self):
+        media = self.get_media("first.pdf", "broken.pdf", "second.pdf")
+        stored = []
+
+        def save(storage, name, content):
+            stored.append(name)
+            return self.slow_save(storage, name, content)
+
+        with mock.patch.object(FileSystemStorage, "_save", autospec=True, side_effect=save):
+            with self.assertRaises(OSError), transaction.atomic():
+                ProjectMedia.objects.bulk_insert(media)
+        self.assertFalse(ProjectMedia.objects.exists())
+        self.assertEqual(len(stored), 3)
+        for name in stored:
+            self.assertFalse(default_storage.exists(name))
+
+    @override_settings(
+        CONTENT_ADDRESSED_MEDIA=True, DEFAULT_FILE_STORAGE="utils.storages.ContentAddressedStorage"
+    )
+    def test_identical_content_is_written_once(self):
+        media = ProjectMedia.objects.bulk_insert(
+            ProjectMedia(project=self.project, file=ContentFile(b"%PDF same", name=f"copy-{i}.pdf")) for i in range(4)
+        )
+        self.assertEqual(len({obj.file.name for obj in media}), 1)
+        with default_storage.open(media[0].file.name) as file:
+            self.assertEqual(file.read(), b"%PDF same")
+        self.assertEqual(default_storage.listdir(media[0].file.name.rsplit("/", 1)[0])[1], [
+            media[0].file.name.rsplit("/", 1)[1]
+        ])
@@ -0,0 +1,147 @@
+import datetime
+import shutil
+import tempfile
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from portfolios.factories.certification_factory import create_certifications_with_factory
+from portfolios.factories.project_factory import create_projects_with_factory
+from portfolios.factories.skill_factory import create_skills_with_factory
+from portfolios.models import Certification, Skill, Project, ProjectMedia
+from utils.helpers import bulk_delete
+from users.factories.user_factory import UserFactory
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BulkInsertManagerTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+
+    def test_bulk_insert_generates_slugs_with_one_query_per_batch(self):
+        skills = [Skill(user=self.user, title=f"Skill {index}") for index in range(25)]
+        with self.assertNumQueries(3):
+            Skill.objects.bulk_insert(skills, batch_size=10)
+        slugs = list(Skill.objects.filter(user=self.user).values_list("slug", flat=True))
+        self.assertEqual(len(slugs), 25)
+        self.assertEqual(len(set(slugs)), 25)
+        self.assertTrue(all(slug.startswith("skill-") for slug in slugs))
+
+    def test_bulk_insert_media_derives_order_and_file_size(self):
+        project = Project.objects.create(
+            user=self.user, title="Project", short_description="Project", start_date=datetime.date(2020, 1, 1)
+        )
+        ProjectMedia.objects.create(project=project, file=ContentFile(b"first", name="first.pdf"))
+        ProjectMedia.objects.bulk_insert(
+            ProjectMedia(project=project, file=ContentFile(b"x" * index, name=f"{index}.pdf")) for index in (1, 2)
+        )
+        self.assertEqual(
+            list(ProjectMedia.objects.filter(project=project).order_by("_order").values_list("_order", "file_size")),
+            [(0, 5), (1, 1), (2, 2)]
+        )
+
+    def test_bulk_insert_users_generates_unique_usernames(self):
+        users = [get_user_model()(email=f"info@Example{index}.com") for index in range(3)]
+        get_user_model().objects.bulk_insert(users)
+        usernames = list(
+            get_user_model().objects.filter(email__startswith="info@").values_list("username", "email")
+        )
+        self.assertEqual(len({username for username, email in usernames}), 3)
+        self.assertIn(("info", "info@example0.com"), usernames)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class BulkFactoryDataTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_bulk_mode_shares_owner_pool(self):
+        users_before = get_user_model().objects.count()
+        projects = create_projects_with_factory(
+            num_of_data=25, bulk=True, batch_size=10, owner_pool_size=2, quiet=True
+        )
+        self.assertEqual(len(projects), 25)
+        self.assertEqual(Project.objects.count(), 25)
+        self.assertEqual(get_user_model().objects.count() - users_before, 2)
+        self.assertLessEqual(Project.objects.values("user").distinct().count(), 2)
+        self.assertEqual(Project.objects.values("slug").distinct().count(), 25)
+
+    def test_bulk_mode_keeps_per_user_unique_fields_unique_across_batches(self):
+        # few owners and more rows than the faker has titles, (user, title) is unique
+        skills = create_skills_with_factory(num_of_data=60, bulk=True, batch_size=20, owner_pool_size=1, quiet=True)
+        self.assertEqual(len(skills), 60)
+        self.assertEqual(Skill.objects.values("user").distinct().count(), 1)
+        self.assertEqual(Skill.objects.values("title").distinct().count(), 60)
+
+    def test_bulk_mode_creates_certifications(self):
+        certifications = create_certifications_with_factory(num_of_data=3, bulk=True, quiet=True)
+        self.assertEqual(Certification.objects.filter(pk__in=[item.pk for item in certifications]).count(), 3)
+
+
+@override_settings(
+    FILE_CLEANUP_IN_BACKGROUND=False, CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    MEDIA_ROOT=MEDIA_ROOT
+)
+class BulkDeleteTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+
+    def _create_projects(self, count, user=None):
+        projects = Project.objects.bulk_insert(
+            Project(
+                user=user or self.user, title=f"Project {index}", short_description="Project",
+                start_date=datetime.date(2020, 1, 1)
+            )
+            for index in range(count)
+        )
+        media = ProjectMedia.objects.bulk_insert(
+            ProjectMedia(project=project, file=ContentFile(b"media", name="media.pdf")) for project in projects
+        )
+        return projects, [item.file.name for item in media]
+
+    def test_bulk_delete_uses_one_delete_per_model_and_removes_files_after_commit(self):
+        projects, files = self._create_projects(5)
+        with self.captureOnCommitCallbacks(execute=True):
+            # savepoint, select projects, select media, delete media, update the owner's storage counters,
+            # delete projects, release
+            with self.assertNumQueries(7):
+                deleted, deleted_per_model = bulk_delete(Project.objects.filter(user=self.user))
+            self.assertTrue(all(default_storage.exists(name) for name in files))
+        self.assertEqual((deleted, deleted_per_model["portfolios.Project"]), (10, 5))
+        self.assertFalse(ProjectMedia.objects.filter(project__user=self.user).exists())
+        self.assertFalse(any(default_storage.exists(name) for name in files))
+
+    def test_bulk_delete_view_only_deletes_own_selected_objects(self):
+        projects, files = self._create_projects(3)
+        other_projects, other_files = self._create_projects(1, user=UserFactory())
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("portfolios:project_bulk_delete"),
+                {"selected": [projects[0].slug, projects[1].slug, other_projects[0].slug]}
+            )
+        self.assertRedirects(response, reverse("portfolios:projects"), fetch_redirect_response=False)
+        self.assertEqual(list(Project.objects.filter(user=self.user)), [projects[2]])
+        self.assertTrue(Project.objects.filter(pk=other_projects[0].pk).exists())
+        self.assertEqual([default_storage.exists(name) for name in files + other_files], [False, False, True, True])
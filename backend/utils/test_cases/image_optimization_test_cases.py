@@ -0,0 +1,134 @@
+import io
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+from django import forms
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image, PngImagePlugin
+from portfolios.factories.skill_factory import SkillFactory
+from portfolios.models import Skill
+from utils.image_optimization import _get_jpeg_quality, optimize_image
+from utils.validators import MAX_IMAGE_DIMENSION, get_validated_image
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def get_photo(size=(600, 400), orientation=6, quality=100):
+    """ A noisy phone photo with camera metadata, rotated by its EXIF orientation """
+    image = Image.effect_noise(size, 60).convert("RGB")
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    exif[0x010f] = "Phone maker"
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}, FILE_CLEANUP_IN_BACKGROUND=False,
+    MEDIA_ROOT=MEDIA_ROOT
+)
+class ImageOptimizationTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def create_skill(self, content, name="photo.jpg"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return SkillFactory(image=ContentFile(content, name=name))
+
+    @mock.patch("utils.image_optimization.IMAGE_INGEST_MAX_DIMENSION", 300)
+    def test_uploads_are_stripped_rotated_scaled_and_recompressed(self):
+        content = get_photo()
+        skill = self.create_skill(content)
+        with skill.image.storage.open(skill.image.name) as file:
+            image = Image.open(file)
+            self.assertEqual(image.format, "JPEG")
+            self.assertNotIn("exif", image.info)
+            # rotated by the orientation, then scaled down
+            self.assertEqual(image.size, (200, 300))
+        self.assertLess(skill.image.size, len(content))
+        self.assertEqual(skill.image_metadata["original_size"], len(content))
+        self.assertEqual(skill.image_metadata["size"], skill.image.size)
+
+    def test_png_transparency_is_kept_and_text_stripped(self):
+        image = Image.new("RGBA", (40, 20), (255, 0, 0, 0))
+        text = PngImagePlugin.PngInfo()
+        text.add_text("Comment", "x" * 1000)
+        buffer = io.BytesIO()
+        image.save(buffer, "PNG", pnginfo=text)
+        optimized = optimize_image(ContentFile(buffer.getvalue()), "icon.png")
+        with Image.open(optimized) as result:
+            self.assertEqual(result.mode, "RGBA")
+            self.assertEqual(result.getpixel((0, 0))[3], 0)
+            self.assertFalse(result.text)
+        self.assertGreater(optimized.image_optimization["saved"], 1000)
+
+    def test_optimal_images_are_kept(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 64), (0, 128, 255)).save(buffer, "PNG", optimize=True)
+        self.assertIsNone(optimize_image(ContentFile(buffer.getvalue()), "small.png"))
+        optimized = optimize_image(ContentFile(get_photo((200, 100))), "photo.jpg")
+        self.assertIsNone(optimize_image(optimized, "photo.jpg"))
+        self.assertIsNone(optimize_image(ContentFile(b"<svg></svg>"), "icon.svg"))
+
+    def test_jpeg_metadata_is_stripped_losslessly(self):
+        content = get_photo((200, 100), orientation=1, quality=60)
+        optimized = optimize_image(ContentFile(content), "photo.jpg")
+        with Image.open(io.BytesIO(content)) as original, Image.open(optimized) as result:
+            self.assertNotIn("exif", result.info)
+            # the compressed image data is copied, not re-encoded
+            self.assertEqual(result.tobytes(), original.tobytes())
+            self.assertEqual(result.quantization, original.quantization)
+        self.assertLess(optimized.image_optimization["size"], len(content))
+
+    def test_jpeg_is_never_encoded_above_its_quality_or_grown(self):
+        content = get_photo((200, 100), quality=40)
+        optimized = optimize_image(ContentFile(content), "photo.jpg")
+        with Image.open(optimized) as result:
+            self.assertEqual(result.size, (100, 200))
+            self.assertLessEqual(_get_jpeg_quality(result), 40)
+        with mock.patch("utils.image_optimization._encode_jpeg", return_value=b"x" * (len(content) + 1)):
+            self.assertIsNone(optimize_image(ContentFile(content), "photo.jpg"))
+
+    def test_pathological_dimensions_are_rejected(self):
+        buffer = io.BytesIO()
+        Image.new("1", (MAX_IMAGE_DIMENSION + 1, 1)).save(buffer, "PNG")
+        with self.assertRaisesMessage(forms.ValidationError, f"{MAX_IMAGE_DIMENSION + 1} x 1 pixels"):
+            get_validated_image(SimpleUploadedFile("strip.png", buffer.getvalue(), content_type="image/png"))
+        self.assertIsNone(optimize_image(ContentFile(buffer.getvalue()), "strip.png"))
+        upload = SimpleUploadedFile("photo.jpg", get_photo((200, 100)), content_type="image/jpeg")
+        self.assertIs(get_validated_image(upload), upload)
+
+    def test_stored_images_are_optimised_by_the_command(self):
+        content = get_photo((800, 600))
+        skill = SkillFactory(image=None)
+        # stored before the optimisation existed
+        old_name = default_storage.save("skills/photo.jpg", ContentFile(content))
+        Skill.objects.filter(pk=skill.pk).update(image=old_name)
+        skill.refresh_from_db()
+        # a stored image is not re-optimised on later saves
+        skill.save()
+        self.assertEqual(skill.image.name, old_name)
+        with skill.image.storage.open(old_name) as file:
+            self.assertEqual(file.read(), content)
+
+        output = StringIO()
+        call_command("optimize_images", "--dry-run", stdout=output)
+        self.assertIn("1 optimisable", output.getvalue())
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("optimize_images", stdout=output)
+        self.assertIn("1 optimised", output.getvalue())
+        skill.refresh_from_db()
+        self.assertNotEqual(skill.image.name, old_name)
+        self.assertFalse(skill.image.storage.exists(old_name))
+        self.assertEqual(skill.image_metadata["original_size"], len(content))
+        self.assertEqual((skill.image_metadata["width"], skill.image_metadata["height"]), (600, 800))
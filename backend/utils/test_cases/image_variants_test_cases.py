@@ -0,0 +1,163 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+import factory
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from portfolios.factories.skill_factory import SkillFactory
+from portfolios.models import Skill
+from users.factories.user_factory import UserFactory
+from utils.helpers import bulk_delete
+from utils.image_variants import (
+    IMAGE_FORMAT_CONTENT_TYPES, IMAGE_VARIANT_FORMATS, IMAGE_VARIANT_WIDTHS, get_accepted_image_format,
+    get_image_variant_name, get_image_variant_names
+)
+from utils.templatetags.image_variants import _static_exists
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def get_image(width=600, height=300, image_format="JPEG"):
+    return factory.django.ImageField(width=width, height=height, format=image_format).evaluate(None, None, {})
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}, FILE_CLEANUP_IN_BACKGROUND=False,
+    IMAGE_VARIANTS_IN_BACKGROUND=False, MEDIA_ROOT=MEDIA_ROOT
+)
+class ImageVariantTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def create_skill(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            skill = SkillFactory(image=factory.django.ImageField(width=600, height=300, format="JPEG"), **kwargs)
+        # the renditions are recorded after the save
+        skill.refresh_from_db()
+        return skill
+
+    def assertVariantsExist(self, field_file, exist=True):
+        for name in get_image_variant_names(field_file.name):
+            self.assertEqual(field_file.storage.exists(name), exist)
+
+    def test_variants_are_rendered_on_upload(self):
+        skill = self.create_skill()
+        self.assertVariantsExist(skill.image)
+        storage = skill.image.storage
+        with storage.open(get_image_variant_name(skill.image.name, 64)) as file:
+            self.assertEqual(Image.open(file).size, (64, 32))
+        # never upscaled
+        with storage.open(get_image_variant_name(skill.image.name, max(IMAGE_VARIANT_WIDTHS))) as file:
+            self.assertEqual(Image.open(file).size[0], min(600, max(IMAGE_VARIANT_WIDTHS)))
+
+        self.assertEqual(skill.image_metadata["variants"], {
+            "widths": list(IMAGE_VARIANT_WIDTHS), "formats": list(IMAGE_VARIANT_FORMATS)
+        })
+        html = Template("{% load image_variants %}{% image_variant image 30 %} {% srcset image %}").render(
+            Context({"image": skill.image})
+        )
+        self.assertIn(storage.url(get_image_variant_name(skill.image.name, 64)), html)
+        self.assertIn(f"{storage.url(get_image_variant_name(skill.image.name, 128))} 128w", html)
+
+    def test_original_is_served_until_the_variants_are_recorded(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            user = UserFactory(image=get_image())
+            skill = SkillFactory(user=user, image=get_image())
+        template = Template("{% load image_variants %}{% image_variant image 64 %}|{% srcset image %}")
+        self.assertEqual(template.render(Context({"image": skill.image})), f"{skill.image.url}|")
+        self.assertEqual(user.get_user_image(), user.image.url)
+        for callback in callbacks:
+            callback()
+        skill.refresh_from_db()
+        user.refresh_from_db()
+        self.assertEqual(
+            template.render(Context({"image": skill.image})).split("|")[0],
+            skill.image.storage.url(get_image_variant_name(skill.image.name, 64))
+        )
+        self.assertEqual(user.get_user_image(), user.image.storage.url(get_image_variant_name(user.image.name, 64)))
+
+    def test_variants_of_bulk_inserted_rows_are_rendered(self):
+        user = UserFactory()
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.bulk_insert(Skill(user=user, title=f"Skill {index}", image=get_image()) for index in range(2))
+        for skill in Skill.objects.filter(user=user):
+            self.assertVariantsExist(skill.image)
+            self.assertIn("variants", skill.image_metadata)
+
+    @skipUnless(IMAGE_VARIANT_FORMATS, "Pillow has no AVIF or WebP codec")
+    def test_variants_are_transcoded_and_negotiated(self):
+        skill = self.create_skill()
+        template = Template("{% load image_variants %}{% image_variant image 64 %}")
+        for image_format in IMAGE_VARIANT_FORMATS:
+            name = get_image_variant_name(skill.image.name, 64, image_format)
+            with skill.image.storage.open(name) as file:
+                self.assertEqual(Image.open(file).format, image_format.upper())
+            request = RequestFactory().get("/", HTTP_ACCEPT=f"{IMAGE_FORMAT_CONTENT_TYPES[image_format]},*/*;q=0.8")
+            self.assertEqual(
+                template.render(Context({"image": skill.image, "request": request})), skill.image.storage.url(name)
+            )
+        # wildcards and refused formats fall back to the original format
+        self.assertIsNone(get_accepted_image_format("image/*,*/*;q=0.8"))
+        self.assertIsNone(get_accepted_image_format("image/avif;q=0,image/webp;q=0"))
+        request = RequestFactory().get("/", HTTP_ACCEPT="image/*")
+        self.assertEqual(
+            template.render(Context({"image": skill.image, "request": request})),
+            skill.image.storage.url(get_image_variant_name(skill.image.name, 64))
+        )
+
+    @skipUnless(IMAGE_VARIANT_FORMATS, "Pillow has no AVIF or WebP codec")
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_negotiated_pages_vary_on_accept(self):
+        skill = self.create_skill()
+        self.client.force_login(skill.user)
+        image_format = IMAGE_VARIANT_FORMATS[0]
+        response = self.client.get(reverse("portfolios:skills"), HTTP_ACCEPT=IMAGE_FORMAT_CONTENT_TYPES[image_format])
+        self.assertContains(response, get_image_variant_name(skill.image.name, 64, image_format))
+        self.assertIn("Accept", response["Vary"])
+        # pages without renditions are cached once for every client
+        response = self.client.post(reverse("portfolios:portfolio_validate"), {"section": "skills", "field": "title"})
+        self.assertNotIn("Accept", response.get("Vary", "").split(", "))
+
+    @skipUnless(IMAGE_VARIANT_FORMATS, "Pillow has no AVIF or WebP codec")
+    def test_static_images_are_transcoded_and_negotiated(self):
+        image_format = IMAGE_VARIANT_FORMATS[0]
+        template = Template("{% load image_variants %}{% static_image 'icons/logo.png' %}")
+        with tempfile.TemporaryDirectory() as static_dir, override_settings(
+            STATICFILES_DIRS=[static_dir], STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'
+        ):
+            os.makedirs(os.path.join(static_dir, "icons"))
+            Image.new("RGB", (32, 32), "red").save(os.path.join(static_dir, "icons", "logo.png"))
+            call_command("transcode_static_images", "--path", "icons", stdout=StringIO())
+            with Image.open(os.path.join(static_dir, "icons", f"logo.{image_format}")) as image:
+                self.assertEqual(image.format, image_format.upper())
+
+            _static_exists.cache_clear()
+            self.addCleanup(_static_exists.cache_clear)
+            request = RequestFactory().get("/", HTTP_ACCEPT=IMAGE_FORMAT_CONTENT_TYPES[image_format])
+            self.assertTrue(template.render(Context({"request": request})).endswith(f"icons/logo.{image_format}"))
+            self.assertTrue(request.vary_on_accept)
+            request = RequestFactory().get("/", HTTP_ACCEPT="image/*")
+            self.assertTrue(template.render(Context({"request": request})).endswith("icons/logo.png"))
+
+    def test_variants_are_deleted_with_the_original(self):
+        skill = self.create_skill()
+        old_image = skill.image
+        # a replaced image takes its renditions with it
+        with self.captureOnCommitCallbacks(execute=True):
+            skill.image = get_image(100, 100, "PNG")
+            skill.save()
+        self.assertVariantsExist(old_image, exist=False)
+        self.assertVariantsExist(skill.image)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_delete(Skill.objects.filter(pk=skill.pk))
+        self.assertVariantsExist(skill.image, exist=False)
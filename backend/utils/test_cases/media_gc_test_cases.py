@@ -0,0 +1,97 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from portfolios.models import Project, ProjectMedia
+from users.factories.user_factory import UserFactory
+from utils.image_variants import get_image_variant_names
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    FILE_CLEANUP_IN_BACKGROUND=False,
+    DOCUMENT_PREVIEWS_IN_BACKGROUND=False
+)
+class MediaGarbageCollectionTestCase(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = self.settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.state = f"{media_root}-state.json"
+        self.addCleanup(lambda: os.path.exists(self.state) and os.remove(self.state))
+
+        project = Project.objects.create(
+            user=UserFactory(), title="Project", short_description="Project", start_date=datetime.date(2020, 1, 1)
+        )
+        self.media = ProjectMedia.objects.create(project=project, file=ContentFile(b"%PDF media", name="media.pdf"))
+        self.kept = [self.media.file.name] + [
+            self.save(name) for name in get_image_variant_names(self.media.file.name)
+        ]
+        self.orphans = [self.save("orphan.txt"), self.save("someone/old.pdf"), self.save("blobs/ab/ab12.pdf")]
+        self.recent = self.save("someone/recent.pdf", age=0)
+        self.age(self.media.file.name)
+
+    def save(self, name, age=48):
+        name = default_storage.save(name, ContentFile(b"content"))
+        self.age(name, age)
+        return name
+
+    def age(self, name, hours=48):
+        modified = time.time() - hours * 3600
+        os.utime(default_storage.path(name), (modified, modified))
+
+    def gc_media(self, *args):
+        output = StringIO()
+        call_command("gc_media", "--state", self.state, *args, stdout=output)
+        return output.getvalue()
+
+    def test_orphans_older_than_the_grace_period_are_reported_and_deleted(self):
+        output = self.gc_media()
+        for name in self.orphans:
+            self.assertIn(name, output)
+            self.assertTrue(default_storage.exists(name))
+        self.assertNotIn(self.recent, output)
+        self.assertIn("Found 3 orphaned files", output)
+
+        output = self.gc_media("--delete")
+        self.assertIn("Deleted 3 orphaned files", output)
+        for name in self.orphans:
+            self.assertFalse(default_storage.exists(name))
+        for name in self.kept + [self.recent]:
+            self.assertTrue(default_storage.exists(name))
+        self.assertFalse(os.path.exists(self.state))
+
+        # a shorter grace period collects the recent file too
+        self.assertIn("Deleted 1 orphaned files", self.gc_media("--delete", "--grace-hours", "0"))
+        self.assertFalse(default_storage.exists(self.recent))
+
+    def test_an_interrupted_run_resumes_after_the_swept_directories(self):
+        with open(self.state, "w") as file:
+            json.dump({
+                "media_root": str(default_storage.location), "delete": True, "swept": ["someone"],
+                "files": 1, "bytes": 7
+            }, file)
+        output = self.gc_media("--delete")
+        self.assertIn("Resuming after 1 swept directories", output)
+        self.assertIn("Deleted 3 orphaned files", output)
+        # `someone/` was not swept again
+        self.assertTrue(default_storage.exists("someone/old.pdf"))
+        self.assertFalse(default_storage.exists("orphan.txt"))
+
+        # a checkpoint of a reporting run does not resume a deleting one
+        with open(self.state, "w") as file:
+            json.dump({"media_root": str(default_storage.location), "delete": False, "swept": []}, file)
+        with self.assertRaises(CommandError):
+            self.gc_media("--delete")
+        self.assertIn("Deleted 1 orphaned files", self.gc_media("--delete", "--restart"))
+        self.assertFalse(default_storage.exists("someone/old.pdf"))
@@ -0,0 +1,81 @@
+import hashlib
+import shutil
+import tempfile
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+CONTENT = b"%PDF-1.4 " + bytes(range(256)) * 10
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    MEDIA_SENDFILE_HEADER='', MEDIA_ROOT=MEDIA_ROOT
+)
+class MediaServingTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.name = default_storage.save("media-serving/cv.pdf", ContentFile(CONTENT))
+        content_hash = hashlib.sha256(CONTENT).hexdigest()
+        self.blob = default_storage.save(f"blobs/{content_hash[:2]}/{content_hash}.pdf", ContentFile(CONTENT))
+
+    def tearDown(self):
+        default_storage.delete(self.name)
+        default_storage.delete(self.blob)
+
+    def get(self, name, **headers):
+        return self.client.get(f"/media/{name}", **headers)
+
+    def test_files_are_served_with_cache_headers(self):
+        response = self.get(self.name)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(response["Content-Length"], str(len(CONTENT)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Cache-Control"], "public, no-cache")
+        self.assertEqual(self.get(self.name, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+        # content addressed files are cached forever, their hash is the ETag
+        response = self.get(self.blob)
+        self.assertEqual(response["ETag"], f'"{hashlib.sha256(CONTENT).hexdigest()}"')
+        self.assertIn("immutable", response["Cache-Control"])
+
+        self.assertEqual(self.get("media-serving/missing.pdf").status_code, 404)
+        self.assertEqual(self.get("media-serving/").status_code, 404)
+        self.assertEqual(self.get("../config/settings/base.py").status_code, 404)
+
+    def test_ranges_are_streamed(self):
+        response = self.get(self.name, HTTP_RANGE="bytes=100-1099")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 100-1099/{len(CONTENT)}")
+        self.assertEqual(b"".join(response.streaming_content), CONTENT[100:1100])
+
+        response = self.get(self.name, HTTP_RANGE="bytes=-10")
+        self.assertEqual(b"".join(response.streaming_content), CONTENT[-10:])
+        response = self.get(self.name, HTTP_RANGE=f"bytes={len(CONTENT)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(CONTENT)}")
+
+        # a changed file is sent whole
+        response = self.get(self.name, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_transfers_are_handed_to_the_proxy(self):
+        with override_settings(MEDIA_SENDFILE_HEADER="X-Accel-Redirect"):
+            response = self.get(self.name, HTTP_RANGE="bytes=0-9")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.name}")
+        self.assertEqual(response.content, b"")
+        with override_settings(MEDIA_SENDFILE_HEADER="X-Sendfile"):
+            self.assertEqual(self.get(self.name)["X-Sendfile"], default_storage.path(self.name))
@@ -0,0 +1,80 @@
+import uuid
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.test import TestCase, TransactionTestCase, override_settings
+from portfolios.models import Skill
+from users.factories.user_factory import UserFactory
+from utils.snippets import (
+    compact_uuid, time_ordered_uuid, generate_unique_username_from_email, generate_unique_usernames_from_emails,
+    is_slug_collision
+)
+
+
+class SlugGenerationTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+
+    def test_time_ordered_uuid(self):
+        first, second = time_ordered_uuid(), time_ordered_uuid()
+        self.assertEqual(first.version, 7)
+        self.assertEqual(first.variant, uuid.RFC_4122)
+        self.assertNotEqual(first, second)
+        self.assertLessEqual(first.int >> 80, second.int >> 80)
+
+    def test_compact_uuid(self):
+        value = time_ordered_uuid()
+        encoded = compact_uuid(value)
+        self.assertEqual(len(encoded), 26)
+        self.assertEqual(int(encoded.translate(str.maketrans("jkmnpqrstvwxyz", "ijklmnopqrstuv")), 32), value.int)
+
+    def test_create_does_not_query_for_slug(self):
+        # only the INSERT statement
+        with self.assertNumQueries(1):
+            skill = Skill.objects.create(user=self.user, title="Python Programming")
+        self.assertTrue(skill.slug.startswith("python-programming-"))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SlugCollisionTestCase(TransactionTestCase):
+
+    def test_slug_collision_is_retried(self):
+        user = UserFactory()
+        existing = Skill.objects.create(user=user, title="Python")
+        colliding_uuid = uuid.UUID(existing.slug[len("python-"):])
+        with mock.patch("utils.snippets.time_ordered_uuid", side_effect=[colliding_uuid, uuid.uuid4()]):
+            skill = Skill.objects.create(user=user, title="Python ")
+        self.assertNotEqual(skill.slug, existing.slug)
+        self.assertEqual(Skill.objects.filter(user=user).count(), 2)
+
+    def test_only_the_slug_constraint_is_a_collision(self):
+        table = Skill._meta.db_table
+        self.assertTrue(is_slug_collision(IntegrityError(f"UNIQUE constraint failed: {table}.slug"), Skill, "default"))
+        for message in (
+            f"NOT NULL constraint failed: {table}.slug", f"UNIQUE constraint failed: {table}.user_id, {table}.slug",
+            "UNIQUE constraint failed: user.slug",
+        ):
+            self.assertFalse(is_slug_collision(IntegrityError(message), Skill, "default"))
+
+
+class UsernameGenerationTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        get_user_model().objects.bulk_insert(
+            get_user_model()(email=email) for email in ("info@example.com", "info@example.org", "information@a.com")
+        )
+
+    def test_username_is_generated_with_one_query(self):
+        user = get_user_model()(email="info@example.net")
+        with self.assertNumQueries(1):
+            username = generate_unique_username_from_email(user)
+        self.assertEqual(username, "info_2")
+
+    def test_usernames_are_generated_in_batch(self):
+        users = [get_user_model()(email=email) for email in ("info@a.org", "info@b.org", "new@a.org", "new@b.org")]
+        with self.assertNumQueries(1):
+            generate_unique_usernames_from_emails(users)
+        self.assertEqual([user.username for user in users], ["info_2", "info_3", "new", "new_1"])
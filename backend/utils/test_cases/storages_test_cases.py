@@ -0,0 +1,144 @@
+import datetime
+import hashlib
+import io
+import shutil
+import tempfile
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from PIL import Image
+from portfolios.factories.skill_factory import SkillFactory
+from portfolios.models import Project, ProjectMedia, Skill
+from utils.helpers import bulk_delete, now
+from utils.image_variants import get_image_variant_names
+from utils.models import ContentBlob
+from utils.storages import get_content_digest
+from users.factories.user_factory import UserFactory
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    CONTENT_ADDRESSED_MEDIA=True, DEFAULT_FILE_STORAGE="utils.storages.ContentAddressedStorage",
+    FILE_CLEANUP_IN_BACKGROUND=False, IMAGE_VARIANTS_IN_BACKGROUND=False, MEDIA_ROOT=MEDIA_ROOT
+)
+class ContentAddressedStorageTestCase(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        cls.project = Project.objects.create(
+            user=cls.user, title="Project", short_description="Project", start_date=datetime.date(2020, 1, 1)
+        )
+
+    def create_media(self, content, name="media.pdf"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ProjectMedia.objects.create(project=self.project, file=ContentFile(content, name=name))
+
+    def test_files_are_named_by_content_and_shared(self):
+        content_hash = hashlib.sha256(b"certificate").hexdigest()
+        first = self.create_media(b"certificate")
+        second = self.create_media(b"certificate", name="copy.PDF")
+        other = self.create_media(b"another certificate")
+        self.assertEqual(first.file.name, f"blobs/{content_hash[:2]}/{content_hash}.pdf")
+        self.assertEqual(second.file.name, first.file.name)
+        self.assertNotEqual(other.file.name, first.file.name)
+
+        self.assertEqual(ContentBlob.objects.get(digest=content_hash).references, 2)
+
+        # the shared file is only deleted with its last reference
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(default_storage.exists(second.file.name))
+        self.assertEqual(ContentBlob.objects.get(digest=content_hash).references, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_delete(ProjectMedia.objects.filter(pk=second.pk))
+        self.assertFalse(default_storage.exists(second.file.name))
+        self.assertFalse(ContentBlob.objects.filter(digest=content_hash).exists())
+        self.assertTrue(default_storage.exists(other.file.name))
+
+    def test_saving_counted_content_after_its_blob_was_deleted_writes_it_again(self):
+        media = self.create_media(b"certificate")
+        name = media.file.name
+        with self.captureOnCommitCallbacks(execute=True):
+            media.delete()
+        self.assertFalse(default_storage.exists(name))
+        again = self.create_media(b"certificate")
+        self.assertEqual(again.file.name, name)
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(ContentBlob.objects.get(digest=get_content_digest(name)).references, 1)
+
+    def test_uncounted_files_are_kept_by_deletes_and_collected_as_orphans(self):
+        name = default_storage.save(f"blobs/ab/{'ab' * 32}.pdf", ContentFile(b"stored before counting"))
+        default_storage.delete(name)
+        self.assertTrue(default_storage.exists(name))
+        default_storage.delete_unreferenced(name, now())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_shared_images_keep_their_renditions(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (300, 300), "blue").save(buffer, "PNG")
+        with self.captureOnCommitCallbacks(execute=True):
+            skills = [
+                SkillFactory(user=self.user, image=ContentFile(buffer.getvalue(), name="logo.png")) for _ in range(2)
+            ]
+        name = skills[0].image.name
+        self.assertEqual(skills[1].image.name, name)
+        with self.captureOnCommitCallbacks(execute=True):
+            skills[0].delete()
+        self.assertTrue(all(default_storage.exists(variant) for variant in [name] + get_image_variant_names(name)))
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.get(pk=skills[1].pk).delete()
+        self.assertFalse(any(default_storage.exists(variant) for variant in [name] + get_image_variant_names(name)))
+
+    def test_uploads_are_hashed_while_received(self):
+        request = RequestFactory().post("/", {"file": SimpleUploadedFile("upload.pdf", b"%PDF-1.4 uploaded")})
+        self.assertEqual(request.FILES["file"].content_hash, hashlib.sha256(b"%PDF-1.4 uploaded").hexdigest())
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    CONTENT_ADDRESSED_MEDIA=True, DEFAULT_FILE_STORAGE="utils.storages.ContentAddressedStorage",
+    FILE_CLEANUP_IN_BACKGROUND=False, MEDIA_ROOT=MEDIA_ROOT
+)
+class ContentAddressedBulkInsertTestCase(TransactionTestCase):
+    """ Failed inserts roll back their counted references before their files are deleted """
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.project = Project.objects.create(
+            user=UserFactory(), title="Project", short_description="Project", start_date=datetime.date(2020, 1, 1)
+        )
+
+    def bulk_insert_failing(self, content):
+        with mock.patch.object(type(ProjectMedia.objects), "bulk_create", side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                ProjectMedia.objects.bulk_insert([
+                    ProjectMedia(project=self.project, file=ContentFile(content, name="a.pdf"))
+                ])
+
+    def test_failed_insert_keeps_shared_content(self):
+        media = ProjectMedia.objects.create(project=self.project, file=ContentFile(b"certificate", name="a.pdf"))
+        self.bulk_insert_failing(b"certificate")
+        self.assertEqual(ContentBlob.objects.get(digest=get_content_digest(media.file.name)).references, 1)
+        self.assertTrue(default_storage.exists(media.file.name))
+
+    def test_failed_insert_deletes_its_new_content(self):
+        content_hash = hashlib.sha256(b"new certificate").hexdigest()
+        self.bulk_insert_failing(b"new certificate")
+        self.assertFalse(ContentBlob.objects.filter(digest=content_hash).exists())
+        self.assertFalse(default_storage.exists(f"blobs/{content_hash[:2]}/{content_hash}.pdf"))
@@ -0,0 +1,51 @@
+import io
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from portfolios.models import Skill
+from users.factories.user_factory import UserFactory
+from utils.validators import MAX_UPLOAD_SIZE
+
+
+def get_png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (10, 10), "blue").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'
+)
+class UploadValidationHandlerTestCase(TestCase):
+
+    def post(self, name, content):
+        request = RequestFactory().post("/", {"title": "Title", "image": SimpleUploadedFile(name, content)})
+        return request.FILES, getattr(request, "upload_errors", {})
+
+    def test_files_are_identified_by_content(self):
+        files, errors = self.post("logo.png", get_png())
+        self.assertIn("image", files)
+        self.assertEqual(errors, {})
+        self.assertEqual(self.post("cv.PDF", b"%PDF-1.4 cv")[1], {})
+        self.assertEqual(self.post("logo.svg", b'<?xml version="1.0"?>\n<svg></svg>')[1], {})
+
+        # an executable disguised as an image
+        files, errors = self.post("logo.png", b"MZ\x90\x00" + b"\x00" * 100)
+        self.assertNotIn("image", files)
+        self.assertIn("is not a .png file", errors["image"])
+        self.assertIn("is not a .jpg file", self.post("photo.jpg", get_png())[1]["image"])
+
+    def test_oversize_files_are_aborted_while_received(self):
+        files, errors = self.post("cv.pdf", b"%PDF-" + b"x" * MAX_UPLOAD_SIZE)
+        self.assertNotIn("image", files)
+        self.assertIn("Please keep file size under", errors["image"])
+
+    def test_rejected_uploads_are_form_errors(self):
+        self.client.force_login(UserFactory())
+        response = self.client.post(reverse("portfolios:skill_create"), {
+            "title": "Skill", "image": SimpleUploadedFile("logo.png", b"not an image")
+        })
+        self.assertContains(response, "is not a .png file")
+        self.assertFalse(Skill.objects.exists())
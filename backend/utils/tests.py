@@ -0,0 +1,17 @@
+# import test cases
+
+from utils.test_cases.snippets_test_cases import (  # NOQA
+    SlugGenerationTestCase, SlugCollisionTestCase, UsernameGenerationTestCase
+)
+from utils.test_cases.helpers_test_cases import (  # NOQA
+    BulkInsertManagerTestCase, BulkFactoryDataTestCase, BulkDeleteTestCase
+)
+from utils.test_cases.image_variants_test_cases import ImageVariantTestCase  # NOQA
+from utils.test_cases.storages_test_cases import ContentAddressedBulkInsertTestCase, ContentAddressedStorageTestCase  # NOQA
+from utils.test_cases.upload_handlers_test_cases import UploadValidationHandlerTestCase  # NOQA
+from utils.test_cases.file_writes_test_cases import ConcurrentFileWriteTestCase  # NOQA
+from utils.test_cases.media_serving_test_cases import MediaServingTestCase  # NOQA
+from utils.test_cases.file_metadata_test_cases import FileMetadataTestCase  # NOQA
+from utils.test_cases.document_previews_test_cases import DocumentPreviewTestCase  # NOQA
+from utils.test_cases.media_gc_test_cases import MediaGarbageCollectionTestCase  # NOQA
+from utils.test_cases.image_optimization_test_cases import ImageOptimizationTestCase  # NOQA
@@ -0,0 +1,76 @@
+import hashlib
+from django import forms
+from django.core.files.uploadhandler import (
+    FileUploadHandler, MemoryFileUploadHandler, StopUpload, TemporaryFileUploadHandler
+)
+from django.template.defaultfilters import filesizeformat
+from utils.validators import MAX_UPLOAD_SIZE, validate_file_signature
+
+
+def add_upload_error(request, field_name, message):
+    """ Keeps the error of an upload rejected while it was received in `request.upload_errors` for the form """
+    if request is not None:
+        if not hasattr(request, "upload_errors"):
+            request.upload_errors = {}
+        request.upload_errors[field_name] = message
+
+
+class ContentHashUploadHandlerMixin(object):
+    """
+    Hashes the chunks of an uploaded file while they are received and sets the hex digest as `content_hash` on the
+    completed file, so content addressed names (see `utils.storages`) never read an upload a second time.
+    """
+
+    def new_file(self, *args, **kwargs):
+        self.content_hash = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.content_hash.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.content_hash = self.content_hash.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(ContentHashUploadHandlerMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(ContentHashUploadHandlerMixin, TemporaryFileUploadHandler):
+    pass
+
+
+class UploadValidationHandler(FileUploadHandler):
+    """
+    Validates uploads while their chunks arrive, before any other handler stores them: the type of a file is
+    identified by the magic bytes of its first chunk and `MAX_UPLOAD_SIZE` is enforced on the received bytes.
+    A rejected file stops the upload at once, the error is kept in `request.upload_errors` (field name => message).
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        try:
+            if start == 0:
+                validate_file_signature(self.file_name, raw_data)
+            self.received += len(raw_data)
+            if self.received > MAX_UPLOAD_SIZE:
+                raise forms.ValidationError(
+                    "Please keep file size under %s. Current file (%s) is larger." % (
+                        filesizeformat(MAX_UPLOAD_SIZE), self.file_name
+                    )
+                )
+        except forms.ValidationError as error:
+            add_upload_error(self.request, self.field_name, error.messages[0])
+            # the rest of the body is not read
+            raise StopUpload(connection_reset=True)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
@@ -1,5 +1,6 @@
 from django.conf import settings
 import os
+from PIL import Image
 from django.core.files.uploadedfile import UploadedFile
 from django.template.defaultfilters import filesizeformat
 from django import forms
@@ -15,59 +16,128 @@ ALLOWED_FILE_TYPES = ALLOWED_IMAGE_TYPES + ALLOWED_DOCUMENT_TYPES
 # maximum file upload size in bytes
 MAX_UPLOAD_SIZE = settings.MAX_UPLOAD_SIZE if settings.MAX_UPLOAD_SIZE else 2621440
 
+# larger images are rejected, decoding them would take too much memory (e.g. decompression bombs)
+MAX_IMAGE_DIMENSION = getattr(settings, "MAX_IMAGE_DIMENSION", 10000)  # in pixels (longest side)
+MAX_IMAGE_PIXELS = getattr(settings, "MAX_IMAGE_PIXELS", 50000000)
 
-def get_validated_file(file):
-    if file and isinstance(file, UploadedFile):
-        file_extension = os.path.splitext(file.name)[1]
-        allowed_file_types = ALLOWED_FILE_TYPES
-        if file_extension not in allowed_file_types:
-            raise forms.ValidationError(
-                "Only %s file formats are supported! Current file format is %s" % (
-                    allowed_file_types, file_extension if file_extension else "undefined"
-                )
+# leading (magic) bytes of the allowed file types => extensions of the type
+FILE_SIGNATURES = (
+    (b"\xff\xd8\xff", (".jpg", ".jpeg")),
+    (b"\x89PNG\r\n\x1a\n", (".png",)),
+    (b"%PDF-", (".pdf",)),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", (".doc",)),
+    (b"PK\x03\x04", (".docx",)),
+)
+
+
+def validate_file_metadata(name, size, allowed_types, kind="file"):
+    """[Validates the extension and byte size of a file, before or after it is uploaded]
+
+    Args:
+        name ([str]): [file name]
+        size ([int]): [file size in bytes]
+        allowed_types ([list]): [allowed extensions]
+        kind (str, optional): [kind of file used in the message]. Defaults to "file".
+
+    Raises:
+        forms.ValidationError: [if the extension is not allowed or the file is too large]
+    """
+    file_extension = os.path.splitext(name)[1]
+    if file_extension not in allowed_types:
+        raise forms.ValidationError(
+            "Only %s %s formats are supported! Current file format is %s" % (
+                allowed_types, kind, file_extension if file_extension else "undefined"
             )
-        if file.size > MAX_UPLOAD_SIZE:
-            raise forms.ValidationError(
-                "Please keep file size under %s. Current file (%s) size is %s" % (
-                    filesizeformat(MAX_UPLOAD_SIZE), file.name, filesizeformat(file.size)
-                )
+        )
+    if size > MAX_UPLOAD_SIZE:
+        raise forms.ValidationError(
+            "Please keep file size under %s. Current file (%s) size is %s" % (
+                filesizeformat(MAX_UPLOAD_SIZE), name, filesizeformat(size)
             )
+        )
+
+
+def get_extensions_by_content(head):
+    """[Identifies the type of a file by its first bytes]
+
+    Args:
+        head ([bytes]): [first bytes of the file (the first upload chunk)]
+
+    Returns:
+        [tuple]: [extensions of the identified type, empty if the type is unknown]
+    """
+    for signature, extensions in FILE_SIGNATURES:
+        if head.startswith(signature):
+            return extensions
+    # svg images are xml text
+    if head.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"<") and b"<svg" in head.lower():
+        return (".svg",)
+    return ()
+
+
+def validate_file_signature(name, head):
+    """[Checks that the content of a file with an allowed extension really is of that type]
+
+    Args:
+        name ([str]): [file name]
+        head ([bytes]): [first bytes of the file]
+
+    Raises:
+        forms.ValidationError: [if the content does not match the extension]
+    """
+    file_extension = os.path.splitext(name)[1].lower()
+    if file_extension in ALLOWED_FILE_TYPES and file_extension not in get_extensions_by_content(head):
+        raise forms.ValidationError(
+            "The content of the file (%s) is not a %s file!" % (name, file_extension)
+        )
+
+
+def is_image_size_allowed(width, height):
+    return 0 < width <= MAX_IMAGE_DIMENSION and 0 < height <= MAX_IMAGE_DIMENSION and width * height <= MAX_IMAGE_PIXELS
+
+
+def validate_image_dimensions(image):
+    """[Checks the dimensions of a raster image from its header, without decoding it]
+
+    Args:
+        image ([File]): [uploaded image, its position is restored]
+
+    Raises:
+        forms.ValidationError: [if the image is empty, too large or can not be read]
+    """
+    if os.path.splitext(image.name)[1].lower() == ".svg":
+        return
+    position = image.tell()
+    try:
+        image.seek(0)
+        with Image.open(image) as opened:
+            width, height = opened.size
+    except Exception:
+        raise forms.ValidationError("The image (%s) could not be read!" % image.name)
+    finally:
+        image.seek(position)
+    if not is_image_size_allowed(width, height):
+        raise forms.ValidationError(
+            "Please keep images under %s x %s pixels (%s megapixels). Current image (%s) is %s x %s pixels." % (
+                MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION, MAX_IMAGE_PIXELS // 1000000, image.name, width, height
+            )
+        )
+
+
+def get_validated_file(file):
+    if file and isinstance(file, UploadedFile):
+        validate_file_metadata(file.name, file.size, ALLOWED_FILE_TYPES)
     return file
 
 
 def get_validated_image(image):
     if image and isinstance(image, UploadedFile):
-        file_extension = os.path.splitext(image.name)[1]
-        allowed_image_types = ALLOWED_IMAGE_TYPES
-        if file_extension not in allowed_image_types:
-            raise forms.ValidationError(
-                "Only %s image formats are supported! Current file format is %s" % (
-                    allowed_image_types, file_extension if file_extension else "undefined"
-                )
-            )
-        if image.size > MAX_UPLOAD_SIZE:
-            raise forms.ValidationError(
-                "Please keep file size under %s. Current file (%s) size is %s" % (
-                    filesizeformat(MAX_UPLOAD_SIZE), image.name, filesizeformat(image.size)
-                )
-            )
+        validate_file_metadata(image.name, image.size, ALLOWED_IMAGE_TYPES, kind="image")
+        validate_image_dimensions(image)
     return image
 
 
 def get_validated_document(document):
     if document and isinstance(document, UploadedFile):
-        file_extension = os.path.splitext(document.name)[1]
-        allowed_document_types = ALLOWED_DOCUMENT_TYPES
-        if file_extension not in allowed_document_types:
-            raise forms.ValidationError(
-                "Only %s document formats are supported! Current file format is %s" % (
-                    allowed_document_types, file_extension if file_extension else "undefined"
-                )
-            )
-        if document.size > MAX_UPLOAD_SIZE:
-            raise forms.ValidationError(
-                "Please keep file size under %s. Current file (%s) size is %s" % (
-                    filesizeformat(MAX_UPLOAD_SIZE), document.name, filesizeformat(document.size)
-                )
-            )
+        validate_file_metadata(document.name, document.size, ALLOWED_DOCUMENT_TYPES, kind="document")
     return document